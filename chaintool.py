@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""loopchain block db maintenance tool (peer 를 멈춘 상태에서 사용한다)"""
+
+import getopt
+import logging
+import os
+import sys
+
+import loopchain.utils as util
+from loopchain import configure as conf
+from loopchain.blockchain import BlockChain, ChainSnapshot, SegmentBlockStore, SnapshotError
+from loopchain.store import LevelDBStore, KeyValueStoreError
+
+
+def usage():
+    print("USAGE: LoopChain Block DB Tool")
+    print("python3 chaintool.py [option] [command] [command args]")
+    print("option:")
+    print("-c or --channel : channel name (default: " + conf.LOOPCHAIN_DEFAULT_CHANNEL + ")")
+    print("-o or --configure_file_path : json configure file path of the peer (TX_META_INDEXES, BLOCK_COMPRESSION...)")
+    print("--height : block height of snapshot to export (default: last block)")
+    print("--score-path : score storage directory to export with or import from snapshot")
+    print("--block-hash : block hash at the snapshot height from a trusted peer (required to import or verify snapshot)")
+    print("-d : Display colored log.")
+    print("-h or --help : print this usage")
+    print("command:")
+    print("migrate_tx_index [db path] : convert json tx index entries to positional binary entries")
+    print("backfill_tx_meta_index [db path] : write tx meta index (conf.TX_META_INDEXES) of blocks added before it")
+    print("export_snapshot [db path] [snapshot file] : export block db (and score state) to snapshot")
+    print("import_snapshot [snapshot file] [db path] : verify snapshot and import it to new block db")
+    print("verify_snapshot [snapshot file] : verify checksum and block hash of snapshot")
+
+
+def open_level_db(db_path, create_if_missing=False):
+    try:
+        return LevelDBStore(db_path, create_if_missing=create_if_missing)
+    except KeyValueStoreError as e:
+        exit(f"can not open block db({db_path}): {e}")
+
+
+def open_block_store(db_path):
+    block_store_path = os.path.join(db_path, conf.BLOCK_SEGMENT_DIR)
+    if os.path.exists(block_store_path):
+        return SegmentBlockStore(block_store_path, read_only=True)
+    return None
+
+
+def migrate_tx_index(options, db_path):
+    blockchain = BlockChain(open_level_db(db_path), options['channel'], open_block_store(db_path))
+    migrated = blockchain.migrate_tx_index()
+    print(f"migrated tx index entries({migrated}) height({blockchain.block_height})")
+
+
+def backfill_tx_meta_index(options, db_path):
+    blockchain = BlockChain(open_level_db(db_path), options['channel'], open_block_store(db_path))
+    backfilled = blockchain.backfill_tx_meta_index()
+    print(f"backfilled tx meta index entries({backfilled}) indexes({conf.TX_META_INDEXES})")
+
+
+def export_snapshot(options, db_path, snapshot_path):
+    blockchain = BlockChain(open_level_db(db_path), options['channel'], open_block_store(db_path))
+    header = ChainSnapshot.export(blockchain, snapshot_path, options['height'], options['score_path'])
+    print(f"exported snapshot({snapshot_path}) height({header['block_height']}) hash({header['block_hash']})")
+
+
+def trusted_block_hash(options):
+    if options['block_hash'] is None:
+        exit("--block-hash is required to verify snapshot")
+    return options['block_hash']
+
+
+def import_snapshot(options, snapshot_path, db_path):
+    block_hash = trusted_block_hash(options)
+    header = ChainSnapshot.import_(snapshot_path, open_level_db(db_path, create_if_missing=True), block_hash,
+                                   options['score_path'])
+    print(f"imported snapshot({snapshot_path}) height({header['block_height']}) hash({header['block_hash']})")
+
+
+def verify_snapshot(options, snapshot_path):
+    header = ChainSnapshot.verify(snapshot_path, trusted_block_hash(options))
+    print(f"verified snapshot({snapshot_path}) height({header['block_height']}) hash({header['block_hash']})")
+
+
+commands = {
+    "migrate_tx_index": (migrate_tx_index, 1),
+    "backfill_tx_meta_index": (backfill_tx_meta_index, 1),
+    "export_snapshot": (export_snapshot, 2),
+    "import_snapshot": (import_snapshot, 2),
+    "verify_snapshot": (verify_snapshot, 1)
+}
+
+
+def main(argv):
+    try:
+        opts, args = getopt.getopt(argv, "c:o:dh", ["channel=", "configure_file_path=", "height=", "score-path=", "block-hash=", "help"])
+    except getopt.GetoptError as e:
+        logging.error(e)
+        usage()
+        sys.exit(1)
+
+    options = {'channel': conf.LOOPCHAIN_DEFAULT_CHANNEL, 'height': None, 'score_path': None, 'block_hash': None}
+    for opt, arg in opts:
+        if opt in ("-c", "--channel"):
+            options['channel'] = arg
+        elif opt in ("-o", "--configure_file_path"):
+            conf.Configure().load_configure_json(arg)
+        elif opt == "--height":
+            options['height'] = int(arg)
+        elif opt == "--score-path":
+            options['score_path'] = arg
+        elif opt == "--block-hash":
+            options['block_hash'] = arg
+        elif opt == "-d":
+            util.set_log_level_debug()
+        elif opt in ("-h", "--help"):
+            usage()
+            return
+
+    if len(args) < 1 or args[0] not in commands or len(args) - 1 != commands[args[0]][1]:
+        usage()
+        sys.exit(1)
+
+    command = commands[args[0]][0]
+    try:
+        command(options, *args[1:])
+    except SnapshotError as e:
+        exit(f"snapshot error: {e}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -20,7 +20,7 @@ from enum import IntEnum
 from loopchain import configure as conf
 from loopchain.baseservice import StubManager
 from loopchain.protos import loopchain_pb2_grpc
-from loopchain.tools import PublicVerifier
+from loopchain.tools import PublicVerifier, PublicVerifierContainer
 
 
 class PeerStatus(IntEnum):
@@ -124,6 +124,8 @@ class PeerObject:
                               f"exception : {e}")
         try:
             self.__cert_verifier = PublicVerifier(self.peer_info.cert)
+            # peer 가 서명한 tx 검증에 같은 verifier 를 사용하도록 미리 넣어 둔다.
+            PublicVerifierContainer.put_public_verifier(self.peer_info.cert, self.__cert_verifier)
         except Exception as e:
             logging.exception(f"create cert verifier error : {self.__peer_info.cert} \n"
                               f"exception {e}")
@@ -16,5 +16,13 @@
 from .exception import *
 from .score_base import *
 from .transaction import *
+from .block_compression import *
 from .block import *
+from .block_cache import *
+from .block_store import *
+from .consensus_wal import *
+from .mempool import *
+from .header_chain import *
+from .tx_bloom_filter import *
 from .blockchain import *
+from .snapshot import *
@@ -21,12 +21,20 @@ from enum import Enum
 
 from loopchain import utils as util
 from loopchain.baseservice import ObjectManager
+from loopchain.blockchain.block_compression import decompress_block_dump, is_compressed_block
+from loopchain.blockchain.merkle import MerkleTreeBuilder, MerkleTree
+from loopchain.blockchain.serializer import BinaryWriter, BinaryReader, is_binary_block, \
+    BLOCK_FORMAT_MAGIC, BLOCK_FORMAT_VERSION
 from loopchain.blockchain.transaction import TransactionStatus, TransactionType, Transaction
+from loopchain.blockchain.tx_verifier import TxVerifier
 from loopchain.blockchain.exception import *
 from loopchain.blockchain.score_base import *
 from loopchain import configure as conf
 
 
+# 압축된 block 에서 header 를 읽을 때 먼저 풀어보는 길이 (peer_list block 이 아니면 header 는 이보다 작다.)
+BLOCK_HEADER_READ_BYTES = 4096
+
 
 class BlockStatus(Enum):
     unconfirmed = 1
@@ -43,6 +51,14 @@ class Block:
     """Blockchain 의 Block
     Transaction 들을 담아서 Peer들과 주고 받는 Block Object.
     """
+    __tx_verifier = None
+
+    # block_height_sync 의 preload_blocks 처럼 많은 Block 을 동시에 들고 있을 수 있으므로 instance 마다 __dict__ 를 만들지 않는다.
+    # 정의되지 않은 attribute 를 쓰는 기존 code 를 위해 __dict__ 도 남겨두며, 이 경우에만 dict 가 만들어진다.
+    __slots__ = ('version', 'prev_block_hash', 'prev_block_confirm', 'merkle_tree_root_hash', 'time_stamp',
+                 '__channel_name', '__confirmed_transaction_list', 'block_hash', 'height', 'block_status',
+                 '__block_type', 'peer_id', '__made_block_count', '__is_divided_block', '__next_leader_peer_id',
+                 '__peer_manager', '__signature', '__merkle_builder', '__merkle_tree', '__tx_index', '__dict__')
 
     def __init__(self, channel_name, made_block_count=0, is_divided_block=False):
         # Block head
@@ -50,12 +66,11 @@ class Block:
         self.prev_block_hash = ""
         self.prev_block_confirm = False  # SiEver 구현을 위한 값, AnnounceConfirmedBlock 메시지를 대체하여 다음 블럭에 투표 결과를 담아서 전송한다.
         self.merkle_tree_root_hash = ""
-        self.merkle_tree = []
         self.time_stamp = 0
         self.__channel_name = channel_name
 
         # 검증된 트랜젝션 목록
-        self.confirmed_transaction_list = []
+        self.__confirmed_transaction_list = []
         self.block_hash = ""
         self.height = 0
         self.block_status = BlockStatus.unconfirmed
@@ -70,17 +85,50 @@ class Block:
         self.__is_divided_block = is_divided_block
         self.__next_leader_peer_id = ""
         self.__peer_manager = None
-
-        self.merkle_tree = []
-        self.merkle_tree_root_hash = ""
-        self.height = 0
-        self.time_stamp = 0
         self.__signature = b''
 
+        # 아래는 confirmed_transaction_list 로 만드는 cache 로 list 가 바뀌면 reset_transactions 로 지운다.
+        # put_transaction 시점에 tx digest 를 접어 넣는 merkle tree builder
+        self.__merkle_builder = MerkleTreeBuilder()
+        # proof 생성용 전체 layer, 처음 proof 를 요청할 때 만든다.
+        self.__merkle_tree = None
+        # tx hash -> confirmed_transaction_list 의 위치, deserialize 후에는 처음 조회할 때 만든다.
+        self.__tx_index = {}
+
+    def __getstate__(self):
+        state = util.get_slots_state(self)
+        # 이전 version 의 peer 도 읽을 수 있도록 tx list 는 property 가 아닌 attribute 이름으로 담는다.
+        state['confirmed_transaction_list'] = state.pop('_Block__confirmed_transaction_list')
+        return state
+
+    def __setstate__(self, state):
+        # __slots__ 이전에 pickle 된 Block 은 __dict__ 형태의 state 를 가지고 있다.
+        state.pop('merkle_tree', None)
+        state.pop('_Block__tx_index_count', None)
+        util.set_slots_state(self, state)
+        self.reset_transactions()
+
     @property
     def channel_name(self):
         return self.__channel_name
 
+    @property
+    def confirmed_transaction_list(self):
+        return self.__confirmed_transaction_list
+
+    @confirmed_transaction_list.setter
+    def confirmed_transaction_list(self, tx_list):
+        self.__confirmed_transaction_list = tx_list
+        self.reset_transactions()
+
+    def reset_transactions(self):
+        """confirmed_transaction_list 로 만든 tx index, merkle tree cache 를 지운다. 다음에 필요할 때 list 로 다시 만든다.
+        list 를 put_transaction 이 아닌 방법으로 바꾼 경우 (pop 등) 반드시 불러야 한다.
+        """
+        self.__merkle_builder = None
+        self.__merkle_tree = None
+        self.__tx_index = None
+
     @property
     def block_type(self):
         return self.__block_type
@@ -153,75 +201,259 @@ class Block:
                 return False
 
         # Block 에 검증된 Transaction 추가 : 목록에 존재하는지 확인 필요
-        if tx not in self.confirmed_transaction_list:
-            self.confirmed_transaction_list.append(tx)
+        tx_index = self.__get_tx_index()
+        if tx.get_tx_hash() not in tx_index:
+            merkle_builder = self.__get_merkle_builder()
+            tx_index[tx.get_tx_hash()] = len(self.__confirmed_transaction_list)
+            self.__confirmed_transaction_list.append(tx)
+            self.__merkle_tree = None
+            merkle_builder.add_hex_leaf(tx.get_tx_hash())
         return True
 
+    def __get_tx_index(self) -> dict:
+        """tx hash 로 confirmed_transaction_list 의 위치를 찾는 index 를 구한다.
+        deserialize 된 block 이거나 reset_transactions 로 지워진 경우 다시 만든다.
+        """
+        if self.__tx_index is None:
+            self.__tx_index = {}
+            for idx, tx in enumerate(self.__confirmed_transaction_list):
+                self.__tx_index.setdefault(tx.get_tx_hash(), idx)
+        return self.__tx_index
+
+    def __get_merkle_builder(self) -> MerkleTreeBuilder:
+        """deserialize 된 block 이거나 reset_transactions 로 지워진 경우 confirmed_transaction_list 로 다시 구성한다."""
+        if self.__merkle_builder is None:
+            self.__merkle_builder = MerkleTreeBuilder()
+            for tx in self.__confirmed_transaction_list:
+                self.__merkle_builder.add_hex_leaf(tx.get_tx_hash())
+        return self.__merkle_builder
+
     @staticmethod
     def __calculate_merkle_tree_root_hash(block):
         """현재 들어온 Tx들만 가지고 Hash tree를 구성해서 merkle tree root hash 계산.
+        put_transaction 에서 구성한 merkle builder 의 frontier 로 root 만 구한다. (O(log n))
 
         :return: 계산된 root hash
         """
 
-        # 머클트리 생성
+        # 머클트리 규칙
         # 일단 해당 블럭에 홀수개의 트랜잭션이 있으면 마지막 트랜잭션의 Hash를 복사하여 넣어줍니다.
         # 바로 앞의 HASH(n) + HASH(n+1) 을 해싱해 줍니다.
         # 1개가 나올때까지 반복 합니다.
         # 마지막 1개가 merkle_tree_root_hash
 
-        mt_list = [tx.get_tx_hash() for tx in block.confirmed_transaction_list]
-        block.merkle_tree.extend(mt_list)
-
-        while True:
-            tree_length = len(mt_list)
-            tmp_mt_list = []
-            if tree_length <= 1:
-                # 0이나 1은 종료
-                break
-            elif tree_length % 2 == 1:
-                mt_list.append(mt_list[tree_length-1])
-                tree_length += 1
-
-            # 머클해쉬 생성
-            for row in range(int(tree_length/2)):
-                idx = row * 2
-                mk_sum = b''.join([mt_list[idx].encode(encoding='UTF-8'), mt_list[idx+1].encode(encoding='UTF-8')])
-                mk_hash = hashlib.sha256(mk_sum).hexdigest()
-                tmp_mt_list.append(mk_hash)
-            mt_list = tmp_mt_list
-            block.merkle_tree.extend(mt_list)
-
-        if len(mt_list) == 1:
-            block.merkle_tree_root_hash = mt_list[0]
+        merkle_builder = block.__get_merkle_builder()
+        if merkle_builder.leaf_count > 0:
+            block.merkle_tree_root_hash = merkle_builder.root_hash()
 
         return block.merkle_tree_root_hash
 
     def serialize_block(self):
         """블럭 Class serialize
-        Pickle 을 사용하여 serialize 함
+        versioned binary format 으로 serialize 함
+
+        layout: magic | format version | header fields | peer_manager | tx count | tx table
+        tx table 의 각 tx 는 length-prefixed record 이므로 필요한 tx 만 골라 읽을 수 있다.
 
         :return: serialize 결과
         """
 
-        return pickle.dumps(self, pickle.DEFAULT_PROTOCOL)
+        writer = BinaryWriter()
+        writer.write_raw(BLOCK_FORMAT_MAGIC)
+        writer.write_u8(BLOCK_FORMAT_VERSION)
+
+        # Block head
+        writer.write_str(self.version)
+        writer.write_hex(self.prev_block_hash)
+        writer.write_bool(self.prev_block_confirm)
+        writer.write_hex(self.merkle_tree_root_hash)
+        writer.write_u64(self.time_stamp)
+        writer.write_str(self.__channel_name)
+        writer.write_hex(self.block_hash)
+        writer.write_u64(self.height)
+        writer.write_u8(self.block_status.value)
+        writer.write_u8(self.__block_type.value)
+        writer.write_str(self.peer_id)
+        writer.write_i64(self.__made_block_count)
+        writer.write_bool(self.__is_divided_block)
+        writer.write_str(self.__next_leader_peer_id)
+        writer.write_bytes(self.__signature)
+
+        # peer_list block 인 경우에만 peer_manager dump 를 가진다.
+        writer.write_bool(self.__peer_manager is not None)
+        if self.__peer_manager is not None:
+            writer.write_bytes(self.__peer_manager)
+
+        # Transaction table
+        writer.write_u32(len(self.confirmed_transaction_list))
+        for tx in self.confirmed_transaction_list:
+            writer.write_bytes(tx.serialize_binary())
+
+        return writer.getvalue()
 
     def deserialize_block(self, block_dumps):
         """블럭 Class deserialize
         자기자신을 block_dumps의 data로 변환함
+        binary format 이 아닌 dump 는 기존 LevelDB 에 저장된 pickle 로 간주하여 읽는다.
+        압축된 dump 는 이때 처음 푼다.
 
         :param block_dumps: deserialize 할 Block dump data
         """
 
+        block_dumps = decompress_block_dump(block_dumps)
+        if not is_binary_block(block_dumps):
+            self.__deserialize_pickled_block(block_dumps)
+            return
+
+        reader = BinaryReader(block_dumps, len(BLOCK_FORMAT_MAGIC))
+        format_version = reader.read_u8()
+        if format_version != BLOCK_FORMAT_VERSION:
+            raise BlockError(f"not supported block format version({format_version})")
+
+        self.version = reader.read_str()
+        self.prev_block_hash = reader.read_hex()
+        self.prev_block_confirm = reader.read_bool()
+        self.merkle_tree_root_hash = reader.read_hex()
+        self.time_stamp = reader.read_u64()
+        self.__channel_name = reader.read_str()
+        self.block_hash = reader.read_hex()
+        self.height = reader.read_u64()
+        self.block_status = BlockStatus(reader.read_u8())
+        self.__block_type = BlockType(reader.read_u8())
+        self.peer_id = reader.read_str()
+        self.__made_block_count = reader.read_i64()
+        self.__is_divided_block = reader.read_bool()
+        self.__next_leader_peer_id = reader.read_str()
+        self.__signature = reader.read_bytes()
+        self.__peer_manager = reader.read_bytes() if reader.read_bool() else None
+
+        tx_count = reader.read_u32()
+        shared_values = {}
+        self.confirmed_transaction_list = [Transaction.deserialize_binary(reader.read_bytes_view(), shared_values)
+                                           for _ in range(tx_count)]
+
+    def __deserialize_pickled_block(self, block_dumps):
+        """binary format 도입 이전 pickle 로 저장된 Block 을 읽는다. (migration reader)
+
+        :param block_dumps: pickle 로 serialize 된 Block
+        """
         dump_obj = pickle.loads(block_dumps)
         if type(dump_obj) == Block:
-            self.__dict__ = dump_obj.__dict__
+            util.set_slots_state(self, util.get_slots_state(dump_obj))
+            self.reset_transactions()
 
     def find_transaction_index(self, transaction_hash):
-        for idx, tx in enumerate(self.confirmed_transaction_list):
-            if tx.get_tx_hash() == transaction_hash:
-                return idx
-        return -1
+        return self.__get_tx_index().get(transaction_hash, -1)
+
+    def find_transaction(self, transaction_hash):
+        """block 에 담긴 tx 를 hash 로 찾는다.
+
+        :param transaction_hash: tx hash
+        :return: Transaction or None
+        """
+        tx_index = self.find_transaction_index(transaction_hash)
+        return self.confirmed_transaction_list[tx_index] if tx_index >= 0 else None
+
+    @staticmethod
+    def read_transaction(block_dumps, tx_position):
+        """serialize 된 block 에서 tx_position 번째 tx 만 읽는다.
+        binary format 은 block head 와 앞선 tx record 의 길이만 읽고 건너뛰므로 block 전체를 deserialize 하지 않는다.
+
+        :param block_dumps: serialize 된 block
+        :param tx_position: block 의 confirmed_transaction_list 에서 tx 의 위치
+        :return: Transaction or None
+        """
+        block_dumps = decompress_block_dump(block_dumps)
+        if not is_binary_block(block_dumps):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            block.deserialize_block(block_dumps)
+            tx_list = block.confirmed_transaction_list
+            return tx_list[tx_position] if tx_position < len(tx_list) else None
+
+        reader = BinaryReader(block_dumps, len(BLOCK_FORMAT_MAGIC))
+        format_version = reader.read_u8()
+        if format_version != BLOCK_FORMAT_VERSION:
+            raise BlockError(f"not supported block format version({format_version})")
+
+        # version, prev_block_hash, prev_block_confirm, merkle_tree_root_hash, time_stamp, channel_name, block_hash,
+        # height, block_status, block_type, peer_id, made_block_count, is_divided_block, next_leader_peer_id, signature
+        for read in (reader.skip_bytes, reader.skip_bytes, reader.read_u8, reader.skip_bytes, reader.read_u64,
+                     reader.skip_bytes, reader.skip_bytes, reader.read_u64, reader.read_u8, reader.read_u8,
+                     reader.skip_bytes, reader.read_i64, reader.read_u8, reader.skip_bytes, reader.skip_bytes):
+            read()
+        if reader.read_bool():
+            reader.skip_bytes()
+
+        if tx_position >= reader.read_u32():
+            return None
+        for _ in range(tx_position):
+            reader.skip_bytes()
+        return Transaction.deserialize_binary(reader.read_bytes_view())
+
+    def get_header(self) -> dict:
+        """block header 정보를 dict 로 만든다. (Block.read_header 와 같은 key 를 가진다.)
+
+        :return: {version, prev_block_hash, merkle_tree_root_hash, time_stamp, block_hash, height, peer_id, tx_count}
+        """
+        return {
+            'version': self.version,
+            'prev_block_hash': self.prev_block_hash,
+            'merkle_tree_root_hash': self.merkle_tree_root_hash,
+            'time_stamp': self.time_stamp,
+            'block_hash': self.block_hash,
+            'height': self.height,
+            'peer_id': self.peer_id,
+            'tx_count': len(self.confirmed_transaction_list)
+        }
+
+    @staticmethod
+    def read_header(block_dumps) -> dict:
+        """serialize 된 block 에서 header 만 읽는다. tx table 은 tx count 만 읽고 deserialize 하지 않는다.
+
+        :param block_dumps: serialize 된 block
+        :return: Block.get_header 참고
+        """
+        if is_compressed_block(block_dumps):
+            # 압축된 block 은 header 가 있는 앞부분만 풀어서 읽고, header 가 더 길면 전체를 푼다.
+            try:
+                return Block.read_header(decompress_block_dump(block_dumps, BLOCK_HEADER_READ_BYTES))
+            except ValueError:
+                return Block.read_header(decompress_block_dump(block_dumps))
+
+        if not is_binary_block(block_dumps):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            block.deserialize_block(block_dumps)
+            return block.get_header()
+
+        reader = BinaryReader(block_dumps, len(BLOCK_FORMAT_MAGIC))
+        format_version = reader.read_u8()
+        if format_version != BLOCK_FORMAT_VERSION:
+            raise BlockError(f"not supported block format version({format_version})")
+
+        header = {'version': reader.read_str(), 'prev_block_hash': reader.read_hex()}
+        reader.read_u8()  # prev_block_confirm
+        header['merkle_tree_root_hash'] = reader.read_hex()
+        header['time_stamp'] = reader.read_u64()
+        reader.skip_bytes()  # channel_name
+        header['block_hash'] = reader.read_hex()
+        header['height'] = reader.read_u64()
+        reader.read_u8()  # block_status
+        reader.read_u8()  # block_type
+        header['peer_id'] = reader.read_str()
+        # made_block_count, is_divided_block, next_leader_peer_id, signature
+        for read in (reader.read_i64, reader.read_u8, reader.skip_bytes, reader.skip_bytes):
+            read()
+        if reader.read_bool():
+            reader.skip_bytes()
+        header['tx_count'] = reader.read_u32()
+        return header
+
+    @staticmethod
+    def get_tx_verifier() -> TxVerifier:
+        """Block.validate 에서 사용하는 tx 검증기, 처음 사용할 때 conf 설정으로 만든다."""
+        if Block.__tx_verifier is None:
+            Block.__tx_verifier = TxVerifier()
+        return Block.__tx_verifier
 
     @staticmethod
     def validate(block, tx_queue=None) -> bool:
@@ -254,14 +486,12 @@ class Block:
         if len(block.prev_block_hash) == 0:
             raise BlockError('Prev Block Hash not Exist')
 
-        # Transaction Validate
-        confirmed_tx_list = []
-        for tx in block.confirmed_transaction_list:
-            if Transaction.validate(tx):
-                confirmed_tx_list.append(tx.tx_hash)
-            else:
-                raise BlockInValidError(f"block ({block.block_hash}) validate fails \n"
-                                        f"tx {tx.tx_hash} is invalid")
+        # Transaction Validate (tx 가 많으면 여러 thread 에서 나누어 검증한다.)
+        invalid_index = Block.get_tx_verifier().find_first_invalid(block.confirmed_transaction_list)
+        if invalid_index >= 0:
+            raise BlockInValidError(f"block ({block.block_hash}) validate fails \n"
+                                    f"tx {block.confirmed_transaction_list[invalid_index].tx_hash} is invalid")
+        confirmed_tx_list = [tx.tx_hash for tx in block.confirmed_transaction_list]
 
         if tx_queue is not None:
             block.__tx_validate_with_queue(tx_queue, confirmed_tx_list)
@@ -286,7 +516,7 @@ class Block:
 
             for tx_unloaded in remain_tx:
                 ObjectManager().peer_service.channel_manager.get_block_manager(
-                    self.__channel_name).add_tx_unloaded(tx_unloaded)
+                    self.__channel_name).add_tx_unloaded(tx_unloaded, persist=False)
 
     def generate_block(self, prev_block=None):
         """블럭을 생성한다 \n
@@ -316,6 +546,19 @@ class Block:
 
         return self.block_hash
 
+    @staticmethod
+    def calculate_hash(block):
+        """block 의 tx 로 merkle tree root hash 를, header 로 block hash 를 다시 계산한다. block 은 바꾸지 않는다.
+        저장된 block 이 변조되지 않았는지 저장된 hash 와 비교할 때 사용한다.
+
+        :param block: deserialize 된 block
+        :return: (merkle tree root hash, block hash)
+        """
+        merkle_tree_root_hash = block.merkle_tree_root_hash
+        if len(block.confirmed_transaction_list) > 0:
+            merkle_tree_root_hash = block.__get_merkle_builder().root_hash()
+        return merkle_tree_root_hash, Block.__generate_hash(block)
+
     @staticmethod
     def __generate_hash(block):
         """Block Hash 생성 \n
@@ -348,31 +591,35 @@ class Block:
           *  block: 원래는 block header인데 따로 빼질 않아서 self를 return.
         """
 
-        nodes = [tx.get_tx_hash().encode(encoding='UTF-8') for tx in self.confirmed_transaction_list]
-        if len(nodes) % 2 and len(nodes) > 2:
-            nodes.append(nodes[-1])
-        layers = [nodes]
-
-        while len(nodes) > 1:
-            new_nodes = []
-            for i in range(0, len(nodes) - 1, 2):
-                new_nodes.append(
-                    hashlib.sha256(b''.join([nodes[i], nodes[i + 1]])).hexdigest().encode(encoding='UTF-8'))
-            if len(new_nodes) % 2 and len(new_nodes) > 2:
-                new_nodes.append(new_nodes[-1])
-            nodes = new_nodes
-            layers.append(nodes)
-        # Sanity check, make sure merkle root is valid
-        # assert nodes[0][::-1] == self.merkle_tree_root_hash
-        merkle_siblings = \
-            [layers[i][(index >> i) ^ 1] for i in range(len(layers)-1)]
+        merkle_siblings = self.__get_merkle_tree().siblings(index)
 
         return {
             "transaction": self.confirmed_transaction_list[index].get_tx_hash(),
-            "siblings": [x.decode('utf-8') for x in merkle_siblings],
+            "siblings": [x.hex() for x in merkle_siblings],
             "block": self
         }
 
+    def mk_merkle_multi_proof(self, tx_hashes):
+        """여러 Transaction 이 merkle tree root 에 포함됨을 한번에 증명하는 multi-proof 를 만든다.
+        각 tx 마다 mk_merkle_proof 를 부르는 것과 달리 tree 는 block 당 한번만 만들고, 공유되는 node 는 한번만 담는다.
+        검증은 loopchain.blockchain.merkle.verify_multi_proof 로 한다.
+
+        :param tx_hashes: 증명할 tx hash list, block 에 없는 tx 는 제외된다.
+        :return: {"leaf_count", "indexes", "nodes", "tx_hashes"} tx_hashes 는 indexes 순서
+        """
+        positions = self.__get_tx_index()
+        indexes = [positions[tx_hash] for tx_hash in tx_hashes if tx_hash in positions]
+
+        proof = self.__get_merkle_tree().multi_proof(indexes)
+        proof["tx_hashes"] = [self.confirmed_transaction_list[idx].get_tx_hash() for idx in proof["indexes"]]
+        return proof
+
+    def __get_merkle_tree(self) -> MerkleTree:
+        if self.__merkle_tree is None:
+            self.__merkle_tree = MerkleTree(
+                [bytes.fromhex(tx.get_tx_hash()) for tx in self.__confirmed_transaction_list])
+        return self.__merkle_tree
+
     @staticmethod
     def merkle_path(block, index):
         """머클트리 검증
@@ -0,0 +1,118 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""LRU cache of deserialized blocks"""
+
+import collections
+import threading
+
+from loopchain import configure as conf
+
+
+class BlockCache:
+    """ deserialize 된 Block 을 block hash 로 보관하는 LRU cache.
+
+    GetBlock, BlockSync, GetTx 는 최근 block 을 반복하여 읽으므로 level db Get 과 deserialize 를 줄인다.
+    크기는 block 의 serialize 된 bytes 합으로 capacity_bytes 까지 제한하며, height 로 찾을 수 있도록 height - hash index 를
+    같이 관리한다. 보관된 Block 은 여러 요청이 공유하므로 읽기 용도로만 사용해야 한다.
+    """
+
+    def __init__(self, capacity_bytes=None):
+        """
+        :param capacity_bytes: 보관할 block 의 serialize 된 bytes 합의 최대값, 0 이면 cache 를 사용하지 않는다.
+        """
+        self.__capacity_bytes = conf.BLOCK_CACHE_SIZE_BYTES if capacity_bytes is None else capacity_bytes
+        # block_hash - (block, size)
+        self.__blocks = collections.OrderedDict()
+        self.__hash_by_height = dict()
+        self.__size_bytes = 0
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def capacity_bytes(self):
+        return self.__capacity_bytes
+
+    def get_by_hash(self, block_hash):
+        """
+        :param block_hash: block hash (str)
+        :return: None or Block
+        """
+        with self.__lock:
+            return self.__get(block_hash)
+
+    def get_by_height(self, block_height):
+        """
+        :param block_height: int
+        :return: None or Block
+        """
+        with self.__lock:
+            return self.__get(self.__hash_by_height.get(block_height))
+
+    def put(self, block, size):
+        """
+        :param block: confirmed Block
+        :param size: block 의 serialize 된 bytes 길이
+        """
+        if size > self.__capacity_bytes:
+            return
+
+        with self.__lock:
+            if block.block_hash in self.__blocks:
+                self.__blocks.move_to_end(block.block_hash)
+                return
+
+            self.__blocks[block.block_hash] = (block, size)
+            self.__hash_by_height[block.height] = block.block_hash
+            self.__size_bytes += size
+
+            while self.__size_bytes > self.__capacity_bytes:
+                evicted_hash, (evicted_block, evicted_size) = self.__blocks.popitem(last=False)
+                if self.__hash_by_height.get(evicted_block.height) == evicted_hash:
+                    del self.__hash_by_height[evicted_block.height]
+                self.__size_bytes -= evicted_size
+                self.__evictions += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__blocks.clear()
+            self.__hash_by_height.clear()
+            self.__size_bytes = 0
+            self.__hits = 0
+            self.__misses = 0
+            self.__evictions = 0
+
+    def get_status(self) -> dict:
+        with self.__lock:
+            requests = self.__hits + self.__misses
+            return {
+                "size": len(self.__blocks),
+                "size_bytes": self.__size_bytes,
+                "capacity_bytes": self.__capacity_bytes,
+                "hit_rate": round(self.__hits / requests, 4) if requests > 0 else 0,
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "evictions": self.__evictions
+            }
+
+    def __get(self, block_hash):
+        cached = self.__blocks.get(block_hash) if block_hash is not None else None
+        if cached is None:
+            self.__misses += 1
+            return None
+
+        self.__blocks.move_to_end(block_hash)
+        self.__hits += 1
+        return cached[0]
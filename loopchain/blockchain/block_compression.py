@@ -0,0 +1,111 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Compressed envelope of serialized blocks
+
+layout: magic(LCZ) | codec(u8) | raw length(u64) | compressed block dump
+
+압축된 block 은 block db, segment file 에 그대로 저장하고 BlockSync 응답으로도 그대로 보낸다.
+magic 으로 시작하지 않는 dump 는 압축되지 않은 block (binary format or pickle) 이다.
+"""
+
+import lzma
+import struct
+import zlib
+from enum import IntEnum
+
+from loopchain import configure as conf
+from loopchain.blockchain.exception import BlockError
+
+BLOCK_COMPRESSED_MAGIC = b'LCZ'
+BLOCK_COMPRESSED_HEADER = struct.Struct('>BQ')
+
+
+class BlockCompression(IntEnum):
+    none = 0
+    zlib = 1
+    lzma = 2
+
+
+def is_compressed_block(block_dumps) -> bool:
+    return bytes(block_dumps[:len(BLOCK_COMPRESSED_MAGIC)]) == BLOCK_COMPRESSED_MAGIC
+
+
+def get_block_dump_size(block_dumps) -> int:
+    """압축된 block 이면 풀었을 때의 길이를 구한다. (BlockCache 의 크기 계산)"""
+    if is_compressed_block(block_dumps):
+        return BLOCK_COMPRESSED_HEADER.unpack_from(block_dumps, len(BLOCK_COMPRESSED_MAGIC))[1]
+    return len(block_dumps)
+
+
+def compress_block_dump(block_dump, compression=None, level=None) -> bytes:
+    """serialize 된 block 을 압축한다. 압축해도 작아지지 않으면 원래 dump 를 그대로 돌려준다.
+
+    :param block_dump: Block.serialize_block 의 결과
+    :param compression: BlockCompression or its name, None 이면 conf.BLOCK_COMPRESSION
+    :param level: 압축 level, None 이면 conf.BLOCK_COMPRESSION_LEVEL
+    :return: 압축된 block dump or block_dump
+    """
+    if compression is None:
+        compression = conf.BLOCK_COMPRESSION
+    if isinstance(compression, str):
+        compression = BlockCompression[compression]
+    if level is None:
+        level = conf.BLOCK_COMPRESSION_LEVEL
+
+    if compression is BlockCompression.zlib:
+        compressed = zlib.compress(block_dump, level)
+    elif compression is BlockCompression.lzma:
+        compressed = lzma.compress(block_dump, preset=level)
+    else:
+        return block_dump
+
+    header = BLOCK_COMPRESSED_MAGIC + BLOCK_COMPRESSED_HEADER.pack(compression, len(block_dump))
+    if len(header) + len(compressed) >= len(block_dump):
+        return block_dump
+    return header + compressed
+
+
+def decompress_block_dump(block_dumps, max_length=None):
+    """압축된 block 을 푼다. 압축되지 않은 dump 는 그대로 돌려준다.
+
+    :param block_dumps: block db 나 BlockSync 에서 받은 block dump
+    :param max_length: 앞쪽 max_length bytes 만 푼다. (block header 만 읽을 때)
+    :return: serialize 된 block (max_length 가 있으면 그 길이까지의 앞부분)
+    """
+    if not is_compressed_block(block_dumps):
+        return block_dumps
+
+    offset = len(BLOCK_COMPRESSED_MAGIC)
+    codec, raw_length = BLOCK_COMPRESSED_HEADER.unpack_from(block_dumps, offset)
+    compressed = memoryview(block_dumps)[offset + BLOCK_COMPRESSED_HEADER.size:]
+    try:
+        codec = BlockCompression(codec)
+        if codec is BlockCompression.zlib:
+            decompressor = zlib.decompressobj()
+        elif codec is BlockCompression.lzma:
+            decompressor = lzma.LZMADecompressor()
+        else:
+            raise ValueError(f"wrong codec({codec}) of compressed block")
+
+        if raw_length > conf.MAX_DECOMPRESSED_BLOCK_BYTES:
+            raise ValueError(f"compressed block length({raw_length}) is over ({conf.MAX_DECOMPRESSED_BLOCK_BYTES})")
+        if max_length is None or max_length >= raw_length:
+            # peer 가 보낸 dump 의 raw length 를 믿지 않고 그 보다 1 byte 더 풀어서 길이와 stream 의 끝을 확인한다.
+            block_dump = decompressor.decompress(compressed, raw_length + 1)
+            if len(block_dump) != raw_length or not decompressor.eof or decompressor.unused_data:
+                raise ValueError(f"decompressed block length is not ({raw_length})")
+            return block_dump
+        return decompressor.decompress(compressed, max_length)
+    except (ValueError, zlib.error, lzma.LZMAError) as e:
+        raise BlockError(f"can not decompress block: {e}")
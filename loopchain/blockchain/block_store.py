@@ -0,0 +1,134 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Append-only segment files for block bodies"""
+
+import logging
+import mmap
+import os
+import struct
+import threading
+
+from loopchain import configure as conf
+
+# block db 에 block 대신 기록하는 segment pointer 의 시작, block dump(binary: b'LCB', pickle: b'\x80') 와 구분된다.
+BLOCK_POINTER_MAGIC = b'LCS'
+BLOCK_POINTER = struct.Struct('>IQI')
+
+SEGMENT_FILE_FORMAT = "segment_{:06d}.dat"
+
+
+def encode_block_pointer(segment, offset, length) -> bytes:
+    return BLOCK_POINTER_MAGIC + BLOCK_POINTER.pack(segment, offset, length)
+
+
+def is_block_pointer(value) -> bool:
+    return bytes(value[:len(BLOCK_POINTER_MAGIC)]) == BLOCK_POINTER_MAGIC
+
+
+def decode_block_pointer(value):
+    """
+    :param value: encode_block_pointer 로 만든 bytes
+    :return: (segment, offset, length)
+    """
+    return BLOCK_POINTER.unpack_from(value, len(BLOCK_POINTER_MAGIC))
+
+
+class SegmentBlockStore:
+    """block body 를 append-only segment file 에 기록하고 mmap 으로 복사 없이 읽는다.
+
+    level db 에는 block hash - (segment, offset, length) pointer 만 남기므로 compaction 이 block body 를 다시 쓰지 않는다.
+    segment 는 segment_size 를 넘으면 다음 file 로 넘어가며, 기록된 내용은 바뀌지 않는다.
+    pointer 를 기록하기 전에 멈추면 segment 끝에 참조되지 않는 block 이 남을 수 있지만 읽는 데는 영향이 없다.
+    """
+
+    def __init__(self, path, segment_size=None, fsync=None, read_only=False):
+        """
+        :param path: segment file 을 둘 directory
+        :param segment_size: segment file 하나의 최대 크기 (bytes)
+        :param fsync: append 후 fsync 여부, pointer 보다 block body 가 먼저 disk 에 기록되도록 한다.
+        :param read_only: 이미 기록된 block 만 읽는다. (segment store 를 끈 뒤에도 이전 block 을 읽기 위해)
+        """
+        self.__path = path
+        self.__read_only = read_only
+        self.__segment_size = conf.BLOCK_SEGMENT_SIZE_BYTES if segment_size is None else segment_size
+        self.__fsync = conf.BLOCK_SEGMENT_FSYNC if fsync is None else fsync
+        self.__lock = threading.Lock()
+        # segment - mmap, 읽을 때 만들고 segment 가 커지면 다시 만든다.
+        self.__maps = {}
+
+        os.makedirs(self.__path, exist_ok=True)
+        segments = [int(name[8:14]) for name in os.listdir(self.__path)
+                    if name.startswith("segment_") and name.endswith(".dat")]
+        self.__segment = max(segments) if segments else 0
+        self.__file = None if read_only else open(self.__segment_path(self.__segment), 'ab')
+        logging.debug(f"open segment block store({self.__path}) segment({self.__segment}) read_only({read_only})")
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def read_only(self):
+        return self.__read_only
+
+    def __segment_path(self, segment):
+        return os.path.join(self.__path, SEGMENT_FILE_FORMAT.format(segment))
+
+    def append(self, block_dumps) -> bytes:
+        """block body 를 현재 segment 끝에 기록한다.
+
+        :param block_dumps: serialize 된 block
+        :return: block db 에 기록할 pointer
+        """
+        if self.__read_only:
+            raise IOError(f"segment block store({self.__path}) is read only")
+
+        with self.__lock:
+            offset = self.__file.tell()
+            if offset > 0 and offset + len(block_dumps) > self.__segment_size:
+                self.__file.close()
+                self.__segment += 1
+                self.__file = open(self.__segment_path(self.__segment), 'ab')
+                offset = 0
+
+            self.__file.write(block_dumps)
+            self.__file.flush()
+            if self.__fsync:
+                os.fsync(self.__file.fileno())
+
+            return encode_block_pointer(self.__segment, offset, len(block_dumps))
+
+    def read(self, block_pointer) -> memoryview:
+        """
+        :param block_pointer: append 가 돌려준 pointer
+        :return: segment mmap 의 block body (memoryview, 복사하지 않는다.)
+        """
+        segment, offset, length = decode_block_pointer(block_pointer)
+        with self.__lock:
+            segment_map = self.__maps.get(segment)
+            if segment_map is None or len(segment_map) < offset + length:
+                with open(self.__segment_path(segment), 'rb') as segment_file:
+                    segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.__maps[segment] = segment_map
+
+        if len(segment_map) < offset + length:
+            raise KeyError(f"block pointer is out of segment({segment}) offset({offset}) length({length})")
+        return memoryview(segment_map)[offset:offset + length]
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+            # 읽은 block 이 mmap 을 참조하고 있을 수 있으므로 mmap 은 참조가 없어질 때 닫힌다.
+            self.__maps.clear()
@@ -13,18 +13,31 @@
 # limitations under the License.
 """Block chain class with authorized blocks only"""
 
+import collections
 import json
-import leveldb
+import struct
+import threading
 
 from fluent import event
 
 import loopchain.utils as util
 from loopchain import configure as conf
 from loopchain.baseservice import ObjectManager
-from loopchain.blockchain import BlockStatus, Block
+from loopchain.blockchain import BlockStatus, Block, BlockCache
+from loopchain.blockchain.block_compression import compress_block_dump, is_compressed_block, get_block_dump_size
+from loopchain.blockchain.block_store import is_block_pointer
+from loopchain.blockchain.header_chain import HEADER_CHAIN_KEYS
+from loopchain.blockchain.tx_bloom_filter import TxBloomFilter
+from loopchain.blockchain.serializer import is_binary_block
 from loopchain.blockchain.exception import *
 from loopchain.blockchain.score_base import *
+from loopchain.blockchain.tx_index import TxResultPointer, encode_tx_index, decode_tx_index, is_legacy_tx_index, \
+    encode_invoke_result, decode_invoke_result
+from loopchain.blockchain.tx_meta_index import TxMetaIndex, TX_META_INDEX_STATE_KEY, TX_META_INDEX_STATE, \
+    MAX_TX_TIMESTAMP, TX_META_INDEX_LOCATION, get_tx_meta_indexes, get_tx_meta_values, tx_meta_index_prefix, \
+    encode_tx_meta_index_key, decode_tx_meta_index_entry, encode_tx_meta_index_cursor, decode_tx_meta_index_cursor
 from loopchain.protos import message_code
+from loopchain.store import create_key_value_store
 from loopchain.scoreservice import ScoreResponse
 
 
@@ -34,31 +47,62 @@ class BlockChain:
     UNCONFIRM_BLOCK_KEY = b'UNCONFIRM_BLOCK'
     LAST_BLOCK_KEY = b'last_block_key'
     BLOCK_HEIGHT_KEY = b'block_height_key'
+    CHAIN_META_KEY = b'chain_meta_key'
+    CUMULATIVE_TX_KEY = b'cumulative_tx_key'
+    INVOKE_RESULT_KEY = b'invoke_result_key'
 
-    def __init__(self, blockchain_db=None, channel_name=None):
+    # tx index 의 result pointer 가 success 인 tx 의 invoke result
+    SUCCESS_INVOKE_RESULT = {'code': int(ScoreResponse.SUCCESS)}
+
+    # chain meta 의 구조가 바뀌면 올린다. version 이 다른 meta 는 rebuild_blocks 로 다시 만든다.
+    CHAIN_META_SCHEMA_VERSION = 1
+    CUMULATIVE_TX_BYTES_LEN = 8
+
+    def __init__(self, blockchain_db=None, channel_name=None, block_store=None, consensus_wal=None, mempool=None,
+                 header_chain=None, tx_bloom_filter=None):
+        """
+        :param blockchain_db: block db (KeyValueStore)
+        :param channel_name: channel name
+        :param block_store: SegmentBlockStore, 있으면 block body 는 segment file 에 기록하고 block db 에는 pointer 만 남긴다.
+        :param consensus_wal: ConsensusWAL, 있으면 unconfirmed block 을 block db 의 UNCONFIRM_BLOCK_KEY 대신 wal 에 기록한다.
+        :param mempool: PersistentMempool, 있으면 block 을 추가할 때 commit 된 tx 를 mempool 에서 지운다.
+        :param header_chain: HeaderChain, 있으면 height 로 block hash, header 를 구할 때 db 를 읽지 않는다.
+        :param tx_bloom_filter: TxBloomFilter, 있으면 filter 에 없는 tx 는 db 를 읽지 않고 없다고 답한다.
+        """
         if channel_name is None:
             channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL
         self.__block_height = 0
         self.__last_block = None
+        self.__total_tx = 0
         self.__channel_name = channel_name
+        self.__block_cache = BlockCache()
+        self.__block_store = block_store
+        self.__consensus_wal = consensus_wal
+        self.__mempool = mempool
+        self.__header_chain = header_chain
+        self.__tx_bloom_filter = tx_bloom_filter
+        # rebuild_tx_bloom_filter 중에 추가되는 block 의 tx 도 새 filter 에 넣는다.
+        self.__rebuilding_tx_bloom_filter = None
+        self.__tx_bloom_filter_lock = threading.Lock()
+        self.__unconfirmed_block = None
 
         self.__peer_id = None
         if ObjectManager().peer_service is not None:
             self.__peer_id = ObjectManager().peer_service.peer_id
 
-        # block db has [ block_hash - block | block_height - block_hash | BlockChain.LAST_BLOCK_KEY - block_hash ]
+        # block db has [ block_hash - block (or segment pointer) | block_height - block_hash | BlockChain.LAST_BLOCK_KEY - block_hash |
+        #                block_height - cumulative tx count | BlockChain.CHAIN_META_KEY - chain meta |
+        #                tx_hash - tx index entry | tx_hash - compact invoke result (not success only) |
+        #                tx meta (peer_id, score_id, timestamp) - tx_hash (conf.TX_META_INDEXES only) ]
         self.__confirmed_block_db = blockchain_db
         # logging.debug(f"BlockChain::init confirmed_block_db({self.__confirmed_block_db})")
 
         if self.__confirmed_block_db is None:
-            try:
-                self.__confirmed_block_db = leveldb.LevelDB(conf.DEFAULT_LEVEL_DB_PATH)
-            except leveldb.LevelDBError:
-                raise leveldb.LevelDBError("Fail To Create Level DB(path): " + conf.DEFAULT_LEVEL_DB_PATH)
+            self.__confirmed_block_db = create_key_value_store(conf.DEFAULT_LEVEL_DB_PATH)
 
         # level DB에서 블럭을 읽어 들이며, 만약 levelDB에 블럭이 없을 경우 제네시스 블럭을 만든다
         try:
-            last_block_key = self.__confirmed_block_db.Get(BlockChain.LAST_BLOCK_KEY, True)
+            last_block_key = self.__confirmed_block_db.get(BlockChain.LAST_BLOCK_KEY)
         except KeyError:
             last_block_key = None
         logging.debug("LAST BLOCK KEY : %s", last_block_key)
@@ -66,17 +110,36 @@ class BlockChain:
         if last_block_key:
             # DB에서 마지막 블럭을 가져와서 last_block 에 바인딩
             self.__last_block = Block(channel_name=self.__channel_name)
-            block_dump = self.__confirmed_block_db.Get(last_block_key)
+            block_dump = self.__get_block_dump(last_block_key)
             self.__last_block.deserialize_block(block_dump)
+            self.__block_cache.put(self.__last_block, get_block_dump_size(block_dump))
             logging.debug("restore from last block hash(" + str(self.__last_block.block_hash) + ")")
             logging.debug("restore from last block height(" + str(self.__last_block.height) + ")")
+
+            # chain meta 가 없거나 last block 과 맞지 않으면 (이전 version 의 db) chain 을 순회하여 다시 만든다.
+            if not self.__load_chain_meta():
+                self.rebuild_blocks()
+            self.__tx_meta_index_heights = self.__load_tx_meta_index_state(self.__last_block.height + 1)
         else:
+            self.__tx_meta_index_heights = self.__load_tx_meta_index_state(0)
+            if self.__header_chain is not None:
+                self.__header_chain.truncate(0)
+            if self.__tx_bloom_filter is not None and self.__tx_bloom_filter.height != -1:
+                self.__tx_bloom_filter = TxBloomFilter(self.__tx_bloom_filter.path, load=False)
             # 제네시스 블럭 생성
             self.__add_genesisblock()
 
         # 블럭의 높이는 마지막 블럭의 높이와 같음
         self.__block_height = self.__last_block.height
 
+        if self.__header_chain is not None:
+            self.__sync_header_chain()
+        if self.__tx_bloom_filter is not None:
+            self.__sync_tx_bloom_filter()
+
+        if self.__consensus_wal is not None:
+            self.__restore_unconfirmed_block()
+
         # made block count as a leader
         self.__made_block_count = 0
 
@@ -88,6 +151,15 @@ class BlockChain:
     def last_block(self):
         return self.__last_block
 
+    @property
+    def block_cache(self):
+        return self.__block_cache
+
+    @property
+    def unconfirmed_block(self):
+        """consensus wal 을 사용할 때 투표 중인 unconfirmed block"""
+        return self.__unconfirmed_block
+
     @property
     def made_block_count(self):
         return self.__made_block_count
@@ -98,24 +170,27 @@ class BlockChain:
     def reset_made_block_count(self):
         self.__made_block_count = 0
 
+    @property
+    def total_tx(self):
+        return self.__total_tx
+
     def rebuild_blocks(self):
-        # Genesis block 까지 순회하며 Block 정보를 복원한다.
+        """Genesis block 까지 순회하며 height 별 누적 tx 수와 chain meta 를 다시 기록한다.
+        chain meta 가 없는 이전 version 의 db 를 migration 할 때만 사용한다.
+
+        :return: total_tx
+        """
         logging.info("re-build blocks from DB....")
 
-        block = Block(channel_name=self.__channel_name)
-        prev_block_hash = self.__last_block.block_hash
+        tx_counts = self.__count_block_txs()
+        batch = self.__confirmed_block_db.write_batch()
         total_tx = 0
-
-        while prev_block_hash != "":
-            block_dump = self.__confirmed_block_db.Get(prev_block_hash.encode(encoding='UTF-8'))
-            block.deserialize_block(block_dump)
-
-            # Rebuild Block 코드 구간. 현재는 total_tx 만 구하고 있음
-            # TODO 향후에도 rebuild_blocks가 total_tx만 구하는 경우 이 로직은 제거 하고 total_tx 는 다른 방식으로 구하도록 한다.
-            # logging.debug("re-build block: " + str(block.block_hash))
-            total_tx += block.confirmed_transaction_list.__len__()
-
-            prev_block_hash = block.prev_block_hash
+        for height, tx_count in enumerate(tx_counts):
+            total_tx += tx_count
+            self.__put_cumulative_tx_to_batch(batch, height, total_tx)
+        self.__put_chain_meta_to_batch(batch, self.__last_block, total_tx)
+        batch.write()
+        self.__total_tx = total_tx
 
         logging.info("rebuilt blocks, total_tx: " + str(total_tx))
         logging.info("block hash("
@@ -125,54 +200,466 @@ class BlockChain:
 
         return total_tx
 
+    def verify_chain_meta(self):
+        """Genesis block 까지 순회하며 chain meta 와 height 별 누적 tx 수가 실제 block 과 맞는지 확인한다.
+        peer 시작을 늦추지 않도록 background 에서 실행한다.
+
+        :return: 모두 일치하면 True
+        """
+        tx_counts = self.__count_block_txs()
+        total_tx = 0
+        for height, tx_count in enumerate(tx_counts):
+            total_tx += tx_count
+            if self.find_total_tx_by_height(height) != total_tx:
+                logging.error(f"chain meta mismatch at height({height}) channel({self.__channel_name})")
+                return False
+
+        if self.__total_tx != total_tx:
+            logging.error(f"chain meta mismatch total_tx({self.__total_tx}) != ({total_tx}) "
+                          f"channel({self.__channel_name})")
+            return False
+
+        logging.info(f"chain meta verified, height({self.__block_height}) total_tx({total_tx})")
+        return True
+
+    def find_total_tx_by_height(self, block_height):
+        """genesis 부터 block_height 까지의 누적 tx 수를 구한다.
+
+        :param block_height: int
+        :return: None or int
+        """
+        try:
+            cumulative_tx = self.__confirmed_block_db.get(
+                BlockChain.CUMULATIVE_TX_KEY + block_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'))
+        except KeyError:
+            return None
+        return int.from_bytes(cumulative_tx, byteorder='big')
+
+    def __count_block_txs(self):
+        """마지막 block 부터 genesis 까지 순회하며 height 순서의 tx 수 list 를 만든다."""
+        block = Block(channel_name=self.__channel_name)
+        prev_block_hash = self.__last_block.block_hash
+        tx_counts = [0] * (self.__last_block.height + 1)
+
+        while prev_block_hash != "":
+            block_dump = self.__get_block_dump(prev_block_hash.encode(encoding='UTF-8'))
+            block.deserialize_block(block_dump)
+            tx_counts[block.height] = len(block.confirmed_transaction_list)
+            prev_block_hash = block.prev_block_hash
+
+        return tx_counts
+
+    def __load_chain_meta(self):
+        """저장된 chain meta 로 total_tx 를 복원한다.
+
+        :return: meta 가 있고 last block 과 일치하면 True
+        """
+        try:
+            chain_meta = json.loads(self.__confirmed_block_db.get(BlockChain.CHAIN_META_KEY).decode(
+                encoding=conf.PEER_DATA_ENCODING))
+        except KeyError:
+            logging.info(f"there is no chain meta channel({self.__channel_name})")
+            return False
+
+        if chain_meta.get('schema_version') != BlockChain.CHAIN_META_SCHEMA_VERSION:
+            logging.info(f"chain meta schema version({chain_meta.get('schema_version')}) is changed")
+            return False
+        if chain_meta['block_hash'] != self.__last_block.block_hash \
+                or chain_meta['height'] != self.__last_block.height:
+            logging.warning(f"chain meta does not match last block({self.__last_block.block_hash})")
+            return False
+
+        self.__total_tx = chain_meta['total_tx']
+        logging.debug(f"restore chain meta height({chain_meta['height']}) total_tx({self.__total_tx})")
+        return True
+
+    @staticmethod
+    def encode_chain_meta(block_hash, block_height, total_tx) -> bytes:
+        """CHAIN_META_KEY 에 기록하는 chain meta 를 만든다.
+
+        :param block_hash: 마지막 block 의 hash
+        :param block_height: 마지막 block 의 height
+        :param total_tx: genesis 부터 마지막 block 까지의 tx 수
+        :return: bytes
+        """
+        chain_meta = {
+            'schema_version': BlockChain.CHAIN_META_SCHEMA_VERSION,
+            'block_hash': block_hash,
+            'height': block_height,
+            'total_tx': total_tx
+        }
+        return json.dumps(chain_meta).encode(encoding=conf.PEER_DATA_ENCODING)
+
+    def __put_chain_meta_to_batch(self, batch, last_block, total_tx):
+        batch.put(BlockChain.CHAIN_META_KEY,
+                  BlockChain.encode_chain_meta(last_block.block_hash, last_block.height, total_tx))
+
+    def __put_cumulative_tx_to_batch(self, batch, block_height, total_tx):
+        batch.put(
+            BlockChain.CUMULATIVE_TX_KEY + block_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'),
+            total_tx.to_bytes(BlockChain.CUMULATIVE_TX_BYTES_LEN, byteorder='big'))
+
+    def __get_block_dump(self, block_key):
+        """block db 에서 serialize 된 block 을 읽는다. segment pointer 가 기록되어 있으면 block store 에서 읽는다.
+
+        :param block_key: encoding 된 block hash
+        :return: block dump (bytes or memoryview)
+        """
+        block_dump = self.__confirmed_block_db.get(block_key)
+        if is_block_pointer(block_dump):
+            if self.__block_store is None:
+                raise KeyError(f"block({block_key}) is in segment block store but block store is not opened")
+            block_dump = self.__block_store.read(block_dump)
+        return block_dump
+
     def __find_block_by_key(self, key):
         block = Block(channel_name=self.__channel_name)
 
         try:
-            block_bytes = self.__confirmed_block_db.Get(key)
+            block_bytes = self.__get_block_dump(key)
             block.deserialize_block(block_bytes)
+            self.__block_cache.put(block, get_block_dump_size(block_bytes))
         except KeyError:
             block = None
 
         return block
 
+    def find_block_dump_by_hash(self, block_hash):
+        """BlockSync 로 보낼 block dump 를 deserialize 하지 않고 저장된 bytes 그대로 (압축된 block 은 압축된 채로) 구한다.
+        pickle 로 저장된 이전 version 의 block 은 binary format 으로 다시 serialize 한다.
+
+        :param block_hash: plain string
+        :return: None or block dump (bytes)
+        """
+        try:
+            block_dump = self.__get_block_dump(block_hash.encode(encoding='UTF-8'))
+        except KeyError:
+            return None
+
+        if not is_compressed_block(block_dump) and not is_binary_block(block_dump):
+            block = Block(channel_name=self.__channel_name)
+            block.deserialize_block(block_dump)
+            return block.serialize_block()
+        return bytes(block_dump)
+
     def find_block_by_hash(self, block_hash):
         """블럭체인 해쉬 키로 해당 블럭을 찾음
+        block cache 에 있으면 db 를 읽지 않는다. 반환된 block 은 cache 와 공유하므로 수정하지 않아야 한다.
 
         :param block_hash: plain string,
         key 로 사용되기전에 함수내에서 encoding 되므로 미리 encoding 된 key를 parameter 로 사용해선 안된다.
         :return: None or Block
         """
+        block = self.__block_cache.get_by_hash(block_hash)
+        if block is not None:
+            return block
         return self.__find_block_by_key(block_hash.encode(encoding='UTF-8'))
 
     def find_block_by_height(self, block_height):
         """find block by its height
+        use block cache if block of the height is cached.
 
         :param block_height: int,
         it convert to key of blockchain db in this method so don't try already converted key.
         :return None or Block
         """
-        key = self.__confirmed_block_db.Get(BlockChain.BLOCK_HEIGHT_KEY +
+        block = self.__block_cache.get_by_height(block_height)
+        if block is not None:
+            return block
+        block_hash = None if self.__header_chain is None else self.__header_chain.get_block_hash(block_height)
+        if block_hash is not None:
+            return self.__find_block_by_key(block_hash.encode(encoding='UTF-8'))
+        key = self.__confirmed_block_db.get(BlockChain.BLOCK_HEIGHT_KEY +
                                             block_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'))
         return self.__find_block_by_key(key)
 
+    def find_block_hash_by_height(self, block_height):
+        """height 의 block hash 를 구한다. header chain 이 있으면 db 를 읽지 않는다.
+
+        :param block_height: int
+        :return: None or block hash
+        """
+        if self.__header_chain is not None and block_height <= self.__header_chain.height:
+            return self.__header_chain.get_block_hash(block_height)
+        try:
+            block_key = self.__confirmed_block_db.get(
+                BlockChain.BLOCK_HEIGHT_KEY + block_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'))
+        except (KeyError, OverflowError):
+            return None
+        return bytes(block_key).decode(encoding='UTF-8')
+
+    def find_header_by_height(self, block_height):
+        """height 의 block header 를 구한다. header chain 이 있으면 db 를 읽지 않는다.
+
+        :param block_height: int
+        :return: None or header dict, key 는 HEADER_CHAIN_KEYS
+        """
+        if self.__header_chain is not None and block_height <= self.__header_chain.height:
+            return self.__header_chain.get_header(block_height)
+        block_hash = self.find_block_hash_by_height(block_height)
+        return None if block_hash is None else self.find_header_by_hash(block_hash)
+
+    def find_header_by_hash(self, block_hash):
+        """block hash 의 block header 를 구한다. block 을 deserialize 하지 않고 header 만 읽는다.
+
+        :param block_hash: plain string
+        :return: None or header dict, key 는 HEADER_CHAIN_KEYS
+        """
+        block = self.__block_cache.get_by_hash(block_hash)
+        if block is not None:
+            header = block.get_header()
+        else:
+            try:
+                header = Block.read_header(self.__get_block_dump(block_hash.encode(encoding='UTF-8')))
+            except KeyError:
+                return None
+        return {key: header[key] for key in HEADER_CHAIN_KEYS}
+
+    def find_block_height_by_time(self, time_stamp):
+        """time_stamp 또는 그 이전에 만들어진 마지막 block 의 height 를 binary search 로 구한다.
+        block time stamp 는 chain 에서 height 순서로 증가하므로 header chain 이 있으면 db 를 읽지 않고,
+        없으면 height index 와 header 를 log2(block height) 번 읽는다.
+
+        :param time_stamp: block time stamp (micro seconds)
+        :return: None or block height, time_stamp 보다 이전의 block 이 없으면 None
+        """
+        block_height = self.__block_height
+        if self.__header_chain is not None and self.__header_chain.height >= block_height:
+            get_time_stamp = self.__header_chain.get_time_stamp
+        else:
+            def get_time_stamp(height):
+                return self.find_header_by_height(height)['time_stamp']
+
+        # time stamp 가 time_stamp 보다 큰 첫 block 을 찾는다.
+        low, high = 0, block_height + 1
+        while low < high:
+            middle = (low + high) // 2
+            if get_time_stamp(middle) <= time_stamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1 if low > 0 else None
+
+    def find_header_by_time(self, time_stamp):
+        """time_stamp 또는 그 이전에 만들어진 마지막 block 의 header 를 구한다.
+
+        :param time_stamp: block time stamp (micro seconds)
+        :return: None or header dict, key 는 HEADER_CHAIN_KEYS
+        """
+        block_height = self.find_block_height_by_time(time_stamp)
+        return None if block_height is None else self.find_header_by_height(block_height)
+
+    def find_block_by_time(self, time_stamp):
+        """time_stamp 또는 그 이전에 만들어진 마지막 block 을 구한다.
+
+        :param time_stamp: block time stamp (micro seconds)
+        :return: None or Block
+        """
+        block_height = self.find_block_height_by_time(time_stamp)
+        return None if block_height is None else self.find_block_by_height(block_height)
+
+    def __sync_header_chain(self):
+        """header chain 을 block db 의 chain 에 맞춘다.
+        header file 이 chain 보다 길거나 (db 를 snapshot 으로 바꾼 경우) 마지막 header 가 db 와 다르면 잘라내고,
+        모자란 header 는 db 에서 header 만 읽어 채운다.
+        """
+        header_chain = self.__header_chain
+        header_chain.truncate(self.__block_height + 1)
+        if header_chain.height >= 0:
+            try:
+                block_key = self.__confirmed_block_db.get(
+                    BlockChain.BLOCK_HEIGHT_KEY +
+                    header_chain.height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'))
+            except KeyError:
+                block_key = b''
+            if bytes(block_key).decode(encoding='UTF-8') != header_chain.get_block_hash(header_chain.height):
+                logging.warning(f"header chain({header_chain.path}) does not match block db, rebuild it")
+                header_chain.truncate(0)
+
+        if header_chain.height < self.__block_height:
+            start_height = header_chain.height + 1
+            headers = []
+            for header in self.iter_blocks(start_height, headers_only=True):
+                headers.append(header)
+                if len(headers) >= conf.MAX_BLOCK_HEADERS_PER_REQUEST:
+                    header_chain.append(headers)
+                    headers = []
+            header_chain.append(headers)
+            logging.info(f"header chain({header_chain.path}) is filled from height({start_height}) "
+                         f"to ({header_chain.height})")
+
+    def iter_blocks(self, start_height, end_height=None, headers_only=False):
+        """height 가 [start_height, end_height) 인 block 을 height 순서로 하나씩 돌려준다.
+        height index 를 range_iter 로 한번에 훑으므로 height 마다 index 를 point lookup 하지 않으며,
+        range_iter 는 시작 시점의 snapshot 을 읽으므로 iteration 중 추가되는 block 은 보이지 않는다.
+        range scan 이 block cache 를 밀어내지 않도록 읽은 block 은 cache 에 넣지 않는다.
+
+        :param start_height: 시작 height (포함)
+        :param end_height: 끝 height (제외), None 이면 마지막 block 까지
+        :param headers_only: True 이면 Block 대신 Block.read_header 의 dict 를 돌려준다.
+        :return: generator of Block or header dict
+        """
+        if end_height is None or end_height > self.__block_height + 1:
+            end_height = self.__block_height + 1
+        start_height = max(start_height, 0)
+        if start_height >= end_height:
+            return
+
+        height_keys = self.__confirmed_block_db.range_iter(
+            key_from=BlockChain.BLOCK_HEIGHT_KEY + start_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'),
+            key_to=BlockChain.BLOCK_HEIGHT_KEY + (end_height - 1).to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'),
+            include_value=True)
+
+        for height_key, block_key in height_keys:
+            block_height = int.from_bytes(height_key[len(BlockChain.BLOCK_HEIGHT_KEY):], byteorder='big')
+            block = self.__block_cache.get_by_height(block_height)
+            if block is not None:
+                yield block.get_header() if headers_only else block
+                continue
+
+            block_dump = self.__get_block_dump(bytes(block_key))
+            if headers_only:
+                yield Block.read_header(block_dump)
+            else:
+                block = Block(channel_name=self.__channel_name)
+                block.deserialize_block(block_dump)
+                yield block
+
     def add_block(self, block: Block):
         """인증된 블럭만 추가합니다.
+        block 과 height index, tx index 는 하나의 WriteBatch 로 기록하므로 일부만 기록되는 경우가 없다.
 
         :param block: 인증완료된 추가하고자 하는 블럭
         :return:
         """
+        return self.add_blocks([block])
+
+    def add_blocks(self, blocks: list, invoke_results_list: list=None):
+        """연속된 인증 블럭들을 한번의 WriteBatch 로 추가한다. (block height sync 의 group commit)
+        score invoke 는 block 순서대로 실행하고, db 기록은 모든 block 의 invoke 가 끝난 뒤 한번에 한다.
+        block 을 batch 에 담다가 exception 이 나면 그 앞의 invoke 된 block 들은 기록하고 exception 을 다시 낸다.
+        (score 가 chain 보다 앞서는 것은 block 하나로 add_block 과 같다.)
+        다만 batch 를 기록하기 전에 process 가 죽으면 score 는 최대 blocks 개 만큼 chain 보다 앞서게 된다.
+
+        :param blocks: 높이 순서로 연결된 인증완료 블럭 list
+        :param invoke_results_list: block 별 invoke 결과, 있으면 score 를 invoke 하지 않고 그대로 기록한다. (snapshot import)
+        :return:
+        """
         # util.logger.spam(f"blockchain:add_block --start--")
-        if block.block_status is not BlockStatus.confirmed:
-            raise BlockInValidError("미인증 블럭")
-        elif self.__last_block is not None and self.__last_block.height > 0:
-            if self.__last_block.block_hash != block.prev_block_hash:
-                # 마지막 블럭의 hash값이 추가되는 블럭의 prev_hash값과 다르면 추가 하지 않고 익셉션을 냅니다.
-                logging.debug("self.last_block.block_hash: " + self.__last_block.block_hash)
-                logging.debug("block.prev_block_hash: " + block.prev_block_hash)
-                raise BlockError("최종 블럭과 해쉬값이 다릅니다.")
-
-        # util.logger.spam(f"blockchain:add_block --1-- {block.prev_block_hash}, {block.height}")
+        if len(blocks) == 0:
+            return True
+
+        last_block = self.__last_block
+        for block in blocks:
+            if block.block_status is not BlockStatus.confirmed:
+                raise BlockInValidError("미인증 블럭")
+            elif last_block is not None and last_block.height > 0:
+                if last_block.block_hash != block.prev_block_hash:
+                    # 마지막 블럭의 hash값이 추가되는 블럭의 prev_hash값과 다르면 추가 하지 않고 익셉션을 냅니다.
+                    logging.debug("self.last_block.block_hash: " + last_block.block_hash)
+                    logging.debug("block.prev_block_hash: " + block.prev_block_hash)
+                    raise BlockError("최종 블럭과 해쉬값이 다릅니다.")
+            last_block = block
+
+        if invoke_results_list is None:
+            invoke_results_list = []
+            invoke_scores = True
+        else:
+            invoke_scores = False
+        batch = self.__confirmed_block_db.write_batch()
+        block_sizes = []
+        total_tx = self.__total_tx
+        try:
+            for block in blocks:
+                # util.logger.spam(f"blockchain:add_block --1-- {block.prev_block_hash}, {block.height}")
+                if invoke_scores:
+                    invoke_results_list.append(self.__invoke_block(block))
+
+                # util.logger.spam(f"blockchain:add_block --2--")
+                block_size = self.__put_block_to_batch(batch, block, invoke_results_list[len(block_sizes)])
+                total_tx += len(block.confirmed_transaction_list)
+                self.__put_cumulative_tx_to_batch(batch, block.height, total_tx)
+                block_sizes.append(block_size)
+        except Exception as e:
+            # 실패한 block 의 일부가 담긴 batch 는 버리고, 앞의 invoke 된 block 들만 다시 담아 기록한다.
+            written_count = len(block_sizes)
+            logging.error(f"fail to put block({blocks[written_count].height}) to batch: {e}, "
+                          f"write {written_count} invoked blocks")
+            if written_count > 0:
+                self.__write_invoked_blocks(blocks[:written_count], invoke_results_list[:written_count])
+            raise
+
+        self.__write_blocks(batch, blocks, block_sizes, total_tx)
+        return True
+
+    def __write_invoked_blocks(self, blocks, invoke_results_list):
+        """invoke 가 끝난 block 들을 새 batch 에 담아 기록한다.
+
+        :param blocks: 높이 순서로 연결된 인증완료 블럭 list
+        :param invoke_results_list: block 별 invoke 결과 list
+        """
+        batch = self.__confirmed_block_db.write_batch()
+        block_sizes = []
+        total_tx = self.__total_tx
+        for block, invoke_results in zip(blocks, invoke_results_list):
+            block_sizes.append(self.__put_block_to_batch(batch, block, invoke_results))
+            total_tx += len(block.confirmed_transaction_list)
+            self.__put_cumulative_tx_to_batch(batch, block.height, total_tx)
+        self.__write_blocks(batch, blocks, block_sizes, total_tx)
+
+    def __write_blocks(self, batch, blocks, block_sizes, total_tx):
+        """block 들이 담긴 batch 에 마지막 block 과 chain meta 를 담아 기록하고, memory 의 chain 상태를 갱신한다.
+
+        :param batch: blocks 가 담긴 KeyValueStoreWriteBatch
+        :param blocks: 높이 순서로 연결된 인증완료 블럭 list
+        :param block_sizes: block 별 serialize 된 bytes 길이
+        :param total_tx: 마지막 block 까지의 누적 tx 수
+        """
+        last_block = blocks[-1]
+        batch.put(BlockChain.LAST_BLOCK_KEY, last_block.block_hash.encode(encoding='UTF-8'))
+        self.__put_chain_meta_to_batch(batch, last_block, total_tx)
+        batch.write()
+
+        self.__last_block = last_block
+        self.__block_height = self.__last_block.height
+        self.__total_tx = total_tx
+
+        if self.__header_chain is not None:
+            try:
+                self.__header_chain.append([block.get_header() for block in blocks])
+            except ValueError as e:
+                logging.warning(f"can not append header to header chain: {e}")
+                self.__sync_header_chain()
+        if self.__tx_bloom_filter is not None:
+            self.__add_to_tx_bloom_filter(blocks)
+        if self.__mempool is not None:
+            self.__mempool.prune([tx.tx_hash for block in blocks for tx in block.confirmed_transaction_list],
+                                 last_block.height)
+        if self.__consensus_wal is not None:
+            self.__consensus_wal.write_commit(last_block.block_hash, last_block.height)
+            if self.__unconfirmed_block is not None and self.__unconfirmed_block.height <= last_block.height:
+                self.__unconfirmed_block = None
+
+        for block, block_size in zip(blocks, block_sizes):
+            self.__block_cache.put(block, block_size)
+            # logging.debug("ADD BLOCK Height : %i", block.height)
+            # logging.debug("ADD BLOCK Hash : %s", block.block_hash)
+            # logging.debug("ADD BLOCK MERKLE TREE Hash : %s", block.merkle_tree_root_hash)
+            # logging.debug("ADD BLOCK Prev Hash : %s ", block.prev_block_hash)
+            logging.info("ADD BLOCK HEIGHT : %i , HASH : %s", block.height, block.block_hash)
+            # 블럭의 Transaction 의 데이터를 저장 합니다.
+            # Peer에서 Score를 파라미터로 넘김으로써 체인코드를 실행합니다.
+
+            # util.logger.spam(f"blockchain:add_block --end--")
+
+            util.apm_event(self.__peer_id, {
+                'event_type': 'AddBlock',
+                'peer_id': self.__peer_id,
+                'data': {
+                    'block_height': block.height,
+                    'block_type': block.block_type.name}})
+
+    def __invoke_block(self, block):
         if block.height == 0 or ObjectManager().peer_service is None:
             # all results to success
             success_result = {'code': int(message_code.Response.success)}
@@ -189,41 +676,140 @@ class BlockChain:
                 invoke_results = self.__create_invoke_result_specific_case(block.confirmed_transaction_list
                                                                            , score_container_exception_result)
 
-        # util.logger.spam(f"blockchain:add_block --2--")
-        self.__add_tx_to_block_db(block, invoke_results)
+        return invoke_results
+
+    def __put_block_to_batch(self, batch, block, invoke_results):
+        """block, height index, tx index 를 batch 에 담는다.
 
-        block_hash_encoded = block.block_hash.encode(encoding='UTF-8')
+        :param batch: KeyValueStoreWriteBatch
+        :param block: 추가할 block
+        :param invoke_results: tx_hash 별 score invoke 결과
+        :return: serialize 된 block 의 bytes 길이
+        """
+        self.__add_tx_to_block_db(batch, block, invoke_results)
 
-        batch = leveldb.WriteBatch()
-        batch.Put(block_hash_encoded, block.serialize_block())
-        batch.Put(BlockChain.LAST_BLOCK_KEY, block_hash_encoded)
-        batch.Put(
+        block_hash_encoded = block.block_hash.encode(encoding='UTF-8')
+        block_dump = block.serialize_block()
+        stored_dump = compress_block_dump(block_dump)
+        if self.__block_store is None or self.__block_store.read_only:
+            batch.put(block_hash_encoded, stored_dump)
+        else:
+            batch.put(block_hash_encoded, self.__block_store.append(stored_dump))
+        batch.put(
             BlockChain.BLOCK_HEIGHT_KEY +
             block.height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'),
             block_hash_encoded)
-        self.__confirmed_block_db.Write(batch)
-
-        self.__last_block = block
-        self.__block_height = self.__last_block.height
-
-        # logging.debug("ADD BLOCK Height : %i", block.height)
-        # logging.debug("ADD BLOCK Hash : %s", block.block_hash)
-        # logging.debug("ADD BLOCK MERKLE TREE Hash : %s", block.merkle_tree_root_hash)
-        # logging.debug("ADD BLOCK Prev Hash : %s ", block.prev_block_hash)
-        logging.info("ADD BLOCK HEIGHT : %i , HASH : %s", block.height, block.block_hash)
-        # 블럭의 Transaction 의 데이터를 저장 합니다.
-        # Peer에서 Score를 파라미터로 넘김으로써 체인코드를 실행합니다.
+        return len(block_dump)
 
-        # util.logger.spam(f"blockchain:add_block --end--")
+    def __load_tx_meta_index_state(self, next_height):
+        """conf.TX_META_INDEXES 의 index 가 block height 몇 부터 기록되어 있는지 읽는다.
+        처음 켜진 index 는 다음 block 부터 기록하며, 꺼진 index 는 그 사이의 block 이 빠지므로 state 를 지운다.
 
-        util.apm_event(self.__peer_id, {
-            'event_type': 'AddBlock',
-            'peer_id': self.__peer_id,
-            'data': {
-                'block_height': self.__block_height,
-                'block_type': block.block_type.name}})
+        :param next_height: 다음에 추가될 block 의 height
+        :return: {TxMetaIndex: 기록이 시작된 block height}
+        """
+        enabled_indexes = get_tx_meta_indexes(conf.TX_META_INDEXES)
+        index_heights = {}
+        for index in TxMetaIndex:
+            state_key = TX_META_INDEX_STATE_KEY + bytes([index])
+            try:
+                from_height = TX_META_INDEX_STATE.unpack(self.__confirmed_block_db.get(state_key))[0]
+            except KeyError:
+                from_height = None
+
+            if index not in enabled_indexes:
+                if from_height is not None:
+                    logging.warning(f"tx meta index({index.name}) is disabled, backfill it when enable again")
+                    self.__confirmed_block_db.delete(state_key)
+                continue
+
+            if from_height is None:
+                from_height = next_height
+                self.__confirmed_block_db.put(state_key, TX_META_INDEX_STATE.pack(from_height))
+            index_heights[index] = from_height
+        return index_heights
+
+    def get_tx_meta_index_height(self, index: TxMetaIndex):
+        """
+        :param index: TxMetaIndex
+        :return: index 가 기록되어 있는 첫 block height (0 이면 모든 block), 꺼진 index 는 None
+        """
+        return self.__tx_meta_index_heights.get(index)
 
-        return True
+    def __put_tx_meta_index_to_batch(self, batch, tx, tx_hash_encoded, block_height, tx_position, indexes):
+        """
+        :return: batch 에 담은 index entry 수
+        """
+        values = get_tx_meta_values(tx, indexes)
+        for index, value in values:
+            batch.put(encode_tx_meta_index_key(index, value, tx.get_timestamp(), block_height, tx_position),
+                      tx_hash_encoded)
+        return len(values)
+
+    def find_txs_by_meta(self, index: TxMetaIndex, value=None, time_from=None, time_to=None, cursor=None,
+                         limit=conf.MAX_TXS_PER_META_QUERY):
+        """tx meta index 에서 value 가 같은 tx 를 timestamp 순서로 한 page(limit) 씩 구한다.
+
+        :param index: TxMetaIndex
+        :param value: peer_id or score_id (time index 는 사용하지 않음)
+        :param time_from: tx timestamp 의 시작 (포함, microseconds)
+        :param time_to: tx timestamp 의 끝 (제외, microseconds)
+        :param cursor: 이전 page 의 next_cursor
+        :param limit: 한 page 의 최대 tx 수
+        :return: (list of TxMetaIndexEntry, 다음 page 의 cursor or None)
+        """
+        if index not in self.__tx_meta_index_heights:
+            raise BlockchainError(f"tx meta index({index.name}) is not enabled")
+        if index is not TxMetaIndex.time and value is None:
+            raise ValueError(f"tx meta index({index.name}) needs value")
+
+        prefix = tx_meta_index_prefix(index, value)
+        if cursor is not None:
+            key_from = prefix + decode_tx_meta_index_cursor(cursor)
+        else:
+            key_from = prefix + TX_META_INDEX_LOCATION.pack(time_from or 0, 0, 0)
+        if time_to is None:
+            key_to = prefix + b'\xff' * TX_META_INDEX_LOCATION.size
+        elif time_to <= 0:
+            return [], None
+        else:
+            key_to = prefix + TX_META_INDEX_LOCATION.pack(min(time_to, MAX_TX_TIMESTAMP + 1) - 1,
+                                                          2 ** 64 - 1, 2 ** 32 - 1)
+
+        entries = []
+        for key, tx_hash in self.__confirmed_block_db.range_iter(key_from=key_from, key_to=key_to,
+                                                                 include_value=True):
+            if len(entries) == limit:
+                return entries, encode_tx_meta_index_cursor(prefix, key)
+            entries.append(decode_tx_meta_index_entry(prefix, key, tx_hash))
+        return entries, None
+
+    def backfill_tx_meta_index(self):
+        """index 를 켜기 전에 추가된 block 의 tx 를 tx meta index 에 기록한다.
+        block 단위로 WriteBatch 를 기록하고 모두 끝난 뒤 state 를 0 으로 바꾸므로 중간에 멈춰도 다시 실행하면 된다.
+
+        :return: 기록한 index entry 수
+        """
+        end_height = max(self.__tx_meta_index_heights.values(), default=0)
+        backfilled = 0
+        for block in self.iter_blocks(0, end_height):
+            indexes = [index for index, from_height in self.__tx_meta_index_heights.items()
+                       if block.height < from_height]
+            batch = self.__confirmed_block_db.write_batch()
+            for tx_position, tx in enumerate(block.confirmed_transaction_list):
+                tx_hash_encoded = tx.get_tx_hash().encode(encoding=conf.HASH_KEY_ENCODING)
+                backfilled += self.__put_tx_meta_index_to_batch(batch, tx, tx_hash_encoded, block.height,
+                                                                tx_position, indexes)
+            batch.write()
+
+        batch = self.__confirmed_block_db.write_batch()
+        for index in self.__tx_meta_index_heights:
+            batch.put(TX_META_INDEX_STATE_KEY + bytes([index]), TX_META_INDEX_STATE.pack(0))
+            self.__tx_meta_index_heights[index] = 0
+        batch.write()
+
+        logging.info(f"backfilled tx meta index to height({end_height}) channel({self.__channel_name})")
+        return backfilled
 
     def __create_invoke_result_specific_case(self, confirmed_transaction_list, invoke_result):
         invoke_results = {}
@@ -231,25 +817,124 @@ class BlockChain:
             invoke_results[tx.get_tx_hash()] = invoke_result
         return invoke_results
 
-    def __add_tx_to_block_db(self, block, invoke_results):
-        """block db 에 block_hash - block_object 를 저장할때, tx_hash - block_hash 를 저장한다.
-        get tx by tx_hash 시 해당 block 을 효율적으로 찾기 위해서
+    def __add_tx_to_block_db(self, batch, block, invoke_results):
+        """block db 에 block_hash - block_object 를 저장할때, tx_hash - tx index entry 를 저장한다.
+        tx index entry 는 (block height, block 안의 tx 위치, result pointer) 이므로 tx 를 block 에서 바로 읽을 수 있다.
+        success 가 아닌 invoke result 만 INVOKE_RESULT_KEY + tx_hash 에 따로 기록한다.
+        conf.TX_META_INDEXES 가 있으면 tx meta index entry 도 같은 batch 에 담는다.
+
+        :param batch: block 과 함께 기록할 KeyValueStoreWriteBatch
         :param block:
+        :param invoke_results: tx_hash 별 score invoke 결과
         """
         # loop all tx in block
         logging.debug("try add all tx in block to block db, block hash: " + block.block_hash)
 
-        for tx in block.confirmed_transaction_list:
+        tx_meta_indexes = list(self.__tx_meta_index_heights)
+        for tx_position, tx in enumerate(block.confirmed_transaction_list):
             tx_hash = tx.get_tx_hash()
-            invoke_result = invoke_results[tx_hash]
+            self.__put_tx_index_to_batch(batch, tx_hash, block.height, tx_position, invoke_results[tx_hash])
+            if tx_meta_indexes:
+                self.__put_tx_meta_index_to_batch(batch, tx, tx_hash.encode(encoding=conf.HASH_KEY_ENCODING),
+                                                  block.height, tx_position, tx_meta_indexes)
+
+    def __put_tx_index_to_batch(self, batch, tx_hash, block_height, tx_position, invoke_result):
+        tx_hash_encoded = tx_hash.encode(encoding=conf.HASH_KEY_ENCODING)
+        if invoke_result == BlockChain.SUCCESS_INVOKE_RESULT:
+            result_pointer = TxResultPointer.success
+        else:
+            result_pointer = TxResultPointer.stored
+            batch.put(BlockChain.INVOKE_RESULT_KEY + tx_hash_encoded, encode_invoke_result(invoke_result))
+
+        batch.put(tx_hash_encoded, encode_tx_index(block_height, tx_position, result_pointer))
 
-            tx_info = dict()
-            tx_info['block_hash'] = block.block_hash
-            tx_info['result'] = invoke_result
+    def __sync_tx_bloom_filter(self):
+        """저장된 tx bloom filter 를 block db 의 chain 에 맞춘다.
+        저장한 뒤에 추가된 block 의 tx 는 다시 넣고, 다른 chain 에서 만든 filter 는 쓰지 않는다. (rebuild 해야 한다.)
+        """
+        tx_bloom_filter = self.__tx_bloom_filter
+        if tx_bloom_filter.height is None:
+            return
+        if tx_bloom_filter.height > self.__block_height or \
+                tx_bloom_filter.block_hash != self.find_block_hash_by_height(tx_bloom_filter.height):
+            logging.warning(f"tx bloom filter({tx_bloom_filter.path}) does not match block db, it should be rebuilt")
+            tx_bloom_filter.set_height(None, "")
+            return
+
+        if tx_bloom_filter.height < self.__block_height:
+            for block in self.iter_blocks(tx_bloom_filter.height + 1):
+                tx_bloom_filter.add([tx.tx_hash for tx in block.confirmed_transaction_list])
+            tx_bloom_filter.set_height(self.__block_height, self.__last_block.block_hash)
+
+    def __add_to_tx_bloom_filter(self, blocks):
+        tx_hashes = [tx.tx_hash for block in blocks for tx in block.confirmed_transaction_list]
+        with self.__tx_bloom_filter_lock:
+            if self.__rebuilding_tx_bloom_filter is not None:
+                self.__rebuilding_tx_bloom_filter.add(tx_hashes)
+            tx_bloom_filter = self.__tx_bloom_filter
+            tx_bloom_filter.add(tx_hashes)
+            if tx_bloom_filter.height is None:
+                return
+            saved_height = tx_bloom_filter.height
+            tx_bloom_filter.set_height(self.__last_block.height, self.__last_block.block_hash)
+            rebuild = tx_bloom_filter.count > tx_bloom_filter.capacity and self.__rebuilding_tx_bloom_filter is None
+
+        if self.__last_block.height // conf.TX_BLOOM_FILTER_SAVE_BLOCKS != saved_height // conf.TX_BLOOM_FILTER_SAVE_BLOCKS:
+            tx_bloom_filter.save()
+        if rebuild:
+            logging.warning(f"tx bloom filter has txs({tx_bloom_filter.count}) more than "
+                            f"capacity({tx_bloom_filter.capacity}), rebuild it")
+            threading.Thread(target=self.rebuild_tx_bloom_filter, daemon=True).start()
+
+    def rebuild_tx_bloom_filter(self):
+        """block db 의 모든 tx 로 tx bloom filter 를 다시 만든다.
+        filter 가 없거나 chain 과 맞지 않을 때, 넣은 tx 가 capacity 를 넘었을 때 background 에서 실행한다.
+        새 filter 를 다 만들 때까지는 이전 filter 로 (또는 filter 없이) 조회한다.
+
+        :return: 새 filter 에 넣은 tx 수, 이미 rebuild 중이면 None
+        """
+        with self.__tx_bloom_filter_lock:
+            if self.__tx_bloom_filter is None or self.__rebuilding_tx_bloom_filter is not None:
+                return None
+            capacity = max(conf.TX_BLOOM_FILTER_CAPACITY, self.__total_tx * 2)
+            tx_bloom_filter = TxBloomFilter(self.__tx_bloom_filter.path, capacity=capacity, load=False)
+            tx_bloom_filter.set_height(None, "")
+            # 여기부터 추가되는 block 의 tx 는 add_blocks 에서 새 filter 에도 넣는다.
+            self.__rebuilding_tx_bloom_filter = tx_bloom_filter
+
+        for block in self.iter_blocks(0):
+            tx_bloom_filter.add([tx.tx_hash for tx in block.confirmed_transaction_list])
+
+        with self.__tx_bloom_filter_lock:
+            tx_bloom_filter.set_height(self.__last_block.height, self.__last_block.block_hash)
+            self.__tx_bloom_filter = tx_bloom_filter
+            self.__rebuilding_tx_bloom_filter = None
+        tx_bloom_filter.save()
+
+        logging.info(f"rebuilt tx bloom filter txs({tx_bloom_filter.count}) capacity({capacity}) "
+                     f"channel({self.__channel_name})")
+        return tx_bloom_filter.count
+
+    def is_tx_bloom_filter_ready(self):
+        return self.__tx_bloom_filter is not None and self.__tx_bloom_filter.height is not None
+
+    def save_tx_bloom_filter(self):
+        if self.__tx_bloom_filter is not None:
+            self.__tx_bloom_filter.save()
+
+    def get_tx_bloom_filter_status(self):
+        """
+        :return: None or TxBloomFilter.get_status
+        """
+        return None if self.__tx_bloom_filter is None else self.__tx_bloom_filter.get_status()
 
-            self.__confirmed_block_db.Put(
-                tx.get_tx_hash().encode(encoding=conf.HASH_KEY_ENCODING),
-                json.dumps(tx_info).encode(encoding=conf.PEER_DATA_ENCODING))
+    def is_tx_committed(self, tx_hash) -> bool:
+        """tx block 을 읽지 않고 tx index 로 tx 가 commit 되었는지 확인한다.
+
+        :param tx_hash: tx hash
+        :return: True if tx is in block db
+        """
+        return self.__find_tx_index(tx_hash) is not None
 
     def find_tx_by_key(self, tx_hash_key):
         """tx 의 hash 로 저장된 tx 를 구한다.
@@ -257,66 +942,192 @@ class BlockChain:
         :param tx_hash_key: tx 의 tx_hash
         :return tx_hash_key 에 해당하는 transaction, 예외인 경우 None 을 리턴한다.
         """
-        # levle db 에서 tx 가 저장된 block 의 hash 를 구한다.
-        try:
-            tx_info_json = self.__find_tx_info(tx_hash_key)
-        except KeyError as e:
+        # levle db 에서 tx 가 저장된 block 의 height 와 block 안의 위치를 구한다.
+        tx_location = self.__find_tx_location(tx_hash_key)
+        if tx_location is None:
             # Client 의 잘못된 요청이 있을 수 있으므로 Warning 처리후 None 을 리턴한다.
             # 시스템 Error 로 처리하지 않는다.
-            logging.warning("blockchain::find_tx_by_key KeyError: " + str(e))
-            return None
-        if tx_info_json is None:
-            logging.warning("tx not found")
-            return None
-        block_key = tx_info_json['block_hash']
-        logging.debug("block_key: " + str(block_key))
-
-        # block 의 hash 로 block object 를 구한다.
-        block = self.find_block_by_hash(block_key)
-        logging.debug("block: " + block.block_hash)
-        if block is None:
-            logging.error("There is No Block, block_hash: " + block.block_hash)
+            logging.warning("tx not found, tx_hash: " + tx_hash_key)
             return None
+        block_height, tx_position = tx_location
 
-        # block object 에서 저장된 tx 를 구한다.
-        tx_index = block.find_transaction_index(tx_hash_key)
-        logging.debug("tx_index: " + str(tx_index))
-        if tx_index < 0:
-            logging.error("block.find_transaction_index index error, index: " + tx_index)
+        # cache 에 있는 block 은 그대로 쓰고, 없으면 serialize 된 block 에서 해당 tx 만 읽는다.
+        block = self.__block_cache.get_by_height(block_height)
+        if block is not None:
+            tx_list = block.confirmed_transaction_list
+            tx = tx_list[tx_position] if tx_position < len(tx_list) else None
+        else:
+            try:
+                block_key = self.__confirmed_block_db.get(
+                    BlockChain.BLOCK_HEIGHT_KEY + block_height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'))
+                tx = Block.read_transaction(self.__get_block_dump(block_key), tx_position)
+            except KeyError:
+                logging.error(f"There is No Block, block_height: {block_height}")
+                return None
+
+        if tx is None or tx.get_tx_hash() != tx_hash_key:
+            logging.error(f"tx index does not match block({block_height}), tx_hash: {tx_hash_key}")
             return None
 
-        tx = block.confirmed_transaction_list[tx_index]
         logging.debug("find tx: " + tx.get_tx_hash())
 
         return tx
 
+    def find_tx_proofs(self, tx_hashes):
+        """여러 tx 의 merkle multi-proof 를 block 별로 묶어서 구한다.
+        같은 block 에 있는 tx 들은 block 을 한번만 읽고 하나의 proof 로 증명한다.
+
+        :param tx_hashes: tx hash list
+        :return: {"proofs": [{"block_hash", "block_height", "merkle_root", "leaf_count", "indexes", "nodes",
+        "tx_hashes"}, ...], "missing": [찾지 못한 tx hash, ...]}
+        """
+        tx_hashes_by_block = collections.OrderedDict()
+        missing = []
+        for tx_hash in tx_hashes:
+            tx_location = self.__find_tx_location(tx_hash)
+            if tx_location is None:
+                missing.append(tx_hash)
+            else:
+                tx_hashes_by_block.setdefault(tx_location[0], []).append(tx_hash)
+
+        proofs = []
+        for block_height, block_tx_hashes in tx_hashes_by_block.items():
+            try:
+                block = self.find_block_by_height(block_height)
+            except KeyError:
+                block = None
+            if block is None:
+                logging.error(f"There is No Block, block_height: {block_height}")
+                missing.extend(block_tx_hashes)
+                continue
+
+            proof = block.mk_merkle_multi_proof(block_tx_hashes)
+            found = set(proof["tx_hashes"])
+            missing.extend(tx_hash for tx_hash in block_tx_hashes if tx_hash not in found)
+
+            proof["block_hash"] = block.block_hash
+            proof["block_height"] = block.height
+            proof["merkle_root"] = block.merkle_tree_root_hash
+            proofs.append(proof)
+
+        return {"proofs": proofs, "missing": missing}
+
     def find_invoke_result_by_tx_hash(self, tx_hash):
         """find invoke result matching tx_hash and return result if not in blockchain return code delay
 
         :param tx_hash: tx_hash
         :return: {"code" : "code", "error_message" : "error_message if not fail this is not exist"}
         """
-        try:
-            tx_info = self.__find_tx_info(tx_hash)
-        except KeyError as e:
+        return self.__find_invoke_result(self.__confirmed_block_db, tx_hash)
+
+    def find_invoke_results(self, tx_hashes):
+        """여러 tx 의 invoke result 를 block db 의 같은 snapshot 에서 한번에 구한다.
+
+        :param tx_hashes: tx hash list
+        :return: {tx_hash: invoke result}, block chain 에 없는 tx 는 {'code': ScoreResponse.NOT_INVOKED}
+        """
+        snapshot = self.__confirmed_block_db.snapshot()
+        return {tx_hash: self.__find_invoke_result(snapshot, tx_hash) for tx_hash in tx_hashes}
+
+    def __find_invoke_result(self, reader, tx_hash):
+        """
+        :param reader: block db 또는 block db 의 snapshot
+        :param tx_hash: tx hash
+        :return: invoke result
+        """
+        tx_index = self.__find_tx_index(tx_hash, reader)
+        if tx_index is None:
             # Client 의 잘못된 요청이 있을 수 있으므로 Warning 처리후 None 을 리턴한다.
             # 시스템 Error 로 처리하지 않는다.
-            logging.warning("blockchain::find invoke_result KeyError: " + str(e))
+            logging.warning("blockchain::find invoke_result not found, tx_hash: " + tx_hash)
             return {'code': ScoreResponse.NOT_INVOKED}
 
-        return tx_info['result']
+        if isinstance(tx_index, dict):
+            return tx_index['result']
+        if tx_index.result_pointer is TxResultPointer.success:
+            return dict(BlockChain.SUCCESS_INVOKE_RESULT)
 
-    def __find_tx_info(self, tx_hash_key):
         try:
-            tx_info = self.__confirmed_block_db.Get(
-                tx_hash_key.encode(encoding=conf.HASH_KEY_ENCODING))
-            tx_info_json = json.loads(tx_info, encoding=conf.PEER_DATA_ENCODING)
+            invoke_result = reader.get(BlockChain.INVOKE_RESULT_KEY + tx_hash.encode(encoding=conf.HASH_KEY_ENCODING))
+        except KeyError:
+            logging.error("there is no invoke result of tx_hash: " + tx_hash)
+            return {'code': ScoreResponse.NOT_INVOKED}
+        return decode_invoke_result(invoke_result)
 
-        except UnicodeDecodeError as e:
-            logging.warning("blockchain::find_tx_by_key UnicodeDecodeError: " + str(e))
+    def __find_tx_location(self, tx_hash):
+        """
+        :param tx_hash: tx hash
+        :return: None or (block height, tx position in block)
+        """
+        tx_index = self.__find_tx_index(tx_hash)
+        if tx_index is None:
             return None
 
-        return tx_info_json
+        if isinstance(tx_index, dict):
+            # migrate_tx_index 이전의 json entry 는 block 을 읽어 위치를 구한다.
+            block = self.find_block_by_hash(tx_index['block_hash'])
+            if block is None:
+                return None
+            tx_position = block.find_transaction_index(tx_hash)
+            return (block.height, tx_position) if tx_position >= 0 else None
+
+        return tx_index.block_height, tx_index.tx_position
+
+    def __find_tx_index(self, tx_hash, reader=None):
+        """
+        :param tx_hash: tx hash
+        :param reader: block db 의 snapshot, None 이면 block db 에서 읽는다.
+        :return: None, TxIndexEntry or dict (json entry of legacy format, {'block_hash', 'result'})
+        """
+        # filter 에 없는 tx 는 commit 되지 않은 것이 확실하므로 db 를 읽지 않는다.
+        tx_bloom_filter = self.__tx_bloom_filter
+        if tx_bloom_filter is not None and tx_bloom_filter.height is not None and \
+                not tx_bloom_filter.might_contain(tx_hash):
+            return None
+
+        reader = self.__confirmed_block_db if reader is None else reader
+        try:
+            tx_index = reader.get(tx_hash.encode(encoding=conf.HASH_KEY_ENCODING))
+        except (KeyError, UnicodeEncodeError):
+            if tx_bloom_filter is not None and tx_bloom_filter.height is not None:
+                tx_bloom_filter.record_false_positive()
+            return None
+
+        try:
+            if is_legacy_tx_index(tx_index):
+                return json.loads(tx_index.decode(encoding=conf.PEER_DATA_ENCODING))
+            return decode_tx_index(tx_index)
+        except (UnicodeDecodeError, ValueError, struct.error) as e:
+            # tx hash 가 아닌 key (block hash 등) 로 조회한 경우
+            logging.warning("blockchain::find_tx_index not a tx index entry: " + str(e))
+            return None
+
+    def migrate_tx_index(self):
+        """json 으로 기록된 이전 format 의 tx index 를 positional binary entry 로 바꾼다.
+        genesis 부터 block 단위로 WriteBatch 를 기록하므로 중간에 멈춰도 다시 실행하면 된다.
+
+        :return: 바꾼 tx index entry 수
+        """
+        migrated = 0
+        for block_height in range(self.__block_height + 1):
+            block = self.find_block_by_height(block_height)
+            batch = self.__confirmed_block_db.write_batch()
+            migrated_in_block = 0
+
+            for tx_position, tx in enumerate(block.confirmed_transaction_list):
+                tx_hash = tx.get_tx_hash()
+                tx_index = self.__find_tx_index(tx_hash)
+                if not isinstance(tx_index, dict):
+                    continue
+                self.__put_tx_index_to_batch(batch, tx_hash, block_height, tx_position, tx_index['result'])
+                migrated_in_block += 1
+
+            if migrated_in_block > 0:
+                batch.write()
+                migrated += migrated_in_block
+
+        logging.info(f"migrated tx index({migrated}) channel({self.__channel_name})")
+        return migrated
 
     def __add_genesisblock(self):
         """제네시스 블럭을 추가 합니다.
@@ -354,9 +1165,45 @@ class BlockChain:
             return False, "generate_block_hash"
 
         # Save unconfirmed_block
-        self.__confirmed_block_db.Put(BlockChain.UNCONFIRM_BLOCK_KEY, unconfirmed_block.serialize_block())
+        if self.__consensus_wal is None:
+            self.__confirmed_block_db.put(BlockChain.UNCONFIRM_BLOCK_KEY, unconfirmed_block.serialize_block())
+        else:
+            self.__consensus_wal.write_candidate_block(
+                unconfirmed_block.block_hash, unconfirmed_block.height, unconfirmed_block.serialize_block())
+            self.__unconfirmed_block = unconfirmed_block
         return True, "No reason"
 
+    def __restore_unconfirmed_block(self):
+        """consensus wal 을 replay 한 candidate block 중 마지막 block 다음 height 의 block 을 unconfirmed block 으로 되살린다.
+        이전 version 에서 block db 에 기록한 UNCONFIRM_BLOCK_KEY 는 wal 에 옮기고 지운다.
+        """
+        try:
+            legacy_block_dump = self.__confirmed_block_db.get(BlockChain.UNCONFIRM_BLOCK_KEY)
+        except KeyError:
+            legacy_block_dump = None
+
+        if legacy_block_dump is not None:
+            legacy_block = Block(channel_name=self.__channel_name)
+            legacy_block.deserialize_block(legacy_block_dump)
+            if legacy_block.height == self.__block_height + 1:
+                self.__consensus_wal.write_candidate_block(
+                    legacy_block.block_hash, legacy_block.height, legacy_block_dump)
+            self.__confirmed_block_db.delete(BlockChain.UNCONFIRM_BLOCK_KEY)
+
+        candidate_block = self.__consensus_wal.state.get_last_candidate_block(self.__block_height + 1)
+        if candidate_block is None:
+            return
+
+        block_hash, block_dump = candidate_block
+        unconfirmed_block = Block(channel_name=self.__channel_name)
+        unconfirmed_block.deserialize_block(block_dump)
+        if unconfirmed_block.prev_block_hash != self.__last_block.block_hash:
+            logging.warning(f"candidate block({block_hash}) of consensus wal is not linked to last block")
+            return
+
+        self.__unconfirmed_block = unconfirmed_block
+        logging.info(f"restore unconfirmed block({block_hash}) height({unconfirmed_block.height}) from consensus wal")
+
     def confirm_block(self, confirmed_block_hash):
         """인증완료후 Block을 Confirm해 줍니다.
 
@@ -365,16 +1212,23 @@ class BlockChain:
         """
         logging.debug(f"BlockChain:confirm_block channel({self.__channel_name})")
 
-        try:
-            unconfirmed_block_byte = self.__confirmed_block_db.Get(BlockChain.UNCONFIRM_BLOCK_KEY)
-        except KeyError:
+        if self.__consensus_wal is None:
+            try:
+                unconfirmed_block_byte = self.__confirmed_block_db.get(BlockChain.UNCONFIRM_BLOCK_KEY)
+            except KeyError:
+                unconfirmed_block_byte = None
+            unconfirmed_block = None
+            if unconfirmed_block_byte is not None:
+                unconfirmed_block = Block(channel_name=self.__channel_name)
+                unconfirmed_block.deserialize_block(unconfirmed_block_byte)
+        else:
+            unconfirmed_block = self.__unconfirmed_block
+
+        if unconfirmed_block is None:
             except_msg = f"there is no unconfirmed block in this peer block_hash({confirmed_block_hash})"
             logging.warning(except_msg)
             raise BlockchainError(except_msg)
 
-        unconfirmed_block = Block(channel_name=self.__channel_name)
-        unconfirmed_block.deserialize_block(unconfirmed_block_byte)
-
         if unconfirmed_block.block_hash != confirmed_block_hash:
             logging.warning("It's not possible to add block while check block hash is fail-")
             raise BlockchainError('확인하는 블럭 해쉬 값이 다릅니다.')
@@ -386,6 +1240,7 @@ class BlockChain:
         unconfirmed_block.block_status = BlockStatus.confirmed
         # Block Validate and save Block
         self.add_block(unconfirmed_block)
-        self.__confirmed_block_db.Delete(BlockChain.UNCONFIRM_BLOCK_KEY)
+        if self.__consensus_wal is None:
+            self.__confirmed_block_db.delete(BlockChain.UNCONFIRM_BLOCK_KEY)
 
         return unconfirmed_block.confirmed_transaction_list.__len__()
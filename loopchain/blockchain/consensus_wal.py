@@ -0,0 +1,316 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Append-only write-ahead log of consensus state (candidate block, votes, leader changes)
+
+block db 의 UNCONFIRM_BLOCK_KEY 대신 검증한 unconfirmed block 과 투표, leader 변경을 segment file 에 이어서 기록한다.
+peer 가 다시 시작하면 log 를 replay 하여 unconfirmed block 을 되살리므로 block height sync 없이 투표를 이어간다.
+
+record layout: payload length(u32) | crc32 of type and payload(u32) | record type(u8) | payload
+"""
+
+import collections
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from enum import IntEnum
+
+from loopchain import configure as conf
+
+WAL_SEGMENT_FILE_FORMAT = "wal_{:06d}.log"
+WAL_RECORD_HEADER = struct.Struct('>IIB')
+WAL_CANDIDATE_BLOCK_HEADER = struct.Struct('>QH')
+
+
+class WALRecordType(IntEnum):
+    candidate_block = 1  # block height(u64) | block hash length(u16) | block hash | serialized block
+    vote = 2  # json {block_hash, peer_id, group_id, vote}
+    leader_change = 3  # json {leader_id, block_height}
+    commit = 4  # json {block_hash, block_height}, 이 height 까지의 candidate block, vote 는 필요 없다.
+
+
+class ConsensusWALState:
+    """replay 한 consensus 상태"""
+
+    def __init__(self):
+        self.committed_block_hash = None
+        self.committed_block_height = -1
+        # block_hash : (block height, serialized block), 기록된 순서
+        self.candidate_blocks = collections.OrderedDict()
+        # block_hash : {peer_id: (group_id, vote)}
+        self.votes = {}
+        self.leader_id = None
+        self.leader_block_height = -1
+
+    def apply(self, record_type, payload):
+        if record_type is WALRecordType.candidate_block:
+            block_height, hash_length = WAL_CANDIDATE_BLOCK_HEADER.unpack_from(payload)
+            offset = WAL_CANDIDATE_BLOCK_HEADER.size
+            block_hash = bytes(payload[offset:offset + hash_length]).decode('UTF-8')
+            if block_height > self.committed_block_height:
+                self.candidate_blocks.pop(block_hash, None)
+                self.candidate_blocks[block_hash] = (block_height, bytes(payload[offset + hash_length:]))
+            return
+
+        record = json.loads(bytes(payload).decode('UTF-8'))
+        if record_type is WALRecordType.vote:
+            self.votes.setdefault(record['block_hash'], {})[record['peer_id']] = (record['group_id'], record['vote'])
+        elif record_type is WALRecordType.leader_change:
+            self.leader_id = record['leader_id']
+            self.leader_block_height = record['block_height']
+        elif record_type is WALRecordType.commit:
+            self.committed_block_hash = record['block_hash']
+            self.committed_block_height = record['block_height']
+            for block_hash, (block_height, _) in list(self.candidate_blocks.items()):
+                if block_height <= self.committed_block_height:
+                    del self.candidate_blocks[block_hash]
+            for block_hash in [block_hash for block_hash in self.votes if block_hash not in self.candidate_blocks]:
+                del self.votes[block_hash]
+
+    def get_last_candidate_block(self, block_height):
+        """
+        :param block_height: 다음에 추가될 block 의 height
+        :return: 그 height 의 마지막으로 기록된 (block_hash, serialized block) or None
+        """
+        for block_hash, (candidate_height, block_dump) in reversed(list(self.candidate_blocks.items())):
+            if candidate_height == block_height:
+                return block_hash, block_dump
+        return None
+
+
+class ConsensusWAL:
+    """consensus 상태를 segment file 에 append 하는 write-ahead log
+
+    candidate block, leader 변경, 자신의 vote 는 기록 즉시 fsync 한다. 다른 peer 에게 받은 vote 는 sync_records 개가
+    쌓이거나 sync_interval 마다 부르는 sync 에서 함께 fsync 한다. (fsync batching, 마지막 sync_interval 동안 받은 vote 는 잃을 수 있다.)
+    commit 할 때 segment 가 segment_size 를 넘었으면 commit 이후에도 필요한 record 만 새 segment 에 옮겨 적고
+    이전 segment 를 지우므로 log 는 마지막 commit 이후의 consensus 상태 크기를 크게 넘지 않는다.
+    """
+
+    def __init__(self, path, sync_records=None, sync_interval=None, segment_size=None):
+        """
+        :param path: segment file 을 둘 directory
+        :param sync_records: fsync 하지 않고 쌓아 두는 vote record 의 최대 수
+        :param sync_interval: vote record 를 fsync 하지 않고 두는 최대 시간 (seconds)
+        :param segment_size: commit 할 때 segment 를 정리하는 크기 (bytes)
+        """
+        self.__path = path
+        self.__sync_records = conf.CONSENSUS_WAL_SYNC_RECORDS if sync_records is None else sync_records
+        self.__sync_interval = conf.CONSENSUS_WAL_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.__segment_size = conf.CONSENSUS_WAL_SEGMENT_SIZE_BYTES if segment_size is None else segment_size
+        self.__lock = threading.Lock()
+        self.__pending_records = 0
+        self.__pending_since = 0
+
+        os.makedirs(self.__path, exist_ok=True)
+        self.__segments = sorted(int(name[4:10]) for name in os.listdir(self.__path)
+                                 if name.startswith("wal_") and name.endswith(".log"))
+        self.__state = self.__replay()
+        if not self.__segments:
+            self.__segments.append(0)
+        self.__file = open(self.__segment_path(self.__segments[-1]), 'ab')
+        logging.debug(f"open consensus wal({self.__path}) segments({self.__segments}) "
+                      f"committed height({self.__state.committed_block_height}) "
+                      f"candidate blocks({len(self.__state.candidate_blocks)})")
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def state(self) -> ConsensusWALState:
+        """replay 한 뒤 기록된 record 까지 반영한 consensus 상태"""
+        return self.__state
+
+    def __segment_path(self, segment):
+        return os.path.join(self.__path, WAL_SEGMENT_FILE_FORMAT.format(segment))
+
+    def __replay(self) -> ConsensusWALState:
+        """segment 를 순서대로 읽어 상태를 만든다.
+        마지막 segment 끝의 잘린 record 는 (기록 중에 멈춘 경우) 잘라 내고, 다른 segment 의 깨진 record 는 건너 뛴다.
+        """
+        state = ConsensusWALState()
+        for segment in self.__segments:
+            segment_path = self.__segment_path(segment)
+            with open(segment_path, 'rb') as segment_file:
+                data = segment_file.read()
+
+            offset = 0
+            while offset < len(data):
+                record = self.__read_record(data, offset)
+                if record is None:
+                    break
+                record_type, payload, offset = record
+                state.apply(record_type, payload)
+
+            if offset < len(data):
+                logging.warning(f"consensus wal({segment_path}) has broken record at offset({offset}) "
+                                f"size({len(data)})")
+                if segment == self.__segments[-1]:
+                    with open(segment_path, 'r+b') as segment_file:
+                        segment_file.truncate(offset)
+        return state
+
+    @staticmethod
+    def __read_record(data, offset):
+        """
+        :return: (WALRecordType, payload, 다음 record 의 offset), 잘렸거나 깨진 record 이면 None
+        """
+        if len(data) - offset < WAL_RECORD_HEADER.size:
+            return None
+        length, checksum, record_type = WAL_RECORD_HEADER.unpack_from(data, offset)
+        payload_offset = offset + WAL_RECORD_HEADER.size
+        if len(data) - payload_offset < length:
+            return None
+        payload = memoryview(data)[payload_offset:payload_offset + length]
+        if zlib.crc32(payload, zlib.crc32(bytes([record_type]))) != checksum:
+            return None
+        try:
+            return WALRecordType(record_type), payload, payload_offset + length
+        except ValueError:
+            return None
+
+    @staticmethod
+    def __encode_record(record_type: WALRecordType, payload: bytes) -> bytes:
+        checksum = zlib.crc32(payload, zlib.crc32(bytes([record_type])))
+        return WAL_RECORD_HEADER.pack(len(payload), checksum, record_type) + payload
+
+    @staticmethod
+    def __encode_json(record: dict) -> bytes:
+        return json.dumps(record, separators=(',', ':')).encode('UTF-8')
+
+    @staticmethod
+    def __encode_candidate_block(block_hash, block_height, block_dump) -> bytes:
+        block_hash_encoded = block_hash.encode('UTF-8')
+        return WAL_CANDIDATE_BLOCK_HEADER.pack(block_height, len(block_hash_encoded)) + block_hash_encoded + \
+            bytes(block_dump)
+
+    def __append(self, record_type, payload, sync):
+        self.__file.write(self.__encode_record(record_type, payload))
+        self.__state.apply(record_type, payload)
+
+        if self.__pending_records == 0:
+            self.__pending_since = time.monotonic()
+        self.__pending_records += 1
+        if sync or self.__pending_records >= self.__sync_records or \
+                time.monotonic() - self.__pending_since >= self.__sync_interval:
+            self.__sync()
+        else:
+            self.__file.flush()
+
+    def __sync(self):
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__pending_records = 0
+
+    def write_candidate_block(self, block_hash, block_height, block_dump):
+        """검증하여 투표할 unconfirmed block 을 기록한다. 투표하기 전에 disk 에 기록되도록 fsync 한다.
+
+        :param block_hash: block hash
+        :param block_height: block height
+        :param block_dump: serialize 된 block
+        """
+        with self.__lock:
+            self.__append(WALRecordType.candidate_block,
+                          self.__encode_candidate_block(block_hash, block_height, block_dump), sync=True)
+
+    def write_vote(self, block_hash, peer_id, group_id, vote, sync=False):
+        """block 에 대한 투표를 기록한다.
+
+        :param block_hash: 투표한 block hash
+        :param peer_id: 투표한 peer
+        :param group_id: 투표한 peer 의 group
+        :param vote: 검증 결과 (True | False)
+        :param sync: True 이면 바로 fsync 한다. (자신의 투표를 보내기 전) False 이면 다음 sync 까지 미룬다.
+        """
+        with self.__lock:
+            self.__append(WALRecordType.vote, self.__encode_json(
+                {'block_hash': block_hash, 'peer_id': peer_id, 'group_id': group_id, 'vote': bool(vote)}), sync=sync)
+
+    def write_leader_change(self, leader_id, block_height):
+        """
+        :param leader_id: 새 leader 의 peer_id
+        :param block_height: leader 가 바뀐 시점의 block height
+        """
+        with self.__lock:
+            self.__append(WALRecordType.leader_change, self.__encode_json(
+                {'leader_id': leader_id, 'block_height': block_height}), sync=True)
+
+    def write_commit(self, block_hash, block_height):
+        """block 이 block db 에 기록되었음을 남긴다. 그 height 까지의 candidate block, vote 는 replay 하지 않는다.
+        commit 을 잃어도 replay 한 candidate block 은 block db 의 height 로 걸러지므로 fsync 하지 않는다.
+
+        :param block_hash: block db 에 기록한 마지막 block hash
+        :param block_height: block db 에 기록한 마지막 block height
+        """
+        with self.__lock:
+            self.__append(WALRecordType.commit, self.__encode_json(
+                {'block_hash': block_hash, 'block_height': block_height}), sync=False)
+            if self.__file.tell() >= self.__segment_size:
+                self.__truncate()
+
+    def __truncate(self):
+        """commit 이후에도 필요한 record 만 새 segment 에 옮겨 적고 이전 segment 를 지운다.
+        새 segment 를 fsync 한 뒤에 지우므로 도중에 멈추면 같은 record 를 두번 replay 할 뿐이다.
+        """
+        state = self.__state
+        records = []
+        if state.committed_block_hash is not None:
+            records.append(self.__encode_record(WALRecordType.commit, self.__encode_json(
+                {'block_hash': state.committed_block_hash, 'block_height': state.committed_block_height})))
+        if state.leader_id is not None:
+            records.append(self.__encode_record(WALRecordType.leader_change, self.__encode_json(
+                {'leader_id': state.leader_id, 'block_height': state.leader_block_height})))
+        for block_hash, (block_height, block_dump) in state.candidate_blocks.items():
+            records.append(self.__encode_record(
+                WALRecordType.candidate_block, self.__encode_candidate_block(block_hash, block_height, block_dump)))
+            for peer_id, (group_id, vote) in state.votes.get(block_hash, {}).items():
+                records.append(self.__encode_record(WALRecordType.vote, self.__encode_json(
+                    {'block_hash': block_hash, 'peer_id': peer_id, 'group_id': group_id, 'vote': vote})))
+
+        self.__file.close()
+        new_segment = self.__segments[-1] + 1
+        self.__file = open(self.__segment_path(new_segment), 'ab')
+        self.__file.write(b''.join(records))
+        self.__sync()
+        self.__sync_directory()
+
+        for segment in self.__segments:
+            os.remove(self.__segment_path(segment))
+        self.__segments = [new_segment]
+        logging.debug(f"truncate consensus wal({self.__path}) to segment({new_segment}) records({len(records)})")
+
+    def __sync_directory(self):
+        if not hasattr(os, 'O_DIRECTORY'):
+            return
+        directory_fd = os.open(self.__path, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    def sync(self):
+        """미뤄 둔 vote record 를 disk 에 기록한다. 다음 vote 를 기다리지 않도록 sync_interval 마다 불러야 한다."""
+        with self.__lock:
+            if self.__pending_records > 0:
+                self.__sync()
+
+    def close(self):
+        with self.__lock:
+            if self.__pending_records > 0:
+                self.__sync()
+            self.__file.close()
@@ -44,3 +44,9 @@ class BlockchainError(Exception):
 class ScoreInvokeError(Exception):
     """Error While Invoke Score
     """
+
+
+class SnapshotError(Exception):
+    """chain snapshot 의 checksum 이나 block hash 가 맞지 않거나, snapshot 을 만들거나 가져올 수 없을 때 발생
+    """
+    pass
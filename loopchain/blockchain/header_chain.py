@@ -0,0 +1,185 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""In-memory array of fixed-size block headers indexed by height
+
+block header 를 height 순서로 고정 크기 record 로 이어 붙인 bytearray 를 memory 에 두어
+height 로 block hash, header 를 db 를 읽지 않고 바로 구한다. record 는 header file 에도 append 하여
+peer 를 다시 시작할 때 chain 을 순회하지 않고 한번에 읽는다.
+header file 은 block db 로 언제든 다시 만들 수 있으므로 fsync 하지 않는다.
+
+record layout: block hash(32) | prev block hash(32) | merkle tree root hash(32) | time stamp(u64) | tx count(u32) |
+               height(u64)
+"""
+
+import logging
+import os
+import struct
+import threading
+import time
+
+HEADER_CHAIN_RECORD = struct.Struct('>32s32s32sQIQ')
+HEADER_CHAIN_HASH_BYTES_LEN = 32
+HEADER_CHAIN_EMPTY_HASH = bytes(HEADER_CHAIN_HASH_BYTES_LEN)
+HEADER_CHAIN_TIME_STAMP = struct.Struct('>Q')
+HEADER_CHAIN_TIME_STAMP_OFFSET = HEADER_CHAIN_HASH_BYTES_LEN * 3
+# HeaderChain.get_header 가 돌려주는 key (Block.get_header 의 일부)
+HEADER_CHAIN_KEYS = ('block_hash', 'prev_block_hash', 'merkle_tree_root_hash', 'time_stamp', 'tx_count', 'height')
+
+
+def encode_header_hash(hash_hex: str) -> bytes:
+    """hex string hash 를 고정 크기 bytes 로 바꾼다. genesis block 의 prev block hash 같은 빈 hash 는 0 으로 채운다.
+
+    :param hash_hex: sha256 hex string or ""
+    :return: 32 bytes
+    """
+    if not hash_hex:
+        return HEADER_CHAIN_EMPTY_HASH
+    hash_bytes = bytes.fromhex(hash_hex)
+    if len(hash_bytes) != HEADER_CHAIN_HASH_BYTES_LEN:
+        raise ValueError(f"hash length({len(hash_bytes)}) is not {HEADER_CHAIN_HASH_BYTES_LEN}")
+    return hash_bytes
+
+
+def decode_header_hash(hash_bytes: bytes) -> str:
+    return "" if hash_bytes == HEADER_CHAIN_EMPTY_HASH else hash_bytes.hex()
+
+
+class HeaderChain:
+    """height 로 바로 찾을 수 있는 block header array
+
+    record 의 index 가 곧 block height 이므로 genesis block 부터 빠짐없이 순서대로 append 해야 한다.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: header file path
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__headers = bytearray()
+
+        start = time.perf_counter()
+        if os.path.exists(self.__path):
+            with open(self.__path, 'rb') as header_file:
+                self.__headers = bytearray(header_file.read())
+        self.__check_headers()
+        self.__file = open(self.__path, 'ab')
+        logging.info(f"load header chain({self.__path}) headers({len(self)}) "
+                     f"in {time.perf_counter() - start:.3f}s")
+
+    def __check_headers(self):
+        """쓰다 만 마지막 record 나 height 가 맞지 않는 record 를 잘라낸다."""
+        count = len(self.__headers) // HEADER_CHAIN_RECORD.size
+        while count > 0 and self.__read_record(count - 1)[5] != count - 1:
+            count -= 1
+        if count * HEADER_CHAIN_RECORD.size != len(self.__headers):
+            logging.warning(f"header chain({self.__path}) has broken record at height({count}) "
+                            f"size({len(self.__headers)})")
+            self.__truncate_file(count)
+
+    def __truncate_file(self, count):
+        del self.__headers[count * HEADER_CHAIN_RECORD.size:]
+        with open(self.__path, 'ab') as header_file:
+            header_file.truncate(len(self.__headers))
+
+    def __read_record(self, height):
+        return HEADER_CHAIN_RECORD.unpack_from(self.__headers, height * HEADER_CHAIN_RECORD.size)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def __len__(self):
+        return len(self.__headers) // HEADER_CHAIN_RECORD.size
+
+    @property
+    def height(self):
+        """마지막 header 의 height, 비어 있으면 -1"""
+        return len(self) - 1
+
+    def append(self, headers):
+        """block header 들을 height 순서로 추가한다.
+
+        :param headers: Block.get_header 의 dict (또는 HEADER_CHAIN_KEYS 를 가진 dict) list
+        """
+        with self.__lock:
+            records = bytearray()
+            next_height = len(self)
+            for header in headers:
+                if header['height'] != next_height:
+                    raise ValueError(f"header height({header['height']}) is not next height({next_height})")
+                records += HEADER_CHAIN_RECORD.pack(
+                    encode_header_hash(header['block_hash']),
+                    encode_header_hash(header['prev_block_hash']),
+                    encode_header_hash(header['merkle_tree_root_hash']),
+                    header['time_stamp'],
+                    header['tx_count'],
+                    header['height'])
+                next_height += 1
+
+            self.__headers += records
+            self.__file.write(records)
+            self.__file.flush()
+
+    def truncate(self, height):
+        """height 부터 뒤의 header 를 지운다.
+
+        :param height: 남길 header 의 수 (지울 첫 height)
+        """
+        with self.__lock:
+            if height < len(self):
+                self.__file.close()
+                self.__truncate_file(height)
+                self.__file = open(self.__path, 'ab')
+
+    def get_block_hash(self, height):
+        """
+        :param height: block height
+        :return: None or block hash (hex string)
+        """
+        if height < 0 or height >= len(self):
+            return None
+        offset = height * HEADER_CHAIN_RECORD.size
+        return decode_header_hash(bytes(self.__headers[offset:offset + HEADER_CHAIN_HASH_BYTES_LEN]))
+
+    def get_time_stamp(self, height):
+        """binary search 용으로 header 전체를 풀지 않고 time stamp 만 읽는다.
+
+        :param height: block height (0 <= height < len(self))
+        :return: block time stamp
+        """
+        return HEADER_CHAIN_TIME_STAMP.unpack_from(
+            self.__headers, height * HEADER_CHAIN_RECORD.size + HEADER_CHAIN_TIME_STAMP_OFFSET)[0]
+
+    def get_header(self, height):
+        """
+        :param height: block height
+        :return: None or header dict, key 는 HEADER_CHAIN_KEYS
+        """
+        if height < 0 or height >= len(self):
+            return None
+        block_hash, prev_block_hash, merkle_tree_root_hash, time_stamp, tx_count, block_height = \
+            self.__read_record(height)
+        return {
+            'block_hash': decode_header_hash(block_hash),
+            'prev_block_hash': decode_header_hash(prev_block_hash),
+            'merkle_tree_root_hash': decode_header_hash(merkle_tree_root_hash),
+            'time_stamp': time_stamp,
+            'tx_count': tx_count,
+            'height': block_height
+        }
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
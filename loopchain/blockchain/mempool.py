@@ -0,0 +1,329 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Disk-backed mempool of txs that are not committed yet
+
+BlockManager 의 tx queue 에 들어간 tx (pickle 된 그대로) 를 tx hash 와 함께 append log 에 기록하고,
+block 에 담겨 commit 되거나 block 생성에서 버려지면 지운다. 남은 tx 가 max_txs 를 넘으면 오래된 tx 부터 지운다.
+log 가 커지면 log 를 바꾸고 남아 있는 tx 만 snapshot 에 옮겨 적는다. peer 를 다시 시작하면 snapshot 과 log 를 읽어
+commit 되지 않은 tx 를 다시 tx queue 에 넣는다.
+
+record layout: payload length(u32) | crc32 of type and payload(u32) | record type(u8) | payload
+"""
+
+import collections
+import itertools
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from enum import IntEnum
+
+from loopchain import configure as conf
+
+MEMPOOL_LOG_FILE = "mempool.log"
+MEMPOOL_COMPACTING_LOG_FILE = "mempool.log.compacting"
+MEMPOOL_SNAPSHOT_FILE = "mempool.snapshot"
+MEMPOOL_RECORD_HEADER = struct.Struct('>IIB')
+MEMPOOL_SEQUENCE = struct.Struct('>Q')
+MEMPOOL_TX_HASH_LENGTH = struct.Struct('>B')
+
+
+class MempoolRecordType(IntEnum):
+    add = 1  # sequence(u64) | tx hash length(u8) | tx hash | pickle 된 tx
+    prune = 2  # block height(u64) | 지운 sequence(u64) ...
+    remove = 3  # 지운 sequence(u64) ...
+
+
+class PersistentMempool:
+    """commit 되지 않은 tx 를 disk 에 보관하는 mempool
+
+    AddTx 는 성능에 민감하므로 tx 를 unpickle 하지 않고 호출하는 쪽이 알고 있는 tx hash 를 같이 기록한다.
+    log 는 sync_records 개 또는 sync_interval 초마다 fsync 하므로 process 가 비정상 종료하면 그 사이에 받은 tx 는 잃을 수 있다.
+    snapshot 은 lock 밖에서 쓰므로 log 를 정리하는 동안에도 tx 를 기록할 수 있다.
+    """
+
+    def __init__(self, path, sync_records=None, sync_interval=None, compact_bytes=None, max_txs=None):
+        """
+        :param path: log, snapshot 을 둘 directory
+        :param sync_records: fsync 하지 않고 쌓아 두는 record 의 최대 수
+        :param sync_interval: record 를 fsync 하지 않고 두는 최대 시간 (seconds)
+        :param compact_bytes: tx 를 지울 때 log 가 이 크기를 넘으면 snapshot 으로 정리한다.
+        :param max_txs: 보관하는 tx 의 최대 수, 넘으면 오래된 tx 부터 1/10 을 지운다.
+        """
+        self.__path = path
+        self.__sync_records = conf.MEMPOOL_SYNC_RECORDS if sync_records is None else sync_records
+        self.__sync_interval = conf.MEMPOOL_SYNC_INTERVAL if sync_interval is None else sync_interval
+        self.__compact_bytes = conf.MEMPOOL_COMPACT_BYTES if compact_bytes is None else compact_bytes
+        self.__max_txs = conf.MEMPOOL_MAX_TXS if max_txs is None else max_txs
+        self.__lock = threading.Lock()
+        self.__pending_records = 0
+        self.__pending_since = 0
+        self.__compacting = False
+
+        # sequence : (tx hash, pickle 된 tx)
+        self.__txs = collections.OrderedDict()
+        # tx hash : sequence
+        self.__sequences = {}
+        self.__next_sequence = 0
+        self.__pruned_height = None
+
+        os.makedirs(self.__path, exist_ok=True)
+        start = time.perf_counter()
+        self.__replay(self.__snapshot_path(), truncate=False)
+        compacting_log_path = self.__compacting_log_path()
+        if os.path.exists(compacting_log_path):
+            # snapshot 을 다 쓰기 전에 멈춘 경우, 바꾼 log 와 새 log 를 모두 읽어 snapshot 으로 옮겨 적는다.
+            self.__replay(compacting_log_path, truncate=True)
+            self.__replay(self.__log_path(), truncate=True)
+            self.__write_snapshot(list(self.__txs.items()), self.__pruned_height)
+            os.remove(compacting_log_path)
+            open(self.__log_path(), 'wb').close()
+        else:
+            self.__replay(self.__log_path(), truncate=True)
+        self.__file = open(self.__log_path(), 'ab')
+        logging.info(f"load mempool({self.__path}) txs({len(self.__txs)}) pruned height({self.__pruned_height}) "
+                     f"in {time.perf_counter() - start:.3f}s")
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def pruned_height(self):
+        """commit 된 tx 를 지운 마지막 block height, 처음 만든 mempool 은 None"""
+        return self.__pruned_height
+
+    def __len__(self):
+        return len(self.__txs)
+
+    def __log_path(self):
+        return os.path.join(self.__path, MEMPOOL_LOG_FILE)
+
+    def __compacting_log_path(self):
+        return os.path.join(self.__path, MEMPOOL_COMPACTING_LOG_FILE)
+
+    def __snapshot_path(self):
+        return os.path.join(self.__path, MEMPOOL_SNAPSHOT_FILE)
+
+    def __replay(self, file_path, truncate):
+        if not os.path.exists(file_path):
+            return
+        with open(file_path, 'rb') as record_file:
+            data = record_file.read()
+
+        offset = 0
+        view = memoryview(data)
+        while len(data) - offset >= MEMPOOL_RECORD_HEADER.size:
+            length, checksum, record_type = MEMPOOL_RECORD_HEADER.unpack_from(data, offset)
+            payload_offset = offset + MEMPOOL_RECORD_HEADER.size
+            payload = view[payload_offset:payload_offset + length]
+            if len(payload) < length or zlib.crc32(payload, zlib.crc32(bytes([record_type]))) != checksum:
+                break
+            self.__apply(record_type, payload)
+            offset = payload_offset + length
+
+        if offset < len(data):
+            logging.warning(f"mempool({file_path}) has broken record at offset({offset}) size({len(data)})")
+            if truncate:
+                with open(file_path, 'r+b') as record_file:
+                    record_file.truncate(offset)
+
+    def __apply(self, record_type, payload):
+        if record_type == MempoolRecordType.add:
+            sequence = MEMPOOL_SEQUENCE.unpack_from(payload)[0]
+            tx_hash_offset = MEMPOOL_SEQUENCE.size + MEMPOOL_TX_HASH_LENGTH.size
+            tx_hash_length = MEMPOOL_TX_HASH_LENGTH.unpack_from(payload, MEMPOOL_SEQUENCE.size)[0]
+            tx_hash = bytes(payload[tx_hash_offset:tx_hash_offset + tx_hash_length]).decode('UTF-8')
+            self.__put(sequence, tx_hash, bytes(payload[tx_hash_offset + tx_hash_length:]))
+            self.__next_sequence = max(self.__next_sequence, sequence + 1)
+        elif record_type == MempoolRecordType.prune:
+            self.__pruned_height = MEMPOOL_SEQUENCE.unpack_from(payload)[0]
+            for offset in range(MEMPOOL_SEQUENCE.size, len(payload), MEMPOOL_SEQUENCE.size):
+                self.__pop(MEMPOOL_SEQUENCE.unpack_from(payload, offset)[0])
+        elif record_type == MempoolRecordType.remove:
+            for offset in range(0, len(payload), MEMPOOL_SEQUENCE.size):
+                self.__pop(MEMPOOL_SEQUENCE.unpack_from(payload, offset)[0])
+
+    def __put(self, sequence, tx_hash, tx_unloaded):
+        if tx_hash in self.__sequences:
+            # 같은 tx 를 다시 받은 경우 먼저 받은 tx 만 남긴다.
+            return False
+        self.__txs[sequence] = (tx_hash, tx_unloaded)
+        self.__sequences[tx_hash] = sequence
+        return True
+
+    def __pop(self, sequence):
+        tx = self.__txs.pop(sequence, None)
+        if tx is None:
+            return False
+        del self.__sequences[tx[0]]
+        return True
+
+    @staticmethod
+    def __encode_add_record(sequence, tx_hash, tx_unloaded) -> bytes:
+        tx_hash_encoded = tx_hash.encode('UTF-8')
+        return PersistentMempool.__encode_record(
+            MempoolRecordType.add,
+            MEMPOOL_SEQUENCE.pack(sequence) + MEMPOOL_TX_HASH_LENGTH.pack(len(tx_hash_encoded)) + tx_hash_encoded +
+            tx_unloaded)
+
+    @staticmethod
+    def __encode_record(record_type: MempoolRecordType, payload: bytes) -> bytes:
+        checksum = zlib.crc32(payload, zlib.crc32(bytes([record_type])))
+        return MEMPOOL_RECORD_HEADER.pack(len(payload), checksum, record_type) + payload
+
+    def __write(self, record):
+        self.__file.write(record)
+        if self.__pending_records == 0:
+            self.__pending_since = time.monotonic()
+        self.__pending_records += 1
+        if self.__pending_records >= self.__sync_records or \
+                time.monotonic() - self.__pending_since >= self.__sync_interval:
+            self.__sync()
+
+    def __sync(self):
+        self.__file.flush()
+        os.fsync(self.__file.fileno())
+        self.__pending_records = 0
+
+    def add(self, tx_hash, tx_unloaded):
+        """tx queue 에 넣는 tx 를 기록한다. 이미 있는 tx 는 기록하지 않는다.
+
+        :param tx_hash: tx hash
+        :param tx_unloaded: pickle 된 tx
+        """
+        compaction = None
+        with self.__lock:
+            sequence = self.__next_sequence
+            if not self.__put(sequence, tx_hash, tx_unloaded):
+                return
+            self.__next_sequence += 1
+            self.__write(self.__encode_add_record(sequence, tx_hash, tx_unloaded))
+            if len(self.__txs) > self.__max_txs:
+                evicted = list(itertools.islice(self.__txs, max(1, self.__max_txs // 10)))
+                logging.warning(f"mempool({self.__path}) is full, remove old txs({len(evicted)})")
+                self.__remove_sequences(evicted)
+                compaction = self.__start_compaction()
+        self.__compact(compaction)
+
+    def get_tx_hashes(self) -> list:
+        """
+        :return: 받은 순서대로 commit 되지 않은 tx 의 hash list
+        """
+        with self.__lock:
+            return [tx_hash for tx_hash, tx_unloaded in self.__txs.values()]
+
+    def remove(self, tx_hashes):
+        """block 생성에서 버려진 tx 나 이미 commit 된 tx 를 지운다.
+
+        :param tx_hashes: 지울 tx hash list
+        :return: 지운 tx 수
+        """
+        with self.__lock:
+            removed = self.__remove_sequences([self.__sequences[tx_hash] for tx_hash in tx_hashes
+                                               if tx_hash in self.__sequences])
+            compaction = self.__start_compaction()
+        self.__compact(compaction)
+        return removed
+
+    def __remove_sequences(self, sequences):
+        removed = [sequence for sequence in sequences if self.__pop(sequence)]
+        if removed:
+            self.__write(self.__encode_record(MempoolRecordType.remove,
+                                              b''.join(MEMPOOL_SEQUENCE.pack(sequence) for sequence in removed)))
+        return len(removed)
+
+    def get_txs(self) -> list:
+        """
+        :return: 받은 순서대로 commit 되지 않은 tx (pickle 된 tx) list
+        """
+        with self.__lock:
+            return [tx_unloaded for tx_hash, tx_unloaded in self.__txs.values()]
+
+    def prune(self, tx_hashes, block_height):
+        """block 에 담겨 commit 된 tx 를 지운다.
+
+        :param tx_hashes: commit 된 block 들의 tx hash
+        :param block_height: commit 된 마지막 block height
+        :return: 지운 tx 수
+        """
+        with self.__lock:
+            pruned = [self.__sequences[tx_hash] for tx_hash in tx_hashes if tx_hash in self.__sequences]
+            for sequence in pruned:
+                self.__pop(sequence)
+
+            self.__pruned_height = block_height
+            payload = MEMPOOL_SEQUENCE.pack(block_height) + b''.join(MEMPOOL_SEQUENCE.pack(sequence)
+                                                                     for sequence in pruned)
+            self.__write(self.__encode_record(MempoolRecordType.prune, payload))
+            compaction = self.__start_compaction()
+        self.__compact(compaction)
+        return len(pruned)
+
+    def __start_compaction(self):
+        """log 가 compact_bytes 를 넘으면 log 를 바꾸고, snapshot 에 옮겨 적을 tx 를 구한다. (lock 안에서 부른다.)
+        바꾼 log 는 snapshot 을 쓴 뒤에 지우므로 그 사이에 멈추면 다시 시작할 때 snapshot 과 두 log 를 모두 읽는다.
+
+        :return: None 이면 정리하지 않는다. 아니면 __compact 에 넘길 (바꾼 log file, tx list, pruned height)
+        """
+        if self.__compacting or self.__file.tell() < self.__compact_bytes:
+            return None
+        self.__compacting = True
+        self.__file.flush()
+        compacting_file = self.__file
+        os.replace(self.__log_path(), self.__compacting_log_path())
+        self.__file = open(self.__log_path(), 'ab')
+        self.__pending_records = 0
+        return compacting_file, list(self.__txs.items()), self.__pruned_height
+
+    def __compact(self, compaction):
+        """lock 밖에서 snapshot 을 쓰고 바꾼 log 를 지운다. 그 동안 받은 record 는 새 log 에 쌓인다."""
+        if compaction is None:
+            return
+        compacting_file, txs, pruned_height = compaction
+        try:
+            os.fsync(compacting_file.fileno())
+            compacting_file.close()
+            self.__write_snapshot(txs, pruned_height)
+            os.remove(self.__compacting_log_path())
+            logging.debug(f"compact mempool({self.__path}) txs({len(txs)})")
+        finally:
+            with self.__lock:
+                self.__compacting = False
+
+    def __write_snapshot(self, txs, pruned_height):
+        snapshot_path = self.__snapshot_path()
+        temp_path = snapshot_path + ".tmp"
+        with open(temp_path, 'wb') as snapshot_file:
+            if pruned_height is not None:
+                snapshot_file.write(self.__encode_record(MempoolRecordType.prune,
+                                                         MEMPOOL_SEQUENCE.pack(pruned_height)))
+            for sequence, (tx_hash, tx_unloaded) in txs:
+                snapshot_file.write(self.__encode_add_record(sequence, tx_hash, tx_unloaded))
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(temp_path, snapshot_path)
+
+    def sync(self):
+        with self.__lock:
+            if self.__pending_records > 0:
+                self.__sync()
+
+    def close(self):
+        with self.__lock:
+            if self.__pending_records > 0:
+                self.__sync()
+            self.__file.close()
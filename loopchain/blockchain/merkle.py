@@ -0,0 +1,206 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Merkle tree helpers for Block"""
+
+import binascii
+import hashlib
+
+
+def merkle_hash(left: bytes, right: bytes) -> bytes:
+    """두 node 의 부모 node 를 구한다.
+    기존 Block 과 호환되도록 hex string 을 이어 붙인 값의 sha256 을 사용한다.
+
+    :param left: 32 bytes digest
+    :param right: 32 bytes digest
+    :return: 32 bytes digest
+    """
+    return hashlib.sha256(binascii.hexlify(left) + binascii.hexlify(right)).digest()
+
+
+class MerkleTreeBuilder:
+    """tx digest 를 하나씩 접어 넣는 incremental merkle tree builder
+
+    각 level 에서 짝을 기다리는 node 하나씩만 frontier 에 보관하므로 메모리는 O(log n) 이며,
+    root 는 seal(root_hash) 시점에 O(log n) 으로 구한다.
+    홀수개의 node 가 있는 level 은 마지막 node 를 복사하여 짝을 맞춘다. (기존 Block 의 merkle tree 와 같은 규칙)
+    """
+
+    def __init__(self):
+        self.__frontier = []
+        self.__leaf_count = 0
+
+    @property
+    def leaf_count(self):
+        return self.__leaf_count
+
+    def reset(self):
+        self.__frontier = []
+        self.__leaf_count = 0
+
+    def add_leaf(self, digest: bytes):
+        """leaf 를 추가한다.
+
+        :param digest: tx hash 의 32 bytes digest
+        """
+        node = digest
+        level = 0
+        while level < len(self.__frontier) and self.__frontier[level] is not None:
+            node = merkle_hash(self.__frontier[level], node)
+            self.__frontier[level] = None
+            level += 1
+
+        if level == len(self.__frontier):
+            self.__frontier.append(node)
+        else:
+            self.__frontier[level] = node
+        self.__leaf_count += 1
+
+    def add_hex_leaf(self, tx_hash: str):
+        self.add_leaf(bytes.fromhex(tx_hash))
+
+    def root(self) -> bytes:
+        """지금까지 추가된 leaf 들의 merkle root 를 구한다. leaf 가 없으면 None
+
+        :return: 32 bytes digest or None
+        """
+        level_count = self.__leaf_count
+        if level_count == 0:
+            return None
+
+        carry = None
+        level = 0
+        while level_count > 1:
+            pending = self.__frontier[level] if level < len(self.__frontier) else None
+            if pending is not None and carry is not None:
+                carry = merkle_hash(pending, carry)
+            elif pending is not None:
+                carry = merkle_hash(pending, pending)
+            elif carry is not None:
+                carry = merkle_hash(carry, carry)
+
+            level_count = (level_count + 1) // 2
+            level += 1
+
+        return carry if carry is not None else self.__frontier[level]
+
+    def root_hash(self) -> str:
+        """merkle root 를 hex string 으로 구한다. leaf 가 없으면 ""
+        """
+        root = self.root()
+        return "" if root is None else root.hex()
+
+
+class MerkleTree:
+    """모든 layer 를 보관하는 merkle tree, 여러 tx 의 inclusion proof 를 한번에 만들 때 사용한다.
+
+    layer 는 padding 하지 않은 채 보관하며, 홀수개인 layer 의 마지막 node 는 자기 자신과 짝이 된다.
+    """
+
+    def __init__(self, digests):
+        """
+        :param digests: tx hash 의 32 bytes digest list (leaf 순서)
+        """
+        layer = list(digests)
+        self.__layers = [layer]
+        while len(layer) > 1:
+            layer = [merkle_hash(layer[i], layer[i + 1] if i + 1 < len(layer) else layer[i])
+                     for i in range(0, len(layer), 2)]
+            self.__layers.append(layer)
+
+    @property
+    def leaf_count(self):
+        return len(self.__layers[0])
+
+    @property
+    def layers(self):
+        return self.__layers
+
+    def root_hash(self) -> str:
+        return self.__layers[-1][0].hex() if self.leaf_count > 0 else ""
+
+    def siblings(self, index) -> list:
+        """index 번째 leaf 에서 root 까지 올라가며 필요한 sibling 들을 구한다.
+
+        :param index: leaf index
+        :return: sibling digest list (leaf 쪽 부터)
+        """
+        siblings = []
+        for layer in self.__layers[:-1]:
+            sibling_index = index ^ 1
+            siblings.append(layer[sibling_index] if sibling_index < len(layer) else layer[index])
+            index >>= 1
+        return siblings
+
+    def multi_proof(self, indexes) -> dict:
+        """여러 leaf 의 inclusion 을 한번에 증명하는 compact multi-proof 를 만든다.
+        proof 에 포함된 leaf 끼리 혹은 계산으로 구할 수 있는 node 는 nodes 에 넣지 않는다.
+
+        :param indexes: leaf index list
+        :return: {"leaf_count": int, "indexes": [int, ...], "nodes": [hex, ...]}
+        """
+        leaf_indexes = sorted(set(indexes))
+        known = set(leaf_indexes)
+        nodes = []
+        for layer in self.__layers[:-1]:
+            for index in sorted(known):
+                sibling_index = index ^ 1
+                if sibling_index < len(layer) and sibling_index not in known:
+                    nodes.append(layer[sibling_index].hex())
+            known = {index >> 1 for index in known}
+
+        return {"leaf_count": self.leaf_count, "indexes": leaf_indexes, "nodes": nodes}
+
+
+def verify_multi_proof(root_hash: str, proof: dict, leaf_hashes: list) -> bool:
+    """MerkleTree.multi_proof 로 만든 proof 를 검증한다.
+
+    :param root_hash: block 의 merkle_tree_root_hash
+    :param proof: multi_proof 결과
+    :param leaf_hashes: proof["indexes"] 순서의 tx hash(hex) list
+    :return: 검증 결과
+    """
+    indexes = proof["indexes"]
+    if len(indexes) != len(leaf_hashes) or len(indexes) == 0:
+        return False
+
+    known = dict(zip(indexes, (bytes.fromhex(leaf_hash) for leaf_hash in leaf_hashes)))
+    nodes = iter(bytes.fromhex(node) for node in proof["nodes"])
+    layer_size = proof["leaf_count"]
+
+    try:
+        while layer_size > 1:
+            # proof 를 만들 때와 같은 순서로 sibling 을 소비한다.
+            for index in sorted(known):
+                sibling_index = index ^ 1
+                if sibling_index < layer_size and sibling_index not in known:
+                    known[sibling_index] = next(nodes)
+
+            parents = {}
+            for index in sorted(known):
+                parent_index = index >> 1
+                if parent_index in parents:
+                    continue
+                left_index = parent_index << 1
+                left = known[left_index]
+                right = known.get(left_index + 1, left)
+                parents[parent_index] = merkle_hash(left, right)
+            known = parents
+            layer_size = (layer_size + 1) // 2
+    except (StopIteration, KeyError):
+        return False
+
+    if next(nodes, None) is not None:
+        return False
+
+    return len(known) == 1 and known.get(0, b'').hex() == root_hash
@@ -0,0 +1,142 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Binary read/write helpers for the versioned block format
+
+Block 과 Transaction 을 pickle 대신 length-prefixed binary 로 기록하기 위한 도구이다.
+format 의 layout 은 Block.serialize_block / Transaction.serialize_binary 에서 정의한다.
+"""
+
+import struct
+
+# Block binary format 의 시작을 나타내는 magic, 이 값으로 시작하지 않는 dump 는 pickle(legacy) 로 간주한다.
+BLOCK_FORMAT_MAGIC = b'LCB'
+BLOCK_FORMAT_VERSION = 1
+
+# tx record 의 고정 길이 부분: status, type, time_stamp, meta/data/hash/public_key/signature 의 길이
+TX_RECORD_HEADER = struct.Struct('>BBQIIIII')
+
+_U8 = struct.Struct('>B')
+_U32 = struct.Struct('>I')
+_U64 = struct.Struct('>Q')
+_I64 = struct.Struct('>q')
+
+
+def is_binary_block(block_dumps) -> bool:
+    """block dump 가 binary format 인지 확인한다.
+
+    :param block_dumps: serialize 된 block
+    :return: binary format 이면 True, pickle(legacy) 이면 False
+    """
+    return bytes(block_dumps[:len(BLOCK_FORMAT_MAGIC)]) == BLOCK_FORMAT_MAGIC
+
+
+class BinaryWriter:
+    """fixed size 정수와 length-prefixed bytes 를 순서대로 기록한다."""
+
+    def __init__(self):
+        self.__chunks = []
+        self.__size = 0
+
+    @property
+    def size(self):
+        return self.__size
+
+    def __append(self, chunk):
+        self.__chunks.append(chunk)
+        self.__size += len(chunk)
+
+    def write_u8(self, value):
+        self.__append(_U8.pack(value))
+
+    def write_u32(self, value):
+        self.__append(_U32.pack(value))
+
+    def write_u64(self, value):
+        self.__append(_U64.pack(value))
+
+    def write_i64(self, value):
+        self.__append(_I64.pack(value))
+
+    def write_bool(self, value):
+        self.write_u8(1 if value else 0)
+
+    def write_raw(self, value):
+        self.__append(bytes(value))
+
+    def write_bytes(self, value):
+        self.write_u32(len(value))
+        self.__append(bytes(value))
+
+    def write_str(self, value):
+        self.write_bytes(value.encode('UTF-8'))
+
+    def write_hex(self, value):
+        """hex string 으로 된 hash 를 raw bytes 로 기록한다. (sha256 hex 64 bytes -> 32 bytes)"""
+        self.write_bytes(bytes.fromhex(value))
+
+    def getvalue(self) -> bytes:
+        return b''.join(self.__chunks)
+
+
+class BinaryReader:
+    """BinaryWriter 로 기록된 buffer 를 복사 없이 순서대로 읽는다."""
+
+    def __init__(self, buffer, offset=0):
+        self.__view = memoryview(buffer)
+        self.__offset = offset
+
+    @property
+    def offset(self):
+        return self.__offset
+
+    def __read(self, size) -> memoryview:
+        end = self.__offset + size
+        if end > len(self.__view):
+            raise ValueError(f"binary block is truncated (need {end}, has {len(self.__view)})")
+        chunk = self.__view[self.__offset:end]
+        self.__offset = end
+        return chunk
+
+    def read_u8(self):
+        return _U8.unpack_from(self.__read(_U8.size))[0]
+
+    def read_u32(self):
+        return _U32.unpack_from(self.__read(_U32.size))[0]
+
+    def read_u64(self):
+        return _U64.unpack_from(self.__read(_U64.size))[0]
+
+    def read_i64(self):
+        return _I64.unpack_from(self.__read(_I64.size))[0]
+
+    def read_bool(self):
+        return self.read_u8() == 1
+
+    def read_raw(self, size) -> memoryview:
+        return self.__read(size)
+
+    def read_bytes_view(self) -> memoryview:
+        return self.__read(self.read_u32())
+
+    def read_bytes(self) -> bytes:
+        return bytes(self.read_bytes_view())
+
+    def read_str(self) -> str:
+        return str(self.read_bytes_view(), 'UTF-8')
+
+    def read_hex(self) -> str:
+        return self.read_bytes_view().hex()
+
+    def skip_bytes(self):
+        self.__read(self.read_u32())
@@ -0,0 +1,348 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Chain snapshot export/import for fast peer bootstrap
+
+새 peer 가 genesis 부터 block_height_sync 로 모든 block 을 받아 invoke 하지 않도록
+block 과 invoke 결과, score state 를 하나의 file 로 옮긴다.
+tx index, 누적 tx 수, chain meta, tx meta index 는 snapshot 에 넣지 않고 import 할 때 검증한 block 으로 다시 만든다.
+
+layout: magic | format version(u8) | header length(u32) | header(json) | records | end(u8 0) | sha256 checksum
+record: block(u8 3) | block dump length(u32) | block dump | invoke results length(u32) | invoke results(json)
+        score archive(u8 2) | length(u64) | tar of score storage
+block record 는 genesis 부터 height 순서로 있고, invoke results 에는 success 가 아닌 tx 의 결과만 있다.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+
+from loopchain import configure as conf
+from loopchain.blockchain.block import Block, BlockStatus
+from loopchain.blockchain.blockchain import BlockChain
+from loopchain.blockchain.exception import SnapshotError
+
+SNAPSHOT_MAGIC = b'LCSNAP'
+SNAPSHOT_FORMAT_VERSION = 2
+
+_RECORD_END = 0
+_RECORD_SCORE_ARCHIVE = 2
+_RECORD_BLOCK = 3
+
+_U8 = struct.Struct('>B')
+_U32 = struct.Struct('>I')
+_U64 = struct.Struct('>Q')
+
+_COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class _ChecksumWriter:
+    """file 에 쓰면서 sha256 을 같이 계산한다."""
+
+    def __init__(self, file):
+        self.__file = file
+        self.__sha256 = hashlib.sha256()
+
+    def write(self, data):
+        self.__sha256.update(data)
+        self.__file.write(data)
+
+    def write_checksum(self):
+        self.__file.write(self.__sha256.digest())
+
+
+class _ChecksumReader:
+    """file 에서 읽으면서 sha256 을 같이 계산한다."""
+
+    def __init__(self, file):
+        self.__file = file
+        self.__sha256 = hashlib.sha256()
+
+    def read(self, size):
+        data = self.__file.read(size)
+        if len(data) != size:
+            raise SnapshotError("snapshot is truncated")
+        self.__sha256.update(data)
+        return data
+
+    def read_struct(self, fmt):
+        return fmt.unpack(self.read(fmt.size))[0]
+
+    def verify_checksum(self):
+        if self.__file.read(hashlib.sha256().digest_size) != self.__sha256.digest():
+            raise SnapshotError("snapshot checksum does not match")
+
+
+class ChainSnapshot:
+    """block 과 invoke 결과 (와 score storage) 를 checksum 이 있는 하나의 snapshot file 로 export/import 한다.
+    peer 를 멈춘 상태에서 chaintool.py 로 사용한다.
+    """
+
+    @staticmethod
+    def export(blockchain: BlockChain, snapshot_path, block_height=None, score_path=None):
+        """block_height 까지의 block 과 invoke 결과를 snapshot 으로 만든다.
+
+        score state 는 block height 별로 남아있지 않으므로 마지막 block 에서만 score_path 를 같이 export 할 수 있다.
+
+        :param blockchain: export 할 BlockChain (segment block store 를 쓰면 block store 와 함께 연다.)
+        :param snapshot_path: 만들 snapshot file
+        :param block_height: snapshot height, None 이면 마지막 block
+        :param score_path: score storage directory (DEFAULT_SCORE_STORAGE_PATH/peer_id)
+        :return: snapshot header
+        """
+        if block_height is None:
+            block_height = blockchain.block_height
+        if not 0 <= block_height <= blockchain.block_height:
+            raise SnapshotError(f"block height({block_height}) is out of chain height({blockchain.block_height})")
+        if score_path is not None and block_height != blockchain.block_height:
+            raise SnapshotError("score state can be exported only at the last block height")
+
+        snapshot_block = blockchain.find_block_by_height(block_height)
+        header = {
+            'channel': snapshot_block.channel_name,
+            'block_height': block_height,
+            'block_hash': snapshot_block.block_hash,
+            'total_tx': blockchain.find_total_tx_by_height(block_height),
+            'has_score_state': score_path is not None
+        }
+
+        with open(snapshot_path, 'wb') as snapshot_file:
+            writer = _ChecksumWriter(snapshot_file)
+            header_bytes = json.dumps(header).encode(encoding=conf.PEER_DATA_ENCODING)
+            writer.write(SNAPSHOT_MAGIC + _U8.pack(SNAPSHOT_FORMAT_VERSION) + _U32.pack(len(header_bytes)))
+            writer.write(header_bytes)
+
+            for height in range(block_height + 1):
+                block_hash = blockchain.find_block_hash_by_height(height)
+                block_dump = blockchain.find_block_dump_by_hash(block_hash)
+                block = Block(channel_name=snapshot_block.channel_name)
+                block.deserialize_block(block_dump)
+                invoke_results = blockchain.find_invoke_results(
+                    [tx.tx_hash for tx in block.confirmed_transaction_list])
+                ChainSnapshot.__write_block(writer, block_dump, {
+                    tx_hash: result for tx_hash, result in invoke_results.items()
+                    if result != BlockChain.SUCCESS_INVOKE_RESULT})
+
+            if score_path is not None:
+                ChainSnapshot.__write_score_archive(writer, score_path)
+
+            writer.write(_U8.pack(_RECORD_END))
+            writer.write_checksum()
+
+        logging.info(f"export snapshot({snapshot_path}) height({block_height}) hash({snapshot_block.block_hash})")
+        return header
+
+    @staticmethod
+    def read_header(snapshot_path) -> dict:
+        with open(snapshot_path, 'rb') as snapshot_file:
+            return ChainSnapshot.__read_header(_ChecksumReader(snapshot_file))
+
+    @staticmethod
+    def verify(snapshot_path, expected_block_hash) -> dict:
+        """snapshot 을 기록하지 않고 import 와 같이 확인한다.
+
+        :param snapshot_path: snapshot file
+        :param expected_block_hash: 믿을 수 있는 peer 에서 받은 snapshot height 의 block hash
+        :return: snapshot header
+        """
+        with open(snapshot_path, 'rb') as snapshot_file:
+            reader = _ChecksumReader(snapshot_file)
+            header = ChainSnapshot.__read_header(reader)
+            for _ in ChainSnapshot.__read_blocks(reader, header, expected_block_hash):
+                pass
+        return header
+
+    @staticmethod
+    def import_(snapshot_path, blockchain_db, expected_block_hash, score_path=None) -> dict:
+        """snapshot 을 한번 읽으면서 block 을 확인하고 비어있는 block db 에 추가한다.
+        tx index, chain meta 등은 확인한 block 으로 다시 만든다.
+        도중에 확인에 실패하면 기록한 block db 와 score storage 를 지운다.
+
+        :param snapshot_path: snapshot file
+        :param blockchain_db: 비어있는 block db
+        :param expected_block_hash: 믿을 수 있는 peer 에서 받은 snapshot height 의 block hash
+        :param score_path: score state 를 풀어 놓을 score storage directory
+        :return: snapshot header
+        """
+        for _ in blockchain_db.range_iter(include_value=False):
+            raise SnapshotError("block db is not empty")
+        if score_path is not None and os.path.exists(score_path) and os.listdir(score_path):
+            raise SnapshotError(f"score path({score_path}) is not empty")
+
+        try:
+            with open(snapshot_path, 'rb') as snapshot_file:
+                reader = _ChecksumReader(snapshot_file)
+                header = ChainSnapshot.__read_header(reader)
+                if header['has_score_state'] and score_path is None:
+                    raise SnapshotError("snapshot has score state but score path is not given")
+
+                blockchain = BlockChain(blockchain_db, header['channel'])
+                blocks = []
+                invoke_results_list = []
+                batch_bytes = 0
+                for block, invoke_results, block_size in ChainSnapshot.__read_blocks(
+                        reader, header, expected_block_hash, score_path):
+                    if block.height == 0:
+                        # 비어있는 block db 에는 BlockChain 이 같은 genesis block 을 만든다.
+                        if block.block_hash != blockchain.last_block.block_hash:
+                            raise SnapshotError(f"snapshot genesis block({block.block_hash}) is different")
+                        continue
+                    blocks.append(block)
+                    invoke_results_list.append(invoke_results)
+                    batch_bytes += block_size
+                    if batch_bytes >= conf.SNAPSHOT_IMPORT_BATCH_BYTES:
+                        blockchain.add_blocks(blocks, invoke_results_list)
+                        blocks, invoke_results_list, batch_bytes = [], [], 0
+                blockchain.add_blocks(blocks, invoke_results_list)
+
+            if blockchain.total_tx != header['total_tx']:
+                raise SnapshotError(f"snapshot total tx({header['total_tx']}) is not ({blockchain.total_tx})")
+        except Exception:
+            ChainSnapshot.__clear(blockchain_db, score_path)
+            raise
+
+        logging.info(f"import snapshot({snapshot_path}) height({header['block_height']}) hash({header['block_hash']})")
+        return header
+
+    @staticmethod
+    def __clear(blockchain_db, score_path):
+        """import 에 실패하면 기록한 block db 와 score storage 를 지워 비어있는 상태로 되돌린다."""
+        batch = blockchain_db.write_batch()
+        for key in blockchain_db.range_iter(include_value=False):
+            batch.delete(bytes(key))
+        batch.write()
+        if score_path is not None:
+            shutil.rmtree(score_path, ignore_errors=True)
+
+    @staticmethod
+    def __write_block(writer, block_dump, invoke_results):
+        invoke_results_bytes = json.dumps(invoke_results).encode(encoding=conf.PEER_DATA_ENCODING)
+        writer.write(_U8.pack(_RECORD_BLOCK) + _U32.pack(len(block_dump)))
+        writer.write(bytes(block_dump))
+        writer.write(_U32.pack(len(invoke_results_bytes)))
+        writer.write(invoke_results_bytes)
+
+    @staticmethod
+    def __write_score_archive(writer, score_path):
+        with tempfile.TemporaryFile() as archive_file:
+            with tarfile.open(fileobj=archive_file, mode='w') as archive:
+                archive.add(score_path, arcname='.')
+            archive_size = archive_file.tell()
+            archive_file.seek(0)
+
+            writer.write(_U8.pack(_RECORD_SCORE_ARCHIVE) + _U64.pack(archive_size))
+            for chunk in iter(lambda: archive_file.read(_COPY_CHUNK_SIZE), b''):
+                writer.write(chunk)
+
+    @staticmethod
+    def __read_header(reader) -> dict:
+        if reader.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise SnapshotError("not a chain snapshot")
+        format_version = reader.read_struct(_U8)
+        if format_version != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"not supported snapshot format version({format_version})")
+        return json.loads(reader.read(reader.read_struct(_U32)).decode(encoding=conf.PEER_DATA_ENCODING))
+
+    @staticmethod
+    def __read_blocks(reader, header, expected_block_hash, score_path=None):
+        """snapshot 의 record 를 순서대로 읽으며 block 을 확인한다. score archive 는 score_path 가 있을 때만 풀어 놓는다.
+
+        block 은 genesis 부터 height 순서로 merkle tree root hash 와 block hash 를 다시 계산하고
+        prev_block_hash 가 앞 block 의 hash 와 같은지 확인한다. tx 서명은 snapshot height 의 block 만 검증한다.
+        (아래 block 의 tx 는 hash 연결로 확인된다.) 마지막으로 snapshot height 의 block hash 와 checksum 을 확인한다.
+
+        :return: generator of (block, tx_hash 별 invoke 결과, block dump 길이)
+        """
+        if expected_block_hash != header['block_hash']:
+            raise SnapshotError(f"snapshot block hash({header['block_hash']}) is not expected({expected_block_hash})")
+
+        block_height = header['block_height']
+        prev_block_hash = ""
+        next_height = 0
+        while True:
+            record_type = reader.read_struct(_U8)
+            if record_type == _RECORD_END:
+                break
+            elif record_type == _RECORD_SCORE_ARCHIVE:
+                ChainSnapshot.__read_score_archive(reader, reader.read_struct(_U64), score_path)
+                continue
+            elif record_type != _RECORD_BLOCK:
+                raise SnapshotError(f"unknown snapshot record type({record_type})")
+
+            block_dump = reader.read(reader.read_struct(_U32))
+            invoke_results = json.loads(reader.read(reader.read_struct(_U32)).decode(conf.PEER_DATA_ENCODING))
+            block = Block(channel_name=header['channel'])
+            try:
+                block.deserialize_block(block_dump)
+            except Exception as e:
+                raise SnapshotError(f"can not read snapshot block at height({next_height}): {e}")
+
+            merkle_tree_root_hash, block_hash = Block.calculate_hash(block)
+            if next_height > block_height or block.height != next_height or \
+                    block.prev_block_hash != prev_block_hash or merkle_tree_root_hash != block.merkle_tree_root_hash \
+                    or block_hash != block.block_hash:
+                raise SnapshotError(f"snapshot block({block.block_hash}) at height({next_height}) is not valid")
+            tx_hashes = [tx.tx_hash for tx in block.confirmed_transaction_list]
+            if not isinstance(invoke_results, dict) or not set(invoke_results).issubset(tx_hashes):
+                raise SnapshotError(f"snapshot block({block.block_hash}) has invoke results of other txs")
+            if next_height == block_height:
+                if block.block_hash != expected_block_hash:
+                    raise SnapshotError(f"snapshot block({block.block_hash}) is not expected({expected_block_hash})")
+                if Block.get_tx_verifier().find_first_invalid(block.confirmed_transaction_list) >= 0:
+                    raise SnapshotError(f"snapshot block({block.block_hash}) has invalid tx")
+
+            block.block_status = BlockStatus.confirmed
+            for tx_hash in tx_hashes:
+                invoke_results.setdefault(tx_hash, dict(BlockChain.SUCCESS_INVOKE_RESULT))
+            prev_block_hash = block.block_hash
+            next_height += 1
+            yield block, invoke_results, len(block_dump)
+
+        reader.verify_checksum()
+        if next_height != block_height + 1:
+            raise SnapshotError(f"snapshot has blocks to height({next_height - 1}) not ({block_height})")
+
+    @staticmethod
+    def __read_score_archive(reader, archive_size, score_path):
+        with tempfile.TemporaryFile() as archive_file:
+            remain = archive_size
+            while remain > 0:
+                chunk = reader.read(min(remain, _COPY_CHUNK_SIZE))
+                archive_file.write(chunk)
+                remain -= len(chunk)
+
+            if score_path is None:
+                return
+            if os.path.exists(score_path) and os.listdir(score_path):
+                raise SnapshotError(f"score path({score_path}) is not empty")
+
+            archive_file.seek(0)
+            os.makedirs(score_path, exist_ok=True)
+            root_path = os.path.abspath(score_path)
+            with tarfile.open(fileobj=archive_file, mode='r') as archive:
+                for member in archive.getmembers():
+                    # score storage 에는 file 과 directory 만 있다. link, device, fifo 는 받지 않는다.
+                    member_path = os.path.abspath(os.path.join(root_path, member.name))
+                    if os.path.commonpath([member_path, root_path]) != root_path or \
+                            not (member.isfile() or member.isdir()):
+                        shutil.rmtree(score_path, ignore_errors=True)
+                        raise SnapshotError(f"snapshot score archive has unsafe member({member.name})")
+                if hasattr(tarfile, 'data_filter'):
+                    archive.extractall(score_path, filter='data')
+                else:
+                    archive.extractall(score_path)
@@ -15,13 +15,18 @@
 
 import hashlib
 import collections
+import json
 import logging
 import struct
 import time
 import loopchain.utils as util
 from enum import Enum
 from loopchain import configure as conf
-from loopchain.tools import PublicVerifierContainer
+from loopchain.blockchain.serializer import TX_RECORD_HEADER
+from loopchain.tools import PublicVerifierContainer, VerifiedTxCache
+
+# binary format 에서 meta 를 읽을 때 key 순서를 유지해야 hash 가 같으므로 OrderedDict 로 복원한다.
+_META_DECODER = json.JSONDecoder(object_pairs_hook=collections.OrderedDict)
 
 
 class TransactionStatus(Enum):
@@ -44,17 +49,42 @@ class Transaction:
     SCORE_VERSION_KEY = 'score_version'
     CHANNEL_KEY = 'channel_name'
 
+    # block 하나에 많은 tx 가 담기므로 instance 마다 __dict__ 를 만들지 않는다.
+    # 정의되지 않은 attribute 를 쓰는 기존 code 를 위해 __dict__ 도 남겨두며, 이 경우에만 dict 가 만들어진다.
+    __slots__ = ('__transaction_status', '__transaction_type', '__meta', '__meta_bytes', '__preimage', '__data',
+                 '__time_stamp', '__transaction_hash', '__public_key', '__signature', '__dict__')
+
     def __init__(self):
         # TODO Client 의 Sign이나 인증에 대한 내용을 트랜잭션에 넣어야 하지 않을까?
         self.__transaction_status = TransactionStatus.unconfirmed
         self.__transaction_type = TransactionType.general
         self.__meta = collections.OrderedDict()  # peer_id, score_id, score_ver ...
-        self.__data = []
+        # hash 계산에 사용되는 meta 의 json bytes, put_meta 에서 무효화 된다.
+        # binary format 에서 읽은 tx 는 이 값만 가지고 있다가 meta 가 처음 사용될 때 OrderedDict 로 복원한다.
+        self.__meta_bytes = None
+        self.__preimage = None  # hash 계산의 입력 (meta bytes + data + time_stamp), put_meta/put_data 에서 무효화 된다.
+        self.__data = b""
         self.__time_stamp = 0
         self.__transaction_hash = ""
         self.__public_key = b""
         self.__signature = b""
 
+    def __getstate__(self):
+        # 계산 결과인 meta bytes 와 preimage 는 다른 peer 로 보내지 않고 받은 쪽에서 다시 계산한다.
+        self.__load_meta()
+        state = util.get_slots_state(self)
+        state['_Transaction__meta_bytes'] = None
+        state['_Transaction__preimage'] = None
+        return state
+
+    def __setstate__(self, state):
+        # 이전 버전에서 pickle 된 tx 에는 cache 항목이 없다.
+        state.setdefault('_Transaction__meta_bytes', None)
+        state.setdefault('_Transaction__preimage', None)
+        if isinstance(state.get('_Transaction__data'), bytearray):
+            state['_Transaction__data'] = bytes(state['_Transaction__data'])
+        util.set_slots_state(self, state)
+
     @property
     def tx_hash(self):
         return self.__transaction_hash
@@ -85,7 +115,27 @@ class Transaction:
 
     @property
     def meta(self):
-        return self.__meta.copy()
+        return self.__load_meta().copy()
+
+    def __load_meta(self):
+        if self.__meta is None:
+            self.__meta = _META_DECODER.decode(self.__meta_bytes.decode('UTF-8'))
+        return self.__meta
+
+    def __get_meta_bytes(self) -> bytes:
+        if self.__meta_bytes is None:
+            self.__meta_bytes = util.dict_to_binary(self.__meta)
+        return self.__meta_bytes
+
+    def get_hash_preimage(self) -> bytes:
+        """tx hash 계산의 입력(meta json bytes + data + time_stamp)을 구한다.
+        한번 만든 값은 put_meta, put_data 전까지 재사용한다.
+
+        :return: preimage bytes
+        """
+        if self.__preimage is None:
+            self.__preimage = b''.join([self.__get_meta_bytes(), self.__data, struct.pack('Q', self.__time_stamp)])
+        return self.__preimage
 
     def put_meta(self, key, value):
         """Tx 의 meta 정보를 구성한다.
@@ -97,7 +147,9 @@ class Transaction:
         :param value:
         :return:
         """
-        self.__meta[key] = value
+        self.__load_meta()[key] = value
+        self.__meta_bytes = None
+        self.__preimage = None
 
     def init_meta(self, peer_id, score_id, score_ver, channel_name: str):
         """Tx 의 meta 정보 중 Peer 에 의해서 초기화되는 부분을 집약하였댜.
@@ -130,19 +182,24 @@ class Transaction:
         """데이터 입력
         data를 받으면 해당 시간의 Time stamp와 data를 가지고 Hash를 생성해서 기록한다.
 
-        :param data: Transaction에 넣고 싶은 data. data가 스트링인 경우 bytearray로 변환한다.
+        :param data: Transaction에 넣고 싶은 data (str, bytes, bytearray, memoryview).
+            data는 변경할 수 없는 bytes 로 보관한다. (스트링인 경우 utf-8)
         :param time_stamp:
         :return Transaction의 data를 가지고 만든 Hash값:
         """
         if isinstance(data, str):
-            self.__data = bytearray(data, 'utf-8')
+            self.__data = data.encode('utf-8')
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self.__data = bytes(data)
         else:
-            self.__data = data
+            # bytes(int) 는 그 길이의 0 으로 채운 bytes 가 되므로 받지 않는다.
+            raise TypeError(f"transaction data should be str or bytes, not {type(data).__name__}")
 
         if time_stamp is None:
             self.__time_stamp = int(time.time()*1000000)
         else:
             self.__time_stamp = time_stamp
+        self.__preimage = None
 
         # logging.debug("transaction Time %s , time_stamp Type %s", self.__time_stamp, type(self.__time_stamp))
 
@@ -160,10 +217,7 @@ class Transaction:
         """
         # self.__transaction_hash = Transaction.generate_transaction_hash(self)
 
-        _meta_byte = util.dict_to_binary(self.__meta)
-        _time_byte = struct.pack('Q', self.__time_stamp)
-        _txByte = b''.join([_meta_byte, self.__data, _time_byte])
-        self.__transaction_hash = hashlib.sha256(_txByte).hexdigest()
+        self.__transaction_hash = hashlib.sha256(self.get_hash_preimage()).hexdigest()
 
         # logging.debug("__generate_hash \ntx hash : " + self.__transaction_hash +
         #               "\ntx meta : " + str(self.__meta) +
@@ -186,11 +240,7 @@ class Transaction:
         :param tx: 트랜잭션
         :return: 트랜잭션 Hash
         """
-        _meta_byte = util.dict_to_binary(tx.meta)
-        _data_byte = tx.get_data()
-        _time_byte = struct.pack('Q', tx.get_timestamp())
-        _txByte = b''.join([_meta_byte, _data_byte, _time_byte])
-        _txhash = hashlib.sha256(_txByte).hexdigest()
+        _txhash = hashlib.sha256(tx.get_hash_preimage()).hexdigest()
         # logging.debug("__generate_hash \ntx hash : " + _txhash +
         #               "\ntx meta : " + str(tx.meta) +
         #               "\ntx data : " + str(tx.get_data()))
@@ -213,6 +263,52 @@ class Transaction:
             logging.error(f"sign transaction {self.tx_hash} fail")
             return False
 
+    def serialize_binary(self) -> bytes:
+        """binary block format 의 tx table 에 기록될 record 를 만든다.
+        고정 길이 header 뒤에 meta(hash 계산에 사용되는 json bytes), data, hash(raw), public_key, signature 가 이어진다.
+
+        :return: tx record
+        """
+        meta_byte = self.__get_meta_bytes()
+        data_byte = self.__data
+        hash_byte = bytes.fromhex(self.__transaction_hash)
+        header = TX_RECORD_HEADER.pack(self.__transaction_status.value, self.__transaction_type.value,
+                                       self.__time_stamp, len(meta_byte), len(data_byte), len(hash_byte),
+                                       len(self.__public_key), len(self.__signature))
+        return b''.join([header, meta_byte, data_byte, hash_byte, self.__public_key, self.__signature])
+
+    @staticmethod
+    def deserialize_binary(record, shared_values=None):
+        """serialize_binary 로 만든 record 에서 tx 를 복원한다.
+
+        :param record: tx record (bytes or memoryview)
+        :param shared_values: 같은 block 의 tx 들이 같은 public_key 를 하나의 bytes object 로 공유하기 위한 dict
+        :return: Transaction
+        """
+        status, tx_type, time_stamp, meta_len, data_len, hash_len, public_key_len, signature_len = \
+            TX_RECORD_HEADER.unpack_from(record)
+        offset = TX_RECORD_HEADER.size
+        record = bytes(record[offset:])
+
+        tx = Transaction()
+        tx.__transaction_status = TransactionStatus(status)
+        tx.__transaction_type = TransactionType(tx_type)
+        tx.__time_stamp = time_stamp
+
+        offset = meta_len
+        tx.__meta = None
+        tx.__meta_bytes = record[:offset]
+        tx.__data = record[offset:offset + data_len]
+        offset += data_len
+        tx.__transaction_hash = record[offset:offset + hash_len].hex()
+        offset += hash_len
+        tx.__public_key = record[offset:offset + public_key_len]
+        if shared_values is not None:
+            tx.__public_key = shared_values.setdefault(tx.__public_key, tx.__public_key)
+        offset += public_key_len
+        tx.__signature = record[offset:offset + signature_len]
+        return tx
+
     @staticmethod
     def validate(tx, is_exception_log=True) -> bool:
         """validate tx(hash, signature)
@@ -227,11 +323,16 @@ class Transaction:
                 Transaction.__logging_tx_validate("hash validate fail", tx)
                 return False
 
+            # 이미 서명 검증을 한 tx 이면 다시 검증하지 않는다.
+            if VerifiedTxCache.is_verified(tx.get_tx_hash(), tx.signature, tx.public_key):
+                return True
+
             # Get Cert Verifier for signature verify
             public_verifier = PublicVerifierContainer.get_public_verifier(tx.public_key)
 
             # Signature Validate
             if public_verifier.verify_hash(tx.get_tx_hash(), tx.signature):
+                VerifiedTxCache.put(tx.get_tx_hash(), tx.signature, tx.public_key)
                 return True
             else:
                 if is_exception_log:
@@ -0,0 +1,206 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Bloom filter of committed tx hashes
+
+GetTx, GetInvokeResult 로 아직 commit 되지 않은 tx 를 polling 하면 없는 key 를 찾느라 level db 의 여러 level 을 읽는다.
+commit 된 tx hash 를 bloom filter 에 넣어 두고 filter 에 없는 tx 는 db 를 읽지 않고 바로 없다고 답한다.
+filter 는 block db 로 언제든 다시 만들 수 있으므로 주기적으로 file 에 저장하고, 저장한 뒤에 추가된 block 은
+peer 를 다시 시작할 때 block db 에서 다시 넣는다.
+
+file layout: magic | version(u8) | bit count(u64) | hash count(u8) | tx count(u64) | block height(i64) |
+             block hash(64) | crc32 of bits(u32) | bits
+"""
+
+import hashlib
+import logging
+import math
+import os
+import struct
+import threading
+import zlib
+
+from loopchain import configure as conf
+
+TX_BLOOM_FILTER_MAGIC = b'LCBF'
+TX_BLOOM_FILTER_VERSION = 1
+TX_BLOOM_FILTER_HEADER = struct.Struct('>4sBQBQq64sI')
+TX_BLOOM_FILTER_DIGEST = struct.Struct('<QQ')
+
+
+class TxBloomFilter:
+    """commit 된 tx hash 의 bloom filter
+
+    might_contain 이 False 이면 tx 는 commit 되지 않은 것이 확실하고, True 이면 db 를 읽어 확인해야 한다.
+    height 는 filter 에 빠짐없이 들어 있는 마지막 block height 로, None 이면 filter 를 아직 만들지 않은 것이다.
+    """
+
+    def __init__(self, path, capacity=None, error_rate=None, load=True):
+        """
+        :param path: filter file path
+        :param capacity: error_rate 를 지키며 넣을 수 있는 tx 수
+        :param error_rate: capacity 만큼 넣었을 때의 false positive 비율
+        :param load: False 이면 file 을 읽지 않고 빈 filter (height -1) 로 시작한다.
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+        self.__capacity = conf.TX_BLOOM_FILTER_CAPACITY if capacity is None else capacity
+        self.__error_rate = conf.TX_BLOOM_FILTER_ERROR_RATE if error_rate is None else error_rate
+
+        bit_count = math.ceil(-self.__capacity * math.log(self.__error_rate) / (math.log(2) ** 2))
+        self.__bit_count = max(64, (bit_count + 7) // 8 * 8)
+        self.__hash_count = max(1, round(self.__bit_count / self.__capacity * math.log(2)))
+        self.__bits = bytearray(self.__bit_count // 8)
+        self.__count = 0
+        self.__height = -1
+        self.__block_hash = ""
+
+        # might_contain 의 결과, 없다고 답한 수와 있다고 답했지만 db 에 없었던 수 (false positive)
+        self.__negatives = 0
+        self.__false_positives = 0
+
+        if load:
+            self.__height = None
+            self.__load()
+
+    def __load(self):
+        if not os.path.exists(self.__path):
+            return
+        with open(self.__path, 'rb') as filter_file:
+            data = filter_file.read()
+        try:
+            magic, version, bit_count, hash_count, count, height, block_hash, checksum = \
+                TX_BLOOM_FILTER_HEADER.unpack_from(data)
+        except struct.error:
+            magic = None
+        bits = data[TX_BLOOM_FILTER_HEADER.size:]
+        if magic != TX_BLOOM_FILTER_MAGIC or version != TX_BLOOM_FILTER_VERSION or \
+                len(bits) * 8 != bit_count or zlib.crc32(bits) != checksum:
+            logging.warning(f"tx bloom filter({self.__path}) is broken, it will be rebuilt")
+            return
+
+        # 저장된 filter 의 크기를 그대로 쓴다. capacity 를 바꾸려면 rebuild 한다.
+        self.__bit_count = bit_count
+        self.__hash_count = hash_count
+        self.__capacity = round(bit_count * (math.log(2) ** 2) / -math.log(self.__error_rate))
+        self.__bits = bytearray(bits)
+        self.__count = count
+        self.__height = height
+        self.__block_hash = block_hash.rstrip(b'\x00').decode('ascii')
+        logging.info(f"load tx bloom filter({self.__path}) txs({count}) height({height})")
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def height(self):
+        return self.__height
+
+    @property
+    def block_hash(self):
+        """height 의 block hash, 저장된 filter 가 지금의 chain 에서 만든 것인지 확인한다."""
+        return self.__block_hash
+
+    @property
+    def capacity(self):
+        return self.__capacity
+
+    @property
+    def count(self):
+        return self.__count
+
+    def set_height(self, height, block_hash):
+        """height 까지의 block 의 tx 가 모두 filter 에 들어 있다고 기록한다.
+
+        :param height: block height, None 이면 filter 를 쓰지 않는다. (rebuild 해야 한다.)
+        :param block_hash: height 의 block hash
+        """
+        with self.__lock:
+            self.__height = height
+            self.__block_hash = block_hash
+
+    def __positions(self, tx_hash: str):
+        # tx hash 하나로 hash_count 개의 bit 위치를 만든다. (double hashing)
+        digest = hashlib.blake2b(tx_hash.encode(conf.HASH_KEY_ENCODING, 'surrogatepass'), digest_size=16).digest()
+        first, second = TX_BLOOM_FILTER_DIGEST.unpack(digest)
+        second |= 1
+        return [(first + i * second) % self.__bit_count for i in range(self.__hash_count)]
+
+    def add(self, tx_hashes):
+        """
+        :param tx_hashes: commit 된 tx hash list
+        """
+        positions = [self.__positions(tx_hash) for tx_hash in tx_hashes]
+        with self.__lock:
+            bits = self.__bits
+            for tx_positions in positions:
+                for position in tx_positions:
+                    bits[position >> 3] |= 1 << (position & 7)
+            self.__count += len(positions)
+
+    def might_contain(self, tx_hash: str) -> bool:
+        """
+        :param tx_hash: tx hash
+        :return: False 이면 commit 되지 않은 tx, True 이면 commit 된 tx 일 수 있다.
+        """
+        bits = self.__bits
+        for position in self.__positions(tx_hash):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                self.__negatives += 1
+                return False
+        return True
+
+    def record_false_positive(self):
+        """might_contain 이 True 였지만 db 에 tx 가 없었던 경우 기록한다."""
+        self.__false_positives += 1
+
+    def expected_error_rate(self) -> float:
+        """지금 들어 있는 tx 수로 계산한 false positive 비율"""
+        return (1 - math.exp(-self.__hash_count * self.__count / self.__bit_count)) ** self.__hash_count
+
+    def save(self):
+        """filter 를 file 에 저장한다. 임시 file 에 기록하고 rename 하므로 저장 중에 멈춰도 이전 file 이 남는다."""
+        with self.__lock:
+            if self.__height is None:
+                return
+            bits = bytes(self.__bits)
+            header = TX_BLOOM_FILTER_HEADER.pack(
+                TX_BLOOM_FILTER_MAGIC, TX_BLOOM_FILTER_VERSION, self.__bit_count, self.__hash_count, self.__count,
+                self.__height, self.__block_hash.encode('ascii'), zlib.crc32(bits))
+
+        temp_path = self.__path + ".tmp"
+        with open(temp_path, 'wb') as filter_file:
+            filter_file.write(header)
+            filter_file.write(bits)
+            filter_file.flush()
+            os.fsync(filter_file.fileno())
+        os.replace(temp_path, self.__path)
+        logging.debug(f"save tx bloom filter({self.__path}) txs({self.__count}) height({self.__height})")
+
+    def get_status(self) -> dict:
+        negatives = self.__negatives
+        false_positives = self.__false_positives
+        return {
+            "height": self.__height,
+            "count": self.__count,
+            "capacity": self.__capacity,
+            "size_bytes": len(self.__bits),
+            "hash_count": self.__hash_count,
+            "expected_false_positive_rate": round(self.expected_error_rate(), 6),
+            # tx 가 없었던 조회 중 filter 가 걸러내지 못한 비율
+            "false_positive_rate": round(false_positives / (negatives + false_positives), 6)
+            if negatives + false_positives > 0 else 0,
+            "negatives": negatives,
+            "false_positives": false_positives
+        }
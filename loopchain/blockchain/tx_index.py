@@ -0,0 +1,114 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Binary positional tx index entry and compact invoke result
+
+block db 의 tx_hash - tx index entry 를 json({'block_hash', 'result'}) 대신 고정 길이 binary 로 기록한다.
+
+tx index layout: format version(u8) | block height(u64) | tx position in block(u32) | result pointer(u8)
+invoke result layout: format version(u8) | code(i32) | payload type(u8) | payload
+"""
+
+import collections
+import json
+import struct
+from enum import IntEnum
+
+TX_INDEX_FORMAT_VERSION = 1
+TX_INDEX_ENTRY = struct.Struct('>BQIB')
+
+INVOKE_RESULT_FORMAT_VERSION = 1
+INVOKE_RESULT_HEADER = struct.Struct('>BiB')
+
+# binary index 이전에 json 으로 기록된 entry 의 첫 byte
+LEGACY_TX_INDEX_PREFIX = b'{'
+
+
+class TxResultPointer(IntEnum):
+    """tx index entry 에서 invoke result 를 찾는 방법"""
+    success = 0  # result 가 {'code': success} 이므로 따로 기록하지 않는다.
+    stored = 1  # BlockChain.INVOKE_RESULT_KEY + tx_hash 에 기록되어 있다.
+
+
+class InvokeResultPayload(IntEnum):
+    """invoke result 에서 code 외의 값을 기록하는 방법"""
+    none = 0  # {'code'} 만 있다.
+    message = 1  # {'code', 'message'}, message 를 UTF-8 로 기록한다.
+    json = 2  # 그 밖의 key 가 있으면 code 를 뺀 나머지를 json 으로 기록한다.
+
+
+TxIndexEntry = collections.namedtuple('TxIndexEntry', 'block_height tx_position result_pointer')
+
+
+def encode_tx_index(block_height, tx_position, result_pointer) -> bytes:
+    return TX_INDEX_ENTRY.pack(TX_INDEX_FORMAT_VERSION, block_height, tx_position, result_pointer)
+
+
+def decode_tx_index(value) -> TxIndexEntry:
+    """
+    :param value: encode_tx_index 로 만든 bytes
+    :return: TxIndexEntry
+    """
+    format_version, block_height, tx_position, result_pointer = TX_INDEX_ENTRY.unpack(value)
+    if format_version != TX_INDEX_FORMAT_VERSION:
+        raise ValueError(f"not supported tx index format version({format_version})")
+    return TxIndexEntry(block_height, tx_position, TxResultPointer(result_pointer))
+
+
+def is_legacy_tx_index(value) -> bool:
+    """json 으로 기록된 이전 format 의 entry 인지 확인한다. (migration 대상)"""
+    return bytes(value[:1]) == LEGACY_TX_INDEX_PREFIX
+
+
+def encode_invoke_result(invoke_result: dict) -> bytes:
+    """score invoke result 를 code 는 정수로, 나머지는 가장 작은 payload 로 기록한다.
+
+    :param invoke_result: {'code': int, ...}
+    :return: bytes
+    """
+    code = invoke_result.get('code')
+    if isinstance(code, int):
+        rest = {key: value for key, value in invoke_result.items() if key != 'code'}
+    else:
+        # 정수가 아닌 code 는 json payload 에 그대로 남겨 decode 할 때 덮어쓴다.
+        code, rest = 0, invoke_result
+
+    if not rest:
+        payload_type, payload = InvokeResultPayload.none, b''
+    elif list(rest) == ['message'] and isinstance(rest['message'], str):
+        payload_type, payload = InvokeResultPayload.message, rest['message'].encode('UTF-8')
+    else:
+        payload_type, payload = InvokeResultPayload.json, json.dumps(rest).encode('UTF-8')
+
+    return INVOKE_RESULT_HEADER.pack(INVOKE_RESULT_FORMAT_VERSION, code, payload_type) + payload
+
+
+def decode_invoke_result(value) -> dict:
+    """
+    :param value: encode_invoke_result 로 만든 bytes, 또는 이전 version 에서 json 으로 기록한 result
+    :return: invoke result dict
+    """
+    if is_legacy_tx_index(value):
+        return json.loads(bytes(value).decode('UTF-8'))
+
+    format_version, code, payload_type = INVOKE_RESULT_HEADER.unpack_from(value)
+    if format_version != INVOKE_RESULT_FORMAT_VERSION:
+        raise ValueError(f"not supported invoke result format version({format_version})")
+
+    payload = bytes(value[INVOKE_RESULT_HEADER.size:])
+    invoke_result = {'code': code}
+    if payload_type == InvokeResultPayload.message:
+        invoke_result['message'] = payload.decode('UTF-8')
+    elif payload_type == InvokeResultPayload.json:
+        invoke_result.update(json.loads(payload.decode('UTF-8')))
+    return invoke_result
@@ -0,0 +1,113 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Secondary index of tx meta (peer_id, score_id) and tx timestamp
+
+block db 에 tx 의 meta 값 별로 정렬된 key 를 기록하여 block 을 모두 훑지 않고 range_iter 로 tx 를 찾는다.
+
+index key layout: TX_META_INDEX_KEY | index(u8) | value length(u16) | value | tx timestamp(u64) |
+                  block height(u64) | tx position in block(u32)
+index value: tx hash
+
+time index 는 value 가 비어 있으므로 모든 tx 가 timestamp 순서로 정렬되며,
+peer_id, score_id index 도 같은 value 안에서는 timestamp 순서이므로 시간 범위로 나누어 읽을 수 있다.
+"""
+
+import collections
+import struct
+from enum import IntEnum
+
+TX_META_INDEX_KEY = b'tx_meta_index_key'
+# index 별로 block height 몇 부터 기록되어 있는지 (index 를 켜기 전의 block 은 backfill 해야 한다.)
+TX_META_INDEX_STATE_KEY = b'tx_meta_index_state_key'
+
+TX_META_INDEX_VALUE_LEN = struct.Struct('>H')
+TX_META_INDEX_LOCATION = struct.Struct('>QQI')
+TX_META_INDEX_STATE = struct.Struct('>Q')
+
+MAX_TX_TIMESTAMP = 2 ** 64 - 1
+
+
+class TxMetaIndex(IntEnum):
+    """tx 를 찾을 수 있는 secondary index, 이름은 conf.TX_META_INDEXES 에 쓰는 값이다."""
+    peer_id = 1  # Transaction.PEER_ID_KEY
+    score_id = 2  # Transaction.SCORE_ID_KEY
+    time = 3  # tx timestamp (value 없음)
+
+
+TxMetaIndexEntry = collections.namedtuple('TxMetaIndexEntry', 'tx_hash timestamp block_height tx_position')
+
+
+def get_tx_meta_indexes(names) -> list:
+    """
+    :param names: conf.TX_META_INDEXES 와 같은 index 이름 목록
+    :return: list of TxMetaIndex
+    """
+    try:
+        return [TxMetaIndex[name] for name in names]
+    except KeyError as e:
+        raise ValueError(f"unknown tx meta index({e})")
+
+
+def tx_meta_index_prefix(index: TxMetaIndex, value=None) -> bytes:
+    """index 에서 value 가 같은 entry 들의 key prefix"""
+    value_bytes = b'' if index is TxMetaIndex.time or value is None else str(value).encode('UTF-8')
+    return TX_META_INDEX_KEY + bytes([index]) + TX_META_INDEX_VALUE_LEN.pack(len(value_bytes)) + value_bytes
+
+
+def encode_tx_meta_index_key(index: TxMetaIndex, value, timestamp, block_height, tx_position) -> bytes:
+    return tx_meta_index_prefix(index, value) + TX_META_INDEX_LOCATION.pack(timestamp, block_height, tx_position)
+
+
+def decode_tx_meta_index_entry(prefix, key, tx_hash) -> TxMetaIndexEntry:
+    """
+    :param prefix: tx_meta_index_prefix 의 결과
+    :param key: range_iter 로 읽은 index key
+    :param tx_hash: index value
+    :return: TxMetaIndexEntry
+    """
+    timestamp, block_height, tx_position = TX_META_INDEX_LOCATION.unpack_from(key, len(prefix))
+    return TxMetaIndexEntry(bytes(tx_hash).decode('UTF-8'), timestamp, block_height, tx_position)
+
+
+def encode_tx_meta_index_cursor(prefix, key) -> str:
+    """다음 page 가 시작할 key 를 index value 를 뺀 hex 문자열로 만든다."""
+    return bytes(key[len(prefix):]).hex()
+
+
+def decode_tx_meta_index_cursor(cursor) -> bytes:
+    location = bytes.fromhex(cursor)
+    if len(location) != TX_META_INDEX_LOCATION.size:
+        raise ValueError(f"wrong tx meta index cursor({cursor})")
+    return location
+
+
+def get_tx_meta_values(tx, indexes) -> list:
+    """tx 를 index 에 기록할 (index, value) 목록, meta 에 값이 없는 index 는 기록하지 않는다.
+
+    :param tx: Transaction
+    :param indexes: list of TxMetaIndex
+    :return: list of (TxMetaIndex, value)
+    """
+    meta = None
+    values = []
+    for index in indexes:
+        if index is TxMetaIndex.time:
+            values.append((index, None))
+            continue
+        if meta is None:
+            meta = tx.meta
+        value = meta.get(index.name)
+        if value is not None and value != '':
+            values.append((index, value))
+    return values
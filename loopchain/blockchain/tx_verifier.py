@@ -0,0 +1,112 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Parallel transaction verification for Block.validate"""
+
+import threading
+from concurrent import futures
+
+from loopchain import configure as conf
+from loopchain.blockchain.transaction import Transaction
+
+
+class TxVerifier:
+    """block 의 tx 들을 thread pool 에서 나누어 검증한다.
+
+    서명 검증은 cryptography(OpenSSL) 안에서 GIL 을 놓고 실행되므로 thread 로도 병렬 처리가 된다.
+    process pool 은 tx 를 매번 serialize 하여 넘겨야 하므로 사용하지 않는다.
+    tx list 를 worker 수 만큼 연속된 구간으로 나누고, 실패한 tx 중 가장 앞의 tx 를 결과로 하므로
+    worker 수와 관계없이 순차 검증과 같은 tx 가 실패 결과로 나온다.
+    """
+
+    def __init__(self, workers=None, parallel_min_tx=None):
+        """
+        :param workers: 검증 thread 수, 1 이하이면 순차 검증한다. (default conf.TX_VERIFY_WORKERS)
+        :param parallel_min_tx: 이보다 tx 가 적은 block 은 순차 검증한다. (default conf.TX_VERIFY_PARALLEL_MIN_TX)
+        """
+        self.__workers = conf.TX_VERIFY_WORKERS if workers is None else workers
+        self.__parallel_min_tx = conf.TX_VERIFY_PARALLEL_MIN_TX if parallel_min_tx is None else parallel_min_tx
+        self.__executor = None
+        self.__executor_lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self.__workers
+
+    def __get_executor(self):
+        with self.__executor_lock:
+            if self.__executor is None:
+                self.__executor = futures.ThreadPoolExecutor(max_workers=self.__workers)
+            return self.__executor
+
+    def shutdown(self):
+        with self.__executor_lock:
+            if self.__executor is not None:
+                self.__executor.shutdown(wait=True)
+                self.__executor = None
+
+    def find_first_invalid(self, tx_list):
+        """tx list 에서 검증에 실패한 첫번째 tx 를 찾는다.
+
+        :param tx_list: 검증할 tx list
+        :return: 실패한 첫번째 tx 의 index, 모두 성공이면 -1
+        """
+        if self.__workers <= 1 or len(tx_list) < max(self.__parallel_min_tx, 2):
+            return self.__verify_range(tx_list, 0, len(tx_list), _FirstFailure())
+
+        first_failure = _FirstFailure()
+        chunk_size = -(-len(tx_list) // self.__workers)
+        executor = self.__get_executor()
+        jobs = [executor.submit(self.__verify_range, tx_list, start, min(start + chunk_size, len(tx_list)),
+                                first_failure)
+                for start in range(0, len(tx_list), chunk_size)]
+        futures.wait(jobs)
+
+        for job in jobs:
+            # worker 안에서 발생한 예외는 여기서 다시 raise 된다.
+            job.result()
+
+        return first_failure.index
+
+    @staticmethod
+    def __verify_range(tx_list, start, end, first_failure):
+        for index in range(start, end):
+            if first_failure.is_before(index):
+                # 앞 구간에서 이미 실패한 tx 가 있으면 나머지는 검증할 필요가 없다.
+                break
+            if not Transaction.validate(tx_list[index]):
+                first_failure.update(index)
+                break
+
+        return first_failure.index
+
+
+class _FirstFailure:
+    """worker 들이 공유하는 가장 앞의 실패 tx index"""
+
+    def __init__(self):
+        self.__index = -1
+        self.__lock = threading.Lock()
+
+    @property
+    def index(self):
+        return self.__index
+
+    def is_before(self, index):
+        failure_index = self.__index
+        return 0 <= failure_index < index
+
+    def update(self, index):
+        with self.__lock:
+            if self.__index < 0 or index < self.__index:
+                self.__index = index
@@ -116,6 +116,9 @@ INTERVAL_WAIT_PEER_VOTE = 0.1  # 0.05
 MAX_RETRY_CREATE_DB = 10
 # default level db path
 DEFAULT_LEVEL_DB_PATH = "./db"
+# block db, peer db, score db(ScoreDatabaseType.key_value) 의 key value store engine ('leveldb' or 'memory')
+# memory 는 process 가 끝나면 data 가 사라지므로 test, simulation 에서만 사용한다.
+KEY_VALUE_STORE_ENGINE = 'leveldb'
 # peer_id (UUID) 는 최초 1회 생성하여 level db에 저장한다.
 LEVEL_DB_KEY_FOR_PEER_ID = str.encode("peer_id_key")
 # String Peer Data Encoding
@@ -130,12 +133,67 @@ MAX_BLOCK_KBYTES = 3000  # default: 3000
 # tx -> block 상황을 체크하는 것이므로 (블럭 나누기의 기준은 아니므로) 실제 블럭에는 설정값 이상의 tx 가 블럭에 담길 수 있다.
 # 실제 블럭에 담기는 tx 를 이 값으로 제어하려면 코드가 추가 되어야 한다. (이 경우 성능 저하 요인이 될 수 있다.)
 MAX_BLOCK_TX_NUM = 10000  # default: 10000
+# Block 검증시 tx 서명을 나누어 검증할 thread 수, 1 이하이면 순차 검증한다.
+TX_VERIFY_WORKERS = 4
+# 이 값보다 tx 가 적은 Block 은 thread 를 쓰지 않고 순차 검증한다.
+TX_VERIFY_PARALLEL_MIN_TX = 100
+# 서명 검증에 성공한 tx 를 기억해 두는 수, 같은 tx 를 AddTx, Block 생성, Block 검증에서 다시 검증하지 않는다.
+VERIFIED_TX_CACHE_SIZE = MAX_BLOCK_TX_NUM * 3
 # 블럭이 합의 되는 투표율 1 = 100%, 0.5 = 50%
 VOTING_RATIO = 0.65
 # Block Height 를 level_db 의 key(bytes)로 변환할때 bytes size
 BLOCK_HEIGHT_BYTES_LEN = 12
 # Leader 의 block 생성 갯수
 LEADER_BLOCK_CREATION_LIMIT = 20000000
+# block height sync 에서 받은 연속된 block 들을 한번의 WriteBatch 로 기록하는 최대 block 수 (1 이면 block 마다 기록)
+# score invoke 는 block 마다 하고 기록은 group 마다 하므로, 기록 전에 peer 가 죽으면 score 는 최대 이 수 만큼
+# chain 보다 앞선 상태로 남는다. (block 마다 기록하면 1) score 를 chain 과 맞추려면 score db 를 지우고 다시 sync 한다.
+BLOCK_SYNC_GROUP_COMMIT_SIZE = 10
+# peer 시작 후 background 에서 chain 을 순회하여 저장된 chain meta (total_tx, height 별 누적 tx 수) 를 검증한다.
+VERIFY_CHAIN_META_ON_STARTUP = False
+# 조회한 block 을 deserialize 된 상태로 보관하는 BlockCache 의 최대 크기 (serialize 된 block bytes 기준, 0 이면 사용 안함)
+BLOCK_CACHE_SIZE_BYTES = 64 * 1024 * 1024
+# block body 를 level db 대신 append-only segment file 에 기록한다. (level db 에는 block hash - segment pointer 만 기록)
+USE_SEGMENT_BLOCK_STORE = False
+BLOCK_SEGMENT_DIR = 'segments'  # level db directory 안에 segment file 을 두는 directory
+BLOCK_SEGMENT_SIZE_BYTES = 256 * 1024 * 1024
+BLOCK_SEGMENT_FSYNC = True  # block body 가 segment pointer 보다 먼저 disk 에 기록되도록 append 마다 fsync 한다.
+# block 을 저장할 때의 압축 ('none', 'zlib', 'lzma'), 압축된 block 은 BlockSync 응답으로 그대로 보낸다.
+# 압축된 block 을 읽지 못하는 이전 version 의 peer 가 BlockSync 를 요청하는 network 에서는 'none' 으로 둔다.
+BLOCK_COMPRESSION = 'none'
+BLOCK_COMPRESSION_LEVEL = 6  # zlib level (1~9) or lzma preset (0~9)
+# 압축된 block 을 풀었을 때의 최대 크기, BlockSync, AnnounceConfirmedBlock 으로 받은 dump 의 raw length 를 제한한다.
+MAX_DECOMPRESSED_BLOCK_BYTES = 64 * 1024 * 1024
+# block 을 추가할 때 함께 기록하는 tx secondary index ('peer_id', 'score_id', 'time'), 빈 list 이면 기록하지 않는다.
+# 이미 block 이 있는 chain 에서 index 를 켜면 이후 block 부터 기록되므로 chaintool.py backfill_tx_meta_index 로 채운다.
+TX_META_INDEXES = []
+# 검증한 unconfirmed block, 투표, leader 변경을 block db 대신 consensus write-ahead log 에 기록한다.
+# peer 를 다시 시작하면 log 를 replay 하여 block height sync 없이 투표 중이던 block 을 confirm 할 수 있다.
+USE_CONSENSUS_WAL = False
+CONSENSUS_WAL_DIR = 'consensus_wal'  # level db directory 안에 wal segment 를 두는 directory
+CONSENSUS_WAL_SYNC_RECORDS = 100  # fsync 하지 않고 쌓아 두는 vote record 의 최대 수
+CONSENSUS_WAL_SYNC_INTERVAL = 0.1  # vote record 를 fsync 하지 않고 두는 최대 시간 (seconds)
+CONSENSUS_WAL_SEGMENT_SIZE_BYTES = 4 * 1024 * 1024  # commit 할 때 이 크기를 넘은 segment 는 필요한 record 만 남기고 정리한다.
+# tx queue 에 넣은 tx 를 commit 될 때까지 disk 의 mempool (append log + snapshot) 에 보관하고 peer 를 다시 시작하면 되살린다.
+USE_PERSISTENT_MEMPOOL = False
+MEMPOOL_DIR = 'mempool'  # level db directory 안에 mempool log 를 두는 directory
+MEMPOOL_SYNC_RECORDS = 1000  # fsync 하지 않고 쌓아 두는 tx 의 최대 수
+MEMPOOL_SYNC_INTERVAL = 0.1  # 받은 tx 를 fsync 하지 않고 두는 최대 시간 (seconds)
+MEMPOOL_COMPACT_BYTES = 64 * 1024 * 1024  # block commit 후 log 가 이 크기를 넘으면 남은 tx 만 snapshot 으로 정리한다.
+MEMPOOL_MAX_TXS = 1000000  # mempool 에 보관하는 tx 의 최대 수, 넘으면 오래된 tx 부터 지운다.
+# block header (hash, prev hash, merkle root, timestamp, tx count, height) 를 height 순서의 고정 크기 array 로 memory 에 두고
+# header file 에 append 한다. block 당 116 bytes 를 사용하며 height 로 block hash, header 를 db 를 읽지 않고 구한다.
+USE_HEADER_CHAIN = False
+HEADER_CHAIN_FILE = 'headers.dat'  # level db directory 안의 header file
+# commit 된 tx hash 의 bloom filter 로 GetTx, GetInvokeResult 에서 commit 되지 않은 tx 는 db 를 읽지 않고 없다고 답한다.
+# filter 가 없거나 chain 과 맞지 않으면 peer 시작 후 background 에서 block db 로 다시 만든다.
+USE_TX_BLOOM_FILTER = False
+TX_BLOOM_FILTER_FILE = 'tx_bloom_filter.dat'  # level db directory 안의 filter file
+TX_BLOOM_FILTER_CAPACITY = 10 * 1000 * 1000  # 넘으면 chain 의 tx 수의 2배로 다시 만든다. (기본 값으로 약 18MB)
+TX_BLOOM_FILTER_ERROR_RATE = 0.001  # capacity 만큼 넣었을 때의 false positive 비율
+TX_BLOOM_FILTER_SAVE_BLOCKS = 1000  # 이 수의 block 이 추가될 때마다 filter 를 file 에 저장한다.
+# chain snapshot 을 import 할 때 한번의 WriteBatch 로 기록하는 크기 (bytes)
+SNAPSHOT_IMPORT_BATCH_BYTES = 16 * 1024 * 1024
 # Block vote timeout
 BLOCK_VOTE_TIMEOUT = 60 * 10  # seconds
 # default storage path
@@ -182,6 +240,11 @@ DEFAULT_SSL_CERT_PATH = 'resources/ssl_test_cert/cert.pem'
 DEFAULT_SSL_KEY_PATH = 'resources/ssl_test_cert/key.pem'
 DEFAULT_SSL_TRUST_CERT_PATH = 'resources/ssl_test_ca/cert.pem'
 REST_ADDITIONAL_TIMEOUT = 30  # seconds
+MAX_INVOKE_RESULTS_PER_REQUEST = 1000  # GetInvokeResults(/api/v1/transactions/results) 한번에 조회할 수 있는 tx 수
+MAX_TX_PROOFS_PER_REQUEST = 1000  # tx proof(/api/v1/transactions/proof) 한번에 조회할 수 있는 tx 수
+MAX_BLOCKS_PER_REQUEST = 100  # block range 조회(/api/v1/blocks/range) 한 page 의 최대 block 수
+MAX_BLOCK_HEADERS_PER_REQUEST = 1000  # block range 를 header 만 조회할 때 한 page 의 최대 block 수
+MAX_TXS_PER_META_QUERY = 1000  # tx meta index 조회(/api/v1/transactions/search) 한 page 의 최대 tx 수
 REST_PROXY_DEFAULT_PORT = 5000
 USE_GUNICORN_HA_SERVER = False   # Use high aviability gunicorn web server.
 
@@ -248,6 +311,8 @@ TOKEN_TYPE_SIGN = "02"
 # Signature ###
 ###############
 IS_KEY_FILE_LOAD = True
+# 서명 검증을 위해 public key 별로 만들어 두는 PublicVerifier 의 최대 수 (LRU)
+PUBLIC_VERIFIER_CACHE_SIZE = 10000
 PRIVATE_PATH = os.path.join(LOOPCHAIN_ROOT_PATH, 'resources/default_pki/private.der')
 PUBLIC_PATH = os.path.join(LOOPCHAIN_ROOT_PATH, 'resources/default_pki/public.der')
 DEFAULT_PW = b'test'
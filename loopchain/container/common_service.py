@@ -24,6 +24,7 @@ import loopchain.utils as util
 from loopchain import configure as conf
 from loopchain.baseservice import BroadcastProcess, CommonThread, ObjectManager
 from loopchain.protos import loopchain_pb2, message_code
+from loopchain.tools import PublicVerifierContainer, VerifiedTxCache
 
 # loopchain_pb2 를 아래와 같이 import 하지 않으면 broadcast 시도시 pickle 오류가 발생함
 import loopchain_pb2
@@ -74,6 +75,8 @@ class CommonService(CommonThread):
 
         if block_manager is not None:
             status_data["made_block_count"] = block_manager.get_blockchain().made_block_count
+            status_data["block_cache"] = block_manager.get_blockchain().block_cache.get_status()
+            status_data["tx_bloom_filter"] = block_manager.get_blockchain().get_tx_bloom_filter_status()
             if block_manager.get_blockchain().last_block is not None:
                 block_height = block_manager.get_blockchain().last_block.height
                 logging.debug("getstatus block hash(block_manager.get_blockchain().last_block.block_hash): "
@@ -98,6 +101,8 @@ class CommonService(CommonThread):
         status_data["block_height"] = block_height
         status_data["total_tx"] = total_tx
         status_data["peer_target"] = self.__peer_target
+        status_data["verified_tx_cache"] = VerifiedTxCache.get_status()
+        status_data["public_verifier_cache"] = PublicVerifierContainer.get_status()
         if ObjectManager().peer_service is not None:
             # TODO tx service 는 더이상 사용되지 않는다. 아래 코드는 의도에 맞게 다시 작성되어야 한다.
             # status_data["leader_complaint"] = ObjectManager().peer_service.tx_service.peer_status.value
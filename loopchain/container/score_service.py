@@ -20,7 +20,7 @@ import pickle
 
 import loopchain.utils as util
 from loopchain.baseservice import ObjectManager, PeerScore
-from loopchain.blockchain import Transaction, ScoreInvokeError
+from loopchain.blockchain import Block, Transaction, ScoreInvokeError
 from loopchain.container import Container
 from loopchain.protos import loopchain_pb2, loopchain_pb2_grpc, message_code
 from loopchain import configure as conf
@@ -167,7 +167,8 @@ class ScoreService(Container, loopchain_pb2_grpc.ContainerServicer):
             logging.error("There is no score!!")
             return loopchain_pb2.Message(code=message_code.Response.fail)
         else:
-            block = pickle.loads(request.object)
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            block.deserialize_block(request.object)
             logging.debug('tx_list_length : %d ', len(block.confirmed_transaction_list))
             for transaction in block.confirmed_transaction_list:
                 if isinstance(transaction, Transaction) and transaction.get_tx_hash() is not None:
@@ -13,14 +13,18 @@
 # limitations under the License.
 """A management class for blockchain."""
 
+import os
 import queue
 import shutil
+import threading
+import time
 import uuid
 
 import grpc
 
 from loopchain.baseservice import CommonThread, ObjectManager, Timer
 from loopchain.blockchain import *
+from loopchain.blockchain.tx_meta_index import get_tx_meta_indexes
 from loopchain.peer.candidate_blocks import CandidateBlocks
 from loopchain.peer.consensus_default import ConsensusDefault
 from loopchain.peer.consensus_lft import ConsensusLFT
@@ -43,13 +47,39 @@ class BlockManager(CommonThread):
         self.__level_db_path = ""
         self.__level_db, self.__level_db_path = util.init_level_db(f"{level_db_identity}_{channel_name}")
         self.__txQueue = queue.Queue()
+        # AddTx 로 받은 tx 는 AddTx 밖에서 서명을 미리 검증하여 VerifiedTxCache 에 넣어 둔다. (가득 차면 건너뛴다.)
+        self.__tx_verify_queue = queue.Queue(maxsize=conf.VERIFIED_TX_CACHE_SIZE)
         self.__unconfirmedBlockQueue = queue.Queue()
+        self.__common_service = common_service
+        self.__block_store = None
+        block_store_path = os.path.join(self.__level_db_path, conf.BLOCK_SEGMENT_DIR)
+        if conf.USE_SEGMENT_BLOCK_STORE or os.path.exists(block_store_path):
+            # segment store 를 끈 뒤에도 이미 segment 에 기록된 block 은 읽을 수 있어야 한다.
+            self.__block_store = SegmentBlockStore(block_store_path, read_only=not conf.USE_SEGMENT_BLOCK_STORE)
+        self.__consensus_wal = None
+        if conf.USE_CONSENSUS_WAL:
+            self.__consensus_wal = ConsensusWAL(os.path.join(self.__level_db_path, conf.CONSENSUS_WAL_DIR))
         self.__candidate_blocks = None
         if ObjectManager().peer_service is not None:
-            self.__candidate_blocks = CandidateBlocks(ObjectManager().peer_service.peer_id, channel_name)
-        self.__common_service = common_service
-        self.__blockchain = BlockChain(self.__level_db, channel_name)
-        self.__total_tx = self.__blockchain.rebuild_blocks()
+            self.__candidate_blocks = CandidateBlocks(ObjectManager().peer_service.peer_id, channel_name,
+                                                      self.__consensus_wal)
+        self.__mempool = None
+        if conf.USE_PERSISTENT_MEMPOOL:
+            self.__mempool = PersistentMempool(os.path.join(self.__level_db_path, conf.MEMPOOL_DIR))
+        self.__header_chain = None
+        if conf.USE_HEADER_CHAIN:
+            self.__header_chain = HeaderChain(os.path.join(self.__level_db_path, conf.HEADER_CHAIN_FILE))
+        tx_bloom_filter = None
+        if conf.USE_TX_BLOOM_FILTER:
+            tx_bloom_filter = TxBloomFilter(os.path.join(self.__level_db_path, conf.TX_BLOOM_FILTER_FILE))
+        self.__blockchain = BlockChain(self.__level_db, channel_name, self.__block_store, self.__consensus_wal,
+                                       self.__mempool, self.__header_chain, tx_bloom_filter)
+        if tx_bloom_filter is not None and not self.__blockchain.is_tx_bloom_filter_ready():
+            threading.Thread(target=self.__blockchain.rebuild_tx_bloom_filter, daemon=True).start()
+        if self.__mempool is not None:
+            self.__load_mempool()
+        if conf.VERIFY_CHAIN_META_ON_STARTUP:
+            threading.Thread(target=self.__blockchain.verify_chain_meta, daemon=True).start()
         self.__peer_type = None
         self.__block_type = BlockType.general
         self.__consensus = None
@@ -88,6 +118,9 @@ class BlockManager(CommonThread):
         self.__peer_type = peer_type
 
         if self.__peer_type == loopchain_pb2.BLOCK_GENERATOR:
+            if self.__consensus_wal is not None and self.__candidate_blocks is not None:
+                # 다시 시작하기 전에 leader 로서 생성하여 투표를 받던 block 을 이어서 처리한다.
+                self.__candidate_blocks.restore(self.__consensus_wal.state, self.__blockchain.last_block)
             if conf.CONSENSUS_ALGORITHM == conf.ConsensusAlgorithm.none:
                 self.__consensus = ConsensusNone(self)
             elif conf.CONSENSUS_ALGORITHM == conf.ConsensusAlgorithm.siever:
@@ -106,7 +139,7 @@ class BlockManager(CommonThread):
 
         :return: 블럭체인안의 transaction total count
         """
-        return self.__total_tx
+        return self.__blockchain.total_tx
 
     def get_blockchain(self):
         return self.__blockchain
@@ -114,6 +147,25 @@ class BlockManager(CommonThread):
     def get_candidate_blocks(self):
         return self.__candidate_blocks
 
+    def get_consensus_wal(self):
+        return self.__consensus_wal
+
+    def vote_to_block(self, block_hash, is_validate, peer_id, group_id):
+        """peer 로 부터 받은 vote 를 consensus wal 에 기록하고 candidate block 에 반영한다.
+
+        :param block_hash: 투표한 block hash
+        :param is_validate: 검증 성공 값 (True | False)
+        :param peer_id: 투표한 peer
+        :param group_id: 투표한 peer 의 group
+        """
+        if self.__consensus_wal is not None:
+            self.__consensus_wal.write_vote(block_hash, peer_id, group_id, is_validate)
+        self.__candidate_blocks.vote_to_block(block_hash, is_validate, peer_id, group_id)
+
+    def write_leader_change(self, leader_id):
+        if self.__consensus_wal is not None:
+            self.__consensus_wal.write_leader_change(leader_id, self.__blockchain.block_height)
+
     def broadcast_getstatus(self):
         """peer 들의 접속 상태를 확인하기 위해서 status 조회를 broadcast 로 모든 peer 에 전달한다.
         """
@@ -129,7 +181,7 @@ class BlockManager(CommonThread):
                       str(ObjectManager().peer_service.channel_manager.get_peer_manager(
                           self.__channel_name).get_peer_count()))
 
-        dump = pickle.dumps(block)
+        dump = block.serialize_block()
         if len(block.confirmed_transaction_list) > 0:
             self.__blockchain.increase_made_block_count()
         if self.__common_service is not None:
@@ -144,7 +196,7 @@ class BlockManager(CommonThread):
         logging.info("BroadCast AnnounceConfirmedBlock....")
         if self.__common_service is not None:
             if block is not None:
-                dump = pickle.dumps(block)
+                dump = block.serialize_block()
                 self.__common_service.broadcast("AnnounceConfirmedBlock",
                                                 (loopchain_pb2.BlockAnnounce(
                                                     block_hash=block_hash,
@@ -162,6 +214,33 @@ class BlockManager(CommonThread):
         """
         self.__common_service.broadcast_audience_set()
 
+    def __load_mempool(self):
+        """peer 가 멈추기 전에 commit 되지 않은 tx 를 tx queue 에 다시 넣는다.
+        block 을 기록한 뒤 mempool 에서 지우기 전에 멈췄다면 그 block 들의 tx 를 먼저 지운다.
+        """
+        if self.__mempool.pruned_height is None:
+            # 처음 만든 mempool 에는 이미 commit 된 tx 가 없다.
+            self.__mempool.prune([], self.__blockchain.block_height)
+        elif self.__mempool.pruned_height < self.__blockchain.block_height:
+            for block in self.__blockchain.iter_blocks(self.__mempool.pruned_height + 1):
+                self.__mempool.prune([tx.tx_hash for tx in block.confirmed_transaction_list], block.height)
+
+        # commit 된 뒤에 다시 받은 tx 는 block 생성에서 걸러 mempool 에서 지운다.
+        for tx_unloaded in self.__mempool.get_txs():
+            self.__txQueue.put(tx_unloaded)
+        logging.info(f"channel({self.__channel_name}) reload uncommitted txs({self.__txQueue.qsize()}) from mempool")
+
+    def get_mempool(self):
+        return self.__mempool
+
+    def remove_txs_from_mempool(self, tx_hashes):
+        """block 생성에서 버려진 tx 를 mempool 에서 지운다. 지우지 않으면 peer 를 다시 시작할 때마다 다시 queue 에 들어간다.
+
+        :param tx_hashes: 버려진 tx hash list
+        """
+        if self.__mempool is not None and tx_hashes:
+            self.__mempool.remove(tx_hashes)
+
     def add_tx(self, tx):
         """전송 받은 tx 를 Block 생성을 위해서 큐에 입력한다. txQueue 는 unloaded(dump) object 를 처리하므로
         tx object 는 dumps 하여 입력한다.
@@ -169,14 +248,50 @@ class BlockManager(CommonThread):
         :param tx: transaction object
         """
         tx_unloaded = pickle.dumps(tx)
-        self.__txQueue.put(tx_unloaded)
+        self.add_tx_unloaded(tx_unloaded, tx_hash=tx.tx_hash)
 
-    def add_tx_unloaded(self, tx):
+    def add_tx_unloaded(self, tx, persist=True, tx_hash=None):
         """전송 받은 tx 를 Block 생성을 위해서 큐에 입력한다. load 하지 않은 채 입력한다.
 
         :param tx: transaction object
+        :param persist: False 이면 mempool 에 기록하지 않는다. (이미 mempool 에 있는 tx 를 queue 에 다시 넣을 때)
+        :param tx_hash: tx 의 hash, mempool 에 같이 기록한다. 없으면 mempool 을 쓸 때만 tx 를 load 해서 구한다.
         """
+        if persist and self.__mempool is not None:
+            try:
+                if tx_hash is None:
+                    tx_hash = pickle.loads(tx).tx_hash
+                self.__mempool.add(tx_hash, tx)
+            except Exception as e:
+                logging.warning(f"can not write received tx to mempool: {e}")
         self.__txQueue.put(tx)
+        if persist:
+            try:
+                self.__tx_verify_queue.put_nowait(tx)
+            except queue.Full:
+                pass
+
+    def __verify_received_txs(self):
+        """받은 tx 의 서명을 AddTx 와 block 생성 thread 밖에서 미리 검증한다.
+        검증된 tx 는 VerifiedTxCache 에 들어가므로 Block 생성(put_transaction)과 Block 검증에서는 다시 검증하지 않는다.
+        서명이 틀린 tx 는 block 생성에서 걸러진다.
+        """
+        while self.is_run():
+            try:
+                tx_unloaded = self.__tx_verify_queue.get(timeout=conf.SLEEP_SECONDS_IN_SERVICE_LOOP)
+            except queue.Empty:
+                continue
+            try:
+                Transaction.validate(pickle.loads(tx_unloaded), is_exception_log=False)
+            except Exception as e:
+                logging.debug(f"can not verify received tx: {e}")
+
+    def __sync_consensus_wal(self):
+        """다른 peer 에게 받은 vote 가 다음 vote 가 올 때까지 fsync 되지 않고 남지 않도록 sync_interval 마다 fsync 한다.
+        """
+        while self.is_run():
+            time.sleep(conf.CONSENSUS_WAL_SYNC_INTERVAL)
+            self.__consensus_wal.sync()
 
     def get_tx(self, tx_hash):
         """tx_hash 로 저장된 tx 를 구한다.
@@ -194,6 +309,84 @@ class BlockManager(CommonThread):
         """
         return self.__blockchain.find_invoke_result_by_tx_hash(tx_hash)
 
+    def get_invoke_results(self, tx_hashes):
+        """ get invoke results of many txs at once
+
+        :param tx_hashes: tx hash list
+        :return: {tx_hash: invoke result}
+        """
+        return self.__blockchain.find_invoke_results(tx_hashes)
+
+    def get_tx_proofs(self, tx_hashes):
+        """tx_hashes 의 merkle multi-proof 를 block 별로 구한다.
+
+        :param tx_hashes: 증명하려는 tx hash list
+        :return: BlockChain.find_tx_proofs 참고
+        """
+        return self.__blockchain.find_tx_proofs(tx_hashes)
+
+    def get_block_range(self, start_height, end_height=None, headers_only=False, limit=conf.MAX_BLOCKS_PER_REQUEST):
+        """height 가 [start_height, end_height) 인 block 을 한 page(limit) 씩 구한다.
+
+        :param start_height: 시작 height (포함)
+        :param end_height: 끝 height (제외), None 이면 마지막 block 까지
+        :param headers_only: True 이면 block header 만 구한다.
+        :param limit: 한 page 의 최대 block 수
+        :return: (block json list, 다음 page 의 start_height or None)
+        """
+        if end_height is None or end_height > self.__blockchain.block_height + 1:
+            end_height = self.__blockchain.block_height + 1
+        page_end_height = min(end_height, start_height + limit)
+
+        blocks = []
+        for block in self.__blockchain.iter_blocks(start_height, page_end_height, headers_only):
+            if headers_only:
+                blocks.append(block)
+                continue
+            block_json = block.get_header()
+            block_json['transactions'] = [
+                {'tx_hash': tx.tx_hash, 'timestamp': tx.get_timestamp(), 'data_string': tx.get_data_string()}
+                for tx in block.confirmed_transaction_list]
+            blocks.append(block_json)
+
+        return blocks, (page_end_height if page_end_height < end_height else None)
+
+    def get_block_header(self, block_height=None, block_hash=None):
+        """block 을 deserialize 하지 않고 header 만 구한다.
+
+        :param block_height: block height, block_hash 가 없을 때 사용한다.
+        :param block_hash: block hash
+        :return: None or header dict (HEADER_CHAIN_KEYS)
+        """
+        if block_hash is not None:
+            return self.__blockchain.find_header_by_hash(block_hash)
+        return self.__blockchain.find_header_by_height(block_height)
+
+    def get_block_header_by_time(self, time_stamp):
+        """time_stamp 또는 그 이전에 만들어진 마지막 block 의 header 를 구한다.
+
+        :param time_stamp: block time stamp (micro seconds)
+        :return: None or header dict (HEADER_CHAIN_KEYS)
+        """
+        return self.__blockchain.find_header_by_time(time_stamp)
+
+    def find_txs_by_meta(self, index_name, value=None, time_from=None, time_to=None, cursor=None,
+                         limit=conf.MAX_TXS_PER_META_QUERY):
+        """tx meta index 에서 tx 를 한 page(limit) 씩 구한다.
+
+        :param index_name: TxMetaIndex 의 이름 ('peer_id', 'score_id', 'time')
+        :param value: peer_id or score_id
+        :param time_from: tx timestamp 의 시작 (포함)
+        :param time_to: tx timestamp 의 끝 (제외)
+        :param cursor: 이전 page 의 next_cursor
+        :param limit: 한 page 의 최대 tx 수
+        :return: (tx json list, 다음 page 의 cursor or None, index 가 기록되어 있는 첫 block height)
+        """
+        index = get_tx_meta_indexes([index_name])[0]
+        entries, next_cursor = self.__blockchain.find_txs_by_meta(index, value, time_from, time_to, cursor, limit)
+        txs = [entry._asdict() for entry in entries]
+        return txs, next_cursor, self.__blockchain.get_tx_meta_index_height(index)
+
     def get_tx_queue(self):
         return self.__txQueue
 
@@ -206,7 +399,7 @@ class BlockManager(CommonThread):
 
     def confirm_block(self, block_hash):
         try:
-            self.__total_tx += self.__blockchain.confirm_block(block_hash)
+            self.__blockchain.confirm_block(block_hash)
         except BlockchainError as e:
             logging.warning("BlockchainError, retry block_height_sync")
             self.block_height_sync()
@@ -250,9 +443,15 @@ class BlockManager(CommonThread):
         self.__unconfirmedBlockQueue.put(unconfirmed_block)
 
     def add_block(self, block):
-        self.__total_tx += block.confirmed_transaction_list.__len__()
         self.__blockchain.add_block(block)
 
+    def add_blocks(self, blocks):
+        """연속된 block 들을 한번에 기록한다. (block height sync 의 group commit)
+
+        :param blocks: 높이 순서로 연결된 block list
+        """
+        self.__blockchain.add_blocks(blocks)
+
     def block_height_sync(self, target_peer_stub=None):
         """block height sync with other peers
         """
@@ -339,7 +538,8 @@ class BlockManager(CommonThread):
                     if response is not None and response.response_code == message_code.Response.success:
                         util.logger.spam(f"response block_height({response.block_height})")
                         dump = response.block
-                        block = pickle.loads(dump)
+                        block = Block(channel_name=self.__channel_name)
+                        block.deserialize_block(dump)
 
                         # 마지막 블럭에서 역순으로 블럭을 구한다.
                         request_hash = block.prev_block_hash
@@ -364,14 +564,22 @@ class BlockManager(CommonThread):
 
             if preload_blocks.__len__() > 0:
                 while my_height < max_height:
+                    # 연속된 block 들은 conf.BLOCK_SYNC_GROUP_COMMIT_SIZE 개씩 한번의 WriteBatch 로 기록한다.
+                    group_blocks = []
                     add_height = my_height + 1
-                    logging.debug("try add block height: " + str(add_height))
-                    try:
-                        block_manager.add_block(preload_blocks[add_height])
-                        my_height = add_height
-                    except KeyError as e:
-                        logging.error("fail block height sync: " + str(e))
+                    while add_height <= max_height and add_height in preload_blocks \
+                            and len(group_blocks) < conf.BLOCK_SYNC_GROUP_COMMIT_SIZE:
+                        group_blocks.append(preload_blocks[add_height])
+                        add_height += 1
+
+                    if len(group_blocks) == 0:
+                        logging.error("fail block height sync: " + str(add_height))
                         break
+
+                    logging.debug("try add block height: " + str(my_height + 1) + " ~ " + str(add_height - 1))
+                    try:
+                        block_manager.add_blocks(group_blocks)
+                        my_height = add_height - 1
                     except exception.BlockError as e:
                         logging.error("Block Error Clear all block and restart peer.")
                         block_manager.clear_all_blocks()
@@ -392,10 +600,18 @@ class BlockManager(CommonThread):
         """
 
         logging.info(f"channel({self.__channel_name}) Block Manager thread Start.")
+        threading.Thread(target=self.__verify_received_txs, daemon=True).start()
+        if self.__consensus_wal is not None:
+            threading.Thread(target=self.__sync_consensus_wal, daemon=True).start()
 
         while self.is_run():
             self.__run_logic()
 
+        if self.__consensus_wal is not None:
+            self.__consensus_wal.sync()
+        if self.__mempool is not None:
+            self.__mempool.sync()
+        self.__blockchain.save_tx_bloom_filter()
         logging.info(f"channel({self.__channel_name}) Block Manager thread Ended.")
 
     def __do_vote(self):
@@ -437,6 +653,10 @@ class BlockManager(CommonThread):
 
                     self.block_height_sync()
 
+            if self.__consensus_wal is not None and ObjectManager().peer_service is not None:
+                # 다시 시작한 뒤 같은 block 에 다르게 투표하지 않도록 투표를 보내기 전에 fsync 한다.
+                self.__consensus_wal.write_vote(unconfirmed_block.block_hash, ObjectManager().peer_service.peer_id,
+                                                ObjectManager().peer_service.group_id, block_is_validated, sync=True)
             self.__common_service.vote_unconfirmed_block(
                 unconfirmed_block.block_hash, block_is_validated, self.__channel_name)
 
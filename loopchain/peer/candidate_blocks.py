@@ -19,6 +19,7 @@ import logging
 import loopchain.utils as util
 from loopchain import configure as conf
 from loopchain.baseservice import ObjectManager
+from loopchain.blockchain import Block
 from loopchain.peer import Vote
 
 
@@ -50,12 +51,14 @@ class CandidateBlocks:
     unconfirmed block 을 저장하고, 각 peer 로 부터 vote 된 결과를 반영한다.
     """
 
-    def __init__(self, peer_id, channel_name):
+    def __init__(self, peer_id, channel_name, consensus_wal=None):
         """
         :param voter_count: 전체 투표 가능 Peer 수의 초기값 설정, 변경시 set_voter_count 로 동기화 되어야 한다.
+        :param consensus_wal: ConsensusWAL, 있으면 생성한 block 을 기록하여 다시 시작한 뒤 restore 로 투표를 이어간다.
         """
         self.__peer_id = peer_id
         self.__channel_name = channel_name
+        self.__consensus_wal = consensus_wal
         self.__unconfirmed_blocks = collections.OrderedDict()  # $block_hash : [$vote, $block], ... 인 Ordered Dictionary
         self.__candidate_last_block = None
 
@@ -76,8 +79,43 @@ class CandidateBlocks:
 
         self.__unconfirmed_blocks[block.block_hash] = [vote, block]
         self.__candidate_last_block = block
+        if self.__consensus_wal is not None:
+            self.__consensus_wal.write_candidate_block(block.block_hash, block.height, block.serialize_block())
         return block.block_hash
 
+    def restore(self, consensus_wal_state, last_block):
+        """consensus wal 을 replay 한 상태에서 이 peer 가 생성한 candidate block 과 받은 vote 를 되살린다.
+        다른 leader 의 block (peer 로서 투표한 block) 은 되살리지 않는다.
+
+        :param consensus_wal_state: ConsensusWALState
+        :param last_block: block chain 의 마지막 block, 이 block 에 이어지는 candidate block 만 되살린다.
+        :return: 되살린 block 수
+        """
+        restored_count = 0
+        prev_block = self.get_last_block(None) or last_block
+        for block_hash, (block_height, block_dump) in consensus_wal_state.candidate_blocks.items():
+            if block_height != prev_block.height + 1 or block_hash in self.__unconfirmed_blocks:
+                continue
+            block = Block(channel_name=self.__channel_name)
+            block.deserialize_block(block_dump)
+            if block.peer_id != self.__peer_id or block.prev_block_hash != prev_block.block_hash:
+                continue
+
+            vote = Vote(block_hash,
+                        ObjectManager().peer_service.channel_manager.get_peer_manager(self.__channel_name))
+            vote.add_vote(ObjectManager().peer_service.group_id, ObjectManager().peer_service.peer_id, None)
+            for peer_id, (group_id, is_validate) in consensus_wal_state.votes.get(block_hash, {}).items():
+                vote.add_vote(group_id, peer_id, (conf.TEST_FAIL_VOTE_SIGN, None)[is_validate])
+
+            self.__unconfirmed_blocks[block_hash] = [vote, block]
+            self.__candidate_last_block = block
+            prev_block = block
+            restored_count += 1
+
+        if restored_count > 0:
+            logging.info(f"restore candidate blocks({restored_count}) from consensus wal ({self.__channel_name})")
+        return restored_count
+
     def reset_voter_count(self, block_hash):
         logging.debug(f"({self.__channel_name}) Reset voter count in candidate blocks")
         vote = Vote(block_hash, ObjectManager().peer_service.channel_manager.get_peer_manager(self.__channel_name))
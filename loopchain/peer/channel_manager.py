@@ -13,7 +13,6 @@
 # limitations under the License.
 """ A class for Manage Channels """
 import json
-import leveldb
 import logging
 import pickle
 
@@ -25,6 +24,7 @@ from loopchain.baseservice import PeerManager, StubManager, ObjectManager
 from loopchain.container import CommonService, ScoreService
 from loopchain.peer import BlockManager
 from loopchain.protos import loopchain_pb2_grpc, message_code, loopchain_pb2
+from loopchain.store import KeyValueStoreError
 
 
 class ChannelManager:
@@ -55,8 +55,8 @@ class ChannelManager:
                 channel_name=channel,
                 level_db_identity=self.__level_db_identity
             )
-        except leveldb.LevelDBError as e:
-            util.exit_and_msg("LevelDBError(" + str(e) + ")")
+        except KeyValueStoreError as e:
+            util.exit_and_msg("KeyValueStoreError(" + str(e) + ")")
 
     def get_channel_list(self) -> list:
         return list(self.__peer_managers)
@@ -109,7 +109,7 @@ class ChannelManager:
         try:
             dump = peer_manager.dump()
             level_db = self.__block_managers[channel_name].get_level_db()
-            level_db.Put(level_db_key_name, dump)
+            level_db.put(level_db_key_name, dump)
             # 아래의 audience dump update 는 안정성에 문제를 야기한다. (원인 미파악)
             # self.update_audience(dump)
         except AttributeError as e:
@@ -134,7 +134,7 @@ class ChannelManager:
         if conf.IS_LOAD_PEER_MANAGER_FROM_DB:
             try:
                 level_db = self.__block_managers[channel].get_level_db()
-                peer_list_data = pickle.loads(level_db.Get(level_db_key_name))
+                peer_list_data = pickle.loads(level_db.get(level_db_key_name))
                 peer_manager.load(peer_list_data)
                 logging.debug("load peer_list_data on yours: " + peer_manager.get_peers_for_debug())
             except KeyError:
@@ -70,6 +70,8 @@ class ConsensusBase(metaclass=ABCMeta):
         # TODO: 직전 tx까지 block을 생성하고, 다음 block으로 peerlist타입의 block을 생성한다
         tx_count = 0
         peer_manager_block = None
+        # block 에 담지 못하고 버린 tx, mempool 에서도 지운다.
+        rejected_tx_hashes = []
         while not self._txQueue.empty():
             # 수집된 tx 가 있으면 Block 에 집어 넣는다.
             tx_unloaded = self._txQueue.get()
@@ -89,17 +91,25 @@ class ConsensusBase(metaclass=ABCMeta):
                 break
             elif self._block is None:
                 logging.error("Leader Can't Add tx...")
+                rejected_tx_hashes.append(tx.tx_hash)
+            elif self._blockmanager.get_mempool() is not None and self._blockchain.is_tx_committed(tx.tx_hash):
+                # mempool 에서 다시 넣었거나 commit 된 뒤에 다시 받은 tx 는 block 에 담지 않고 mempool 에서 지운다.
+                rejected_tx_hashes.append(tx.tx_hash)
             else:
                 tx_confirmed = self._block.put_transaction(tx)
                 # logging.debug("put transaction to block: " + str(tx_confirmed))
+                if not tx_confirmed:
+                    rejected_tx_hashes.append(tx.tx_hash)
 
             # 블럭의 담기는 트랜잭션의 최대 갯수, 메시지 크기를 계속 dump 로 비교하는 것은 성능에 부담이 되므로 tx 추가시에는 갯수로만 방지한다.
             if tx_count >= conf.MAX_BLOCK_TX_NUM:
                 break
 
+        self._blockmanager.remove_txs_from_mempool(rejected_tx_hashes)
+
         if self._block is not None and len(self._block.confirmed_transaction_list) > 0:
             # 최종 블럭 생성뒤 gRPC 메시지 사이즈를 넘게 되면 블럭을 나누어서 다시 생성하게 한다.
-            block_dump = pickle.dumps(self._block)
+            block_dump = self._block.serialize_block()
             block_dump_size = len(block_dump)
 
             if block_dump_size > (conf.MAX_BLOCK_KBYTES * 1024):
@@ -109,7 +119,7 @@ class ConsensusBase(metaclass=ABCMeta):
 
                 next_tx = (self._block.confirmed_transaction_list.pop(0), None)[
                     len(self._block.confirmed_transaction_list) == 0]
-                expected_block_size = len(pickle.dumps(divided_block))
+                expected_block_size = len(divided_block.serialize_block())
 
                 while next_tx is not None:
                     # logging.debug("next_tx: " + str(next_tx.get_tx_hash()))
@@ -132,9 +142,12 @@ class ConsensusBase(metaclass=ABCMeta):
                         self._candidate_blocks.add_unconfirmed_block(divided_block)
                         # 새로운 Block 을 생성하여 다음 tx 을 수집한다.
                         divided_block = Block(channel_name=self._channel_name, is_divided_block=True)
-                        expected_block_size = len(pickle.dumps(divided_block))
+                        expected_block_size = len(divided_block.serialize_block())
                         do_divide = False
 
+                # 나누어 담은 tx 를 list 에서 직접 꺼냈으므로 tx index 와 merkle tree 를 다시 만들게 한다.
+                self._block.reset_transactions()
+
         if peer_manager_block is not None:
             peer_manager_block.generate_block(self._candidate_blocks.get_last_block(self._blockchain))
             peer_manager_block.sign(ObjectManager().peer_service.auth)
@@ -399,7 +399,8 @@ class BlackOuterService(loopchain_pb2_grpc.PeerServiceServicer):
         """
         channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
         logging.debug(f"peer_outer_service::AnnounceUnconfirmedBlock channel({channel_name})")
-        unconfirmed_block = pickle.loads(request.block)
+        unconfirmed_block = Block(channel_name=channel_name)
+        unconfirmed_block.deserialize_block(request.block)
 
         logging.warning("Black Peer makes Fail validate Message by intention!")
         vote_code, message = message_code.get_response(message_code.Response.fail_validate_block)
@@ -429,7 +430,8 @@ class BlackOuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.debug("AnnounceConfirmedBlock block hash: " + request.block_hash)
         response_code, response_msg = message_code.get_response(message_code.Response.fail_announce_block)
 
-        confirmed_block = pickle.loads(request.block)
+        confirmed_block = Block(channel_name=channel_name)
+        confirmed_block.deserialize_block(request.block)
 
         logging.debug(f"block \n"
                       f"peer_id({confirmed_block.peer_id})\n"
@@ -455,19 +457,18 @@ class BlackOuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.info(f"BlockSync request hash({request.block_hash}) channel({channel_name})")
         block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
 
-        block = block_manager.get_blockchain().find_block_by_hash(request.block_hash)
-        if block is None:
+        # 저장된 block bytes (압축된 block 은 압축된 채로) 를 deserialize, serialize 없이 그대로 보낸다.
+        dump = block_manager.get_blockchain().find_block_dump_by_hash(request.block_hash)
+        if dump is None:
             return loopchain_pb2.BlockSyncReply(
                 response_code=message_code.Response.fail_wrong_block_hash,
                 block_height=-1,
                 max_block_height=block_manager.get_blockchain().block_height,
                 block=b"")
 
-        dump = pickle.dumps(block)
-
         return loopchain_pb2.BlockSyncReply(
             response_code=message_code.Response.success,
-            block_height=block.height,
+            block_height=Block.read_header(dump)['height'],
             max_block_height=block_manager.get_blockchain().block_height,
             block=dump)
 
@@ -565,7 +566,7 @@ class BlackOuterService(loopchain_pb2_grpc.PeerServiceServicer):
         if self.peer_service.channel_manager.get_block_manager(channel_name).consensus.block is None:
             logging.debug("this leader can't make more block")
 
-        self.peer_service.channel_manager.get_block_manager(channel_name).add_tx_unloaded(pickle.dumps(tx))
+        self.peer_service.channel_manager.get_block_manager(channel_name).add_tx(tx)
 
     def AnnounceDeletePeer(self, request, context):
         """delete peer by radio station heartbeat, It delete peer info over whole channels.
@@ -595,7 +596,7 @@ class BlackOuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.info("Peer vote to : " + request.block_hash + " " + str(request.vote_code)
                      + f"from {request.peer_id}")
 
-        block_manager.get_candidate_blocks().vote_to_block(
+        block_manager.vote_to_block(
             request.block_hash, (False, True)[request.vote_code == message_code.Response.success_validate_block],
             request.peer_id, request.group_id)
 
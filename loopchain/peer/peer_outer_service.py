@@ -34,7 +34,13 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         self.__handler_map = {
             message_code.Request.status: self.__handler_status,
             message_code.Request.peer_peer_list: self.__handler_peer_list,
-            message_code.Request.peer_reconnect_to_rs: self.__handler_reconnect_to_rs
+            message_code.Request.peer_reconnect_to_rs: self.__handler_reconnect_to_rs,
+            message_code.Request.tx_get_proof: self.__handler_get_tx_proof,
+            message_code.Request.tx_get_invoke_results: self.__handler_get_invoke_results,
+            message_code.Request.block_get_range: self.__handler_get_block_range,
+            message_code.Request.tx_find_by_meta: self.__handler_find_txs_by_meta,
+            message_code.Request.block_get_header: self.__handler_get_block_header,
+            message_code.Request.block_get_by_time: self.__handler_get_block_by_time
         }
 
     @property
@@ -73,6 +79,169 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
 
         return loopchain_pb2.Message(code=message_code.Response.success)
 
+    def __handler_get_tx_proof(self, request, context):
+        """tx 들의 merkle multi-proof 를 구한다.
+
+        :param request: request.meta = json {"tx_hashes": [tx_hash, ...]}
+        :param context:
+        :return: meta 에 BlockChain.find_tx_proofs 의 결과를 json 으로 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+
+        try:
+            tx_hashes = json.loads(request.meta)['tx_hashes']
+        except (ValueError, KeyError, TypeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        if not isinstance(tx_hashes, list) or len(tx_hashes) > conf.MAX_TX_PROOFS_PER_REQUEST:
+            return loopchain_pb2.Message(
+                code=message_code.Response.fail_validate_params,
+                message=f"tx_hashes should be a list of at most {conf.MAX_TX_PROOFS_PER_REQUEST} hashes")
+
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+        tx_proofs = block_manager.get_tx_proofs(tx_hashes)
+
+        return loopchain_pb2.Message(code=message_code.Response.success, meta=json.dumps(tx_proofs))
+
+    def __handler_get_invoke_results(self, request, context):
+        """GetInvokeResults, 여러 tx 의 invoke result 를 한번에 구한다.
+
+        :param request: request.meta = json {"tx_hashes": [tx_hash, ...]}
+        :param context:
+        :return: meta 에 {tx_hash: invoke result} 를 json 으로 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+
+        try:
+            tx_hashes = json.loads(request.meta)['tx_hashes']
+        except (ValueError, KeyError, TypeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        if not isinstance(tx_hashes, list) or len(tx_hashes) > conf.MAX_INVOKE_RESULTS_PER_REQUEST:
+            return loopchain_pb2.Message(
+                code=message_code.Response.fail_validate_params,
+                message=f"tx_hashes should be a list of at most {conf.MAX_INVOKE_RESULTS_PER_REQUEST} hashes")
+
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+        invoke_results = block_manager.get_invoke_results(tx_hashes)
+
+        return loopchain_pb2.Message(code=message_code.Response.success, meta=json.dumps(invoke_results))
+
+    def __handler_get_block_range(self, request, context):
+        """height 범위의 block 을 page 단위로 구한다.
+        proto 에 server streaming method 를 추가하기 전까지 Request 로 page 를 나누어 받는다.
+
+        :param request: request.meta = json {"start_height": int, "end_height": int or null, "headers_only": bool}
+        :param context:
+        :return: meta 에 {"blocks": [block json, ...], "next_height": 다음 page 의 start_height or null} 를 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+
+        try:
+            params = json.loads(request.meta)
+            start_height = int(params['start_height'])
+            end_height = params.get('end_height')
+            end_height = None if end_height is None else int(end_height)
+            headers_only = bool(params.get('headers_only', False))
+        except (ValueError, KeyError, TypeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        if start_height < 0 or (end_height is not None and end_height < start_height):
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params,
+                                         message=f"wrong height range [{start_height}, {end_height})")
+
+        limit = conf.MAX_BLOCK_HEADERS_PER_REQUEST if headers_only else conf.MAX_BLOCKS_PER_REQUEST
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+        blocks, next_height = block_manager.get_block_range(start_height, end_height, headers_only, limit)
+
+        return loopchain_pb2.Message(code=message_code.Response.success,
+                                     meta=json.dumps({'blocks': blocks, 'next_height': next_height}))
+
+    def __handler_get_block_header(self, request, context):
+        """block 을 읽지 않고 header 만 구한다. (explorer 등 header 만 필요한 client 용)
+
+        :param request: request.meta = json {"height": int} or {"hash": str}, 둘 다 없으면 마지막 block
+        :param context:
+        :return: meta 에 {block_hash, prev_block_hash, merkle_tree_root_hash, time_stamp, tx_count, height} 를 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+
+        try:
+            params = json.loads(request.meta) if request.meta else {}
+            block_hash = params.get('hash')
+            block_height = params.get('height')
+            block_height = block_manager.get_blockchain().block_height if block_height is None else int(block_height)
+        except (ValueError, TypeError, AttributeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        header = block_manager.get_block_header(block_height, block_hash)
+        if header is None:
+            return loopchain_pb2.Message(code=message_code.Response.fail_wrong_block_hash,
+                                         message=f"there is no block height({block_height}) hash({block_hash})")
+        return loopchain_pb2.Message(code=message_code.Response.success, meta=json.dumps(header))
+
+    def __handler_get_block_by_time(self, request, context):
+        """GetBlockByTime, time stamp 또는 그 이전에 만들어진 마지막 block 의 header 를 binary search 로 구한다.
+        proto 에 method 를 추가하기 전까지 Request 로 받는다.
+
+        :param request: request.meta = json {"time_stamp": int (micro seconds)}
+        :param context:
+        :return: meta 에 {block_hash, prev_block_hash, merkle_tree_root_hash, time_stamp, tx_count, height} 를 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+
+        try:
+            time_stamp = int(json.loads(request.meta)['time_stamp'])
+        except (ValueError, KeyError, TypeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+        header = block_manager.get_block_header_by_time(time_stamp)
+        if header is None:
+            return loopchain_pb2.Message(code=message_code.Response.fail_wrong_block_hash,
+                                         message=f"there is no block at or before time stamp({time_stamp})")
+        return loopchain_pb2.Message(code=message_code.Response.success, meta=json.dumps(header))
+
+    def __handler_find_txs_by_meta(self, request, context):
+        """tx meta index (peer_id, score_id, time) 로 tx 를 page 단위로 찾는다.
+
+        :param request: request.meta = json {"index": "peer_id" | "score_id" | "time", "value": str,
+                        "time_from": int, "time_to": int, "cursor": str}, index 외에는 생략할 수 있다.
+        :param context:
+        :return: meta 에 {"txs": [{tx_hash, timestamp, block_height, tx_position}, ...],
+                 "next_cursor": 다음 page 의 cursor or null, "indexed_from_height": index 가 기록된 첫 block height} 를 담는다.
+        """
+        channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
+
+        try:
+            params = json.loads(request.meta)
+            index_name = params['index']
+            value = params.get('value')
+            time_from = params.get('time_from')
+            time_from = None if time_from is None else int(time_from)
+            time_to = params.get('time_to')
+            time_to = None if time_to is None else int(time_to)
+            cursor = params.get('cursor')
+        except (ValueError, KeyError, TypeError) as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+
+        if (time_from is not None and time_from < 0) or (time_to is not None and time_to < 0):
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params,
+                                         message=f"wrong time range [{time_from}, {time_to})")
+
+        block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
+        try:
+            txs, next_cursor, indexed_from_height = block_manager.find_txs_by_meta(
+                index_name, value, time_from, time_to, cursor, conf.MAX_TXS_PER_META_QUERY)
+        except ValueError as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail_validate_params, message=str(e))
+        except BlockchainError as e:
+            return loopchain_pb2.Message(code=message_code.Response.fail, message=str(e))
+
+        return loopchain_pb2.Message(code=message_code.Response.success, meta=json.dumps(
+            {'txs': txs, 'next_cursor': next_cursor, 'indexed_from_height': indexed_from_height}))
+
     def Request(self, request, context):
         # util.logger.debug(f"Peer Service got request({request.code})")
 
@@ -219,11 +388,10 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
                 response_code=message_code.Response.fail_made_block_count_limited,
                 message="this leader can't make more block")
 
-        block_manager.add_tx_unloaded(request.tx)
-
         # TODO AddTx 는 성능에 민감한 구간으로 이곳에 기능과 무관한 코드를 삽입하면 성능에 영향을 줍니다.
         # 이 곳에서 tx_hash 를 로그로 남겨야 하면 request 에 tx_hash 를 포함해서 보내도록 코드를 수정해야 합니다.
         tx = pickle.loads(request.tx)
+        block_manager.add_tx_unloaded(request.tx, tx_hash=tx.tx_hash)
 
         # logger = sender.FluentSender('app', host=conf.MONITOR_LOG_HOST, port=conf.MONITOR_LOG_PORT)
         # logger.emit('follow', {'from': 'userA', 'to': 'userB'})
@@ -460,7 +628,8 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         """
         channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL if request.channel == '' else request.channel
         logging.debug(f"peer_outer_service::AnnounceUnconfirmedBlock channel({channel_name})")
-        unconfirmed_block = pickle.loads(request.block)
+        unconfirmed_block = Block(channel_name=channel_name)
+        unconfirmed_block.deserialize_block(request.block)
 
         # logging.debug(f"#block \n"
         #               f"peer_id({unconfirmed_block.peer_id})\n"
@@ -497,7 +666,8 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.debug("AnnounceConfirmedBlock block hash: " + request.block_hash)
         response_code, response_msg = message_code.get_response(message_code.Response.fail_announce_block)
 
-        confirmed_block = pickle.loads(request.block)
+        confirmed_block = Block(channel_name=channel_name)
+        confirmed_block.deserialize_block(request.block)
 
         logging.debug(f"block \n"
                       f"peer_id({confirmed_block.peer_id})\n"
@@ -523,19 +693,18 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.info(f"BlockSync request hash({request.block_hash}) channel({channel_name})")
         block_manager = self.peer_service.channel_manager.get_block_manager(channel_name)
 
-        block = block_manager.get_blockchain().find_block_by_hash(request.block_hash)
-        if block is None:
+        # 저장된 block bytes (압축된 block 은 압축된 채로) 를 deserialize, serialize 없이 그대로 보낸다.
+        dump = block_manager.get_blockchain().find_block_dump_by_hash(request.block_hash)
+        if dump is None:
             return loopchain_pb2.BlockSyncReply(
                 response_code=message_code.Response.fail_wrong_block_hash,
                 block_height=-1,
                 max_block_height=block_manager.get_blockchain().block_height,
                 block=b"")
 
-        dump = pickle.dumps(block)
-
         return loopchain_pb2.BlockSyncReply(
             response_code=message_code.Response.success,
-            block_height=block.height,
+            block_height=Block.read_header(dump)['height'],
             max_block_height=block_manager.get_blockchain().block_height,
             block=dump)
 
@@ -636,7 +805,7 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         if self.peer_service.channel_manager.get_block_manager(channel_name).consensus.block is None:
             logging.debug("this leader can't make more block")
 
-        self.peer_service.channel_manager.get_block_manager(channel_name).add_tx_unloaded(pickle.dumps(tx))
+        self.peer_service.channel_manager.get_block_manager(channel_name).add_tx(tx)
 
     def AnnounceDeletePeer(self, request, context):
         """delete peer by radio station heartbeat, It delete peer info over whole channels.
@@ -669,7 +838,7 @@ class OuterService(loopchain_pb2_grpc.PeerServiceServicer):
         logging.info("Peer vote to : " + request.block_hash + " " + str(request.vote_code)
                      + f"from {request.peer_id}")
 
-        block_manager.get_candidate_blocks().vote_to_block(
+        block_manager.vote_to_block(
             request.block_hash, (False, True)[request.vote_code == message_code.Response.success_validate_block],
             request.peer_id, request.group_id)
 
@@ -225,6 +225,7 @@ class PeerService:
         util.logger.spam(f"peer_service:reset_leader target({leader_peer.target})")
 
         peer_manager.set_leader_peer(leader_peer, None)
+        block_manager.write_leader_change(new_leader_id)
 
         self_peer_object = peer_manager.get_peer(self.__peer_id)
         peer_leader = peer_manager.get_leader_peer()
@@ -283,7 +284,7 @@ class PeerService:
         self.__common_service.stop()
 
     def score_invoke(self, block, channel) -> dict:
-        block_object = pickle.dumps(block)
+        block_object = block.serialize_block()
         response = self.channel_manager.get_score_container_stub(channel).call(
             method_name="Request",
             message=loopchain_pb2.Message(code=message_code.Request.score_invoke, object=block_object),
@@ -388,7 +389,8 @@ class PeerService:
         if channel_name is None:
             channel_name = conf.LOOPCHAIN_DEFAULT_CHANNEL
 
-        block = pickle.loads(block_unloaded)
+        block = Block(channel_name=channel_name)
+        block.deserialize_block(block_unloaded)
         block_hash = block.block_hash
 
         response_code, response_msg = message_code.get_response(message_code.Response.fail_validate_block)
@@ -507,7 +509,7 @@ class PeerService:
         """네트워크에서 Peer 를 식별하기 위한 UUID를 level db 에 생성한다.
         """
         try:
-            uuid_bytes = bytes(self.__level_db.Get(conf.LEVEL_DB_KEY_FOR_PEER_ID))
+            uuid_bytes = bytes(self.__level_db.get(conf.LEVEL_DB_KEY_FOR_PEER_ID))
             peer_id = uuid.UUID(bytes=uuid_bytes)
         except KeyError:  # It's first Run
             peer_id = None
@@ -515,7 +517,7 @@ class PeerService:
         if peer_id is None:
             peer_id = uuid.uuid1()
             logging.info("make new peer_id: " + str(peer_id))
-            self.__level_db.Put(conf.LEVEL_DB_KEY_FOR_PEER_ID, peer_id.bytes)
+            self.__level_db.put(conf.LEVEL_DB_KEY_FOR_PEER_ID, peer_id.bytes)
 
         self.__peer_id = str(peer_id)
 
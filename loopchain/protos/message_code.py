@@ -45,6 +45,12 @@ class Request(IntEnum):
     tx_create = 900  # create tx to inner tx service
     tx_connect_to_leader = 901  # connect to leader
     tx_connect_to_inner_peer = 902  # connect to mother peer service in same inner gRPC micro service network
+    tx_get_proof = 903  # get merkle multi-proof of txs
+    tx_get_invoke_results = 904  # get invoke results of txs (GetInvokeResults)
+    block_get_range = 905  # get blocks or block headers of height range by page
+    tx_find_by_meta = 906  # find txs by tx meta index (peer_id, score_id, time range) by page
+    block_get_header = 907  # get block header by height or hash without loading block
+    block_get_by_time = 908  # get header of the last block at or before time stamp (GetBlockByTime)
 
     broadcast_subscribe = 1000  # subscribe for broadcast
     broadcast_unsubscribe = 1001  # unsubscribe for broadcast
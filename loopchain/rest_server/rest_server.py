@@ -82,6 +82,7 @@ class ServerComponents(metaclass=SingletonMetaClass):
 
     def set_argument(self):
         self.__parser.add_argument('hash')
+        self.__parser.add_argument('time')
         self.__parser.add_argument('channel')
 
     def set_resource(self):
@@ -90,7 +91,12 @@ class ServerComponents(metaclass=SingletonMetaClass):
         self.__api.add_resource(Status, '/api/v1/status/peer')
         self.__api.add_resource(ScoreStatus, '/api/v1/status/score')
         self.__api.add_resource(Blocks, '/api/v1/blocks')
+        self.__api.add_resource(BlockRange, '/api/v1/blocks/range')
+        self.__api.add_resource(BlockHeader, '/api/v1/blocks/header')
         self.__api.add_resource(InvokeResult, '/api/v1/transactions/result')
+        self.__api.add_resource(TransactionProof, '/api/v1/transactions/proof')
+        self.__api.add_resource(InvokeResults, '/api/v1/transactions/results')
+        self.__api.add_resource(TransactionSearch, '/api/v1/transactions/search')
 
     def query(self, data, channel):
         # TODO conf.SCORE_RETRY_TIMES 를 사용해서 retry 로직을 구현한다.
@@ -109,6 +115,43 @@ class ServerComponents(metaclass=SingletonMetaClass):
         return self.__stub_to_peer_service.GetInvokeResult(loopchain_pb2.GetInvokeResultRequest(
             tx_hash=tx_hash, channel=channel), self.REST_GRPC_TIMEOUT)
 
+    def get_tx_proofs(self, tx_hashes, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.tx_get_proof,
+            channel=channel,
+            meta=json.dumps({'tx_hashes': tx_hashes})), self.REST_GRPC_TIMEOUT)
+
+    def get_invoke_results(self, tx_hashes, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.tx_get_invoke_results,
+            channel=channel,
+            meta=json.dumps({'tx_hashes': tx_hashes})), self.REST_GRPC_TIMEOUT)
+
+    def get_block_range(self, start_height, end_height, headers_only, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.block_get_range,
+            channel=channel,
+            meta=json.dumps({'start_height': start_height, 'end_height': end_height, 'headers_only': headers_only})),
+            self.REST_GRPC_TIMEOUT)
+
+    def get_block_header(self, params, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.block_get_header,
+            channel=channel,
+            meta=json.dumps(params)), self.REST_GRPC_TIMEOUT)
+
+    def get_block_header_by_time(self, time_stamp, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.block_get_by_time,
+            channel=channel,
+            meta=json.dumps({'time_stamp': time_stamp})), self.REST_GRPC_TIMEOUT)
+
+    def find_txs_by_meta(self, params, channel):
+        return self.__stub_to_peer_service.Request(loopchain_pb2.Message(
+            code=message_code.Request.tx_find_by_meta,
+            channel=channel,
+            meta=json.dumps(params)), self.REST_GRPC_TIMEOUT)
+
     def get_status(self, channel):
         return self.__stub_to_peer_service.GetStatus(loopchain_pb2.StatusRequest(request="", channel= channel), self.REST_GRPC_TIMEOUT)
 
@@ -258,6 +301,48 @@ class InvokeResult(Resource):
         return verify_result
 
 
+class InvokeResults(Resource):
+    def post(self):
+        request_body = request.get_json()
+        channel = get_channel_name_from_json(request_body)
+        results_data = dict()
+
+        tx_hashes = request_body.get('tx_hashes')
+        if not isinstance(tx_hashes, list):
+            results_data['response_code'] = str(message_code.Response.fail_validate_params)
+            return results_data
+
+        response = ServerComponents().get_invoke_results(tx_hashes, channel)
+        results_data['response_code'] = str(response.code)
+        if response.code == message_code.Response.success:
+            results_data['response'] = json.loads(response.meta)
+        else:
+            results_data['message'] = response.message
+
+        return results_data
+
+
+class TransactionProof(Resource):
+    def post(self):
+        request_body = request.get_json()
+        channel = get_channel_name_from_json(request_body)
+        proof_data = dict()
+
+        tx_hashes = request_body.get('tx_hashes')
+        if not isinstance(tx_hashes, list):
+            proof_data['response_code'] = str(message_code.Response.fail_validate_params)
+            return proof_data
+
+        response = ServerComponents().get_tx_proofs(tx_hashes, channel)
+        proof_data['response_code'] = str(response.code)
+        if response.code == message_code.Response.success:
+            proof_data['response'] = json.loads(response.meta)
+        else:
+            proof_data['message'] = response.message
+
+        return proof_data
+
+
 class Status(Resource):
     def get(self):
         args = ServerComponents().parser.parse_args()
@@ -283,8 +368,21 @@ class ScoreStatus(Resource):
 
 class Blocks(Resource):
     def get(self):
+        """GET /api/v1/blocks[?hash=<block hash> | time=<time stamp>]
+        time 은 block time stamp (micro seconds) 로 그 시간 또는 그 이전에 만들어진 마지막 block 을 구한다.
+        """
         args = ServerComponents().parser.parse_args()
         channel = get_channel_name_from_args(args)
+        if args['hash'] is None and args['time'] is not None:
+            try:
+                time_stamp = int(args['time'])
+            except ValueError:
+                return {'response_code': str(message_code.Response.fail_validate_params)}
+            response = ServerComponents().get_block_header_by_time(time_stamp, channel)
+            if response.code != message_code.Response.success:
+                return {'response_code': str(response.code), 'message': response.message}
+            args['hash'] = json.loads(response.meta)['block_hash']
+
         if not args['hash'] is None:
             block_hash = args['hash']
             response = ServerComponents().get_block_by_hash(block_hash=block_hash,
@@ -318,6 +416,97 @@ class Blocks(Resource):
         return block_data
 
 
+class BlockRange(Resource):
+    def get(self):
+        """GET /api/v1/blocks/range?start=<height>&end=<height>&headers_only=<true|false>
+        한 page 를 넘는 범위는 응답의 next_height 를 start 로 다시 요청한다.
+        """
+        args = request.args
+        channel = get_channel_name_from_args(args)
+        block_range_data = dict()
+
+        try:
+            start_height = int(args.get('start', 0))
+            end_height = args.get('end')
+            end_height = None if end_height is None else int(end_height)
+        except ValueError:
+            block_range_data['response_code'] = str(message_code.Response.fail_validate_params)
+            return block_range_data
+        headers_only = args.get('headers_only', 'false').lower() in ('true', '1')
+
+        response = ServerComponents().get_block_range(start_height, end_height, headers_only, channel)
+        block_range_data['response_code'] = str(response.code)
+        if response.code == message_code.Response.success:
+            block_range_data.update(json.loads(response.meta))
+        else:
+            block_range_data['message'] = response.message
+
+        return block_range_data
+
+
+class BlockHeader(Resource):
+    def get(self):
+        """GET /api/v1/blocks/header?height=<height> | hash=<block hash>
+        둘 다 없으면 마지막 block 의 header 를 구한다.
+        """
+        args = request.args
+        channel = get_channel_name_from_args(args)
+        header_data = dict()
+
+        params = dict()
+        if args.get('hash') is not None:
+            params['hash'] = args.get('hash')
+        elif args.get('height') is not None:
+            try:
+                params['height'] = int(args.get('height'))
+            except ValueError:
+                header_data['response_code'] = str(message_code.Response.fail_validate_params)
+                return header_data
+
+        response = ServerComponents().get_block_header(params, channel)
+        header_data['response_code'] = str(response.code)
+        if response.code == message_code.Response.success:
+            header_data.update(json.loads(response.meta))
+        else:
+            header_data['message'] = response.message
+
+        return header_data
+
+
+class TransactionSearch(Resource):
+    def get(self):
+        """GET /api/v1/transactions/search?peer_id=<peer_id> | score_id=<score_id>
+                                          [&time_from=<timestamp>][&time_to=<timestamp>][&cursor=<cursor>]
+        peer_id, score_id 가 없으면 time index 로 시간 범위의 tx 를 찾는다.
+        한 page 를 넘는 결과는 응답의 next_cursor 를 cursor 로 다시 요청한다.
+        """
+        args = request.args
+        channel = get_channel_name_from_args(args)
+        search_data = dict()
+
+        params = {'cursor': args.get('cursor')}
+        if args.get('peer_id') is not None:
+            params.update({'index': 'peer_id', 'value': args.get('peer_id')})
+        elif args.get('score_id') is not None:
+            params.update({'index': 'score_id', 'value': args.get('score_id')})
+        else:
+            params['index'] = 'time'
+        try:
+            for name in ('time_from', 'time_to'):
+                params[name] = None if args.get(name) is None else int(args.get(name))
+        except ValueError:
+            search_data['response_code'] = str(message_code.Response.fail_validate_params)
+            return search_data
+
+        response = ServerComponents().find_txs_by_meta(params, channel)
+        search_data['response_code'] = str(response.code)
+        if response.code == message_code.Response.success:
+            search_data.update(json.loads(response.meta))
+        else:
+            search_data['message'] = response.message
+
+        return search_data
+
 
 class RestServer(CommonThread):
     def __init__(self, peer_port, peer_ip_address=None):
@@ -0,0 +1,57 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""create key value store of configured engine"""
+
+from enum import Enum
+
+from loopchain import configure as conf
+from loopchain.store.key_value_store import KeyValueStore, KeyValueStoreError
+from loopchain.store.level_db_store import LevelDBStore
+from loopchain.store.memory_store import MemoryStore
+
+
+class KeyValueStoreEngine(Enum):
+    leveldb = 'leveldb'
+    memory = 'memory'
+
+
+_engines = {
+    KeyValueStoreEngine.leveldb: LevelDBStore,
+    KeyValueStoreEngine.memory: MemoryStore.open
+}
+
+
+def _get_engine(engine):
+    try:
+        return KeyValueStoreEngine(conf.KEY_VALUE_STORE_ENGINE if engine is None else engine)
+    except ValueError:
+        raise KeyValueStoreError(f"not supported key value store engine({engine or conf.KEY_VALUE_STORE_ENGINE})")
+
+
+def create_key_value_store(path, create_if_missing=True, engine=None) -> KeyValueStore:
+    """
+    :param path: db path (memory engine 에서는 store 를 구분하는 이름)
+    :param create_if_missing: False 이면 없는 db 를 만들지 않는다.
+    :param engine: KeyValueStoreEngine or its value, None 이면 conf.KEY_VALUE_STORE_ENGINE
+    :return: KeyValueStore
+    """
+    return _engines[_get_engine(engine)](path, create_if_missing=create_if_missing)
+
+
+def destroy_key_value_store(path, engine=None):
+    """db 를 지운다. 열려있는 store 는 먼저 닫아야(참조를 없애야) 한다."""
+    if _get_engine(engine) is KeyValueStoreEngine.leveldb:
+        LevelDBStore.destroy(path)
+    else:
+        MemoryStore.destroy(path)
@@ -0,0 +1,91 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""key value store interface for block db and score db"""
+
+from abc import ABCMeta, abstractmethod
+
+
+class KeyValueStoreError(Exception):
+    """store 를 열거나 만들 수 없을 때 발생한다."""
+    pass
+
+
+class KeyValueStoreReader(metaclass=ABCMeta):
+    """store 와 store 의 snapshot 이 공통으로 제공하는 읽기 interface"""
+
+    @abstractmethod
+    def get(self, key: bytes):
+        """
+        :param key: bytes
+        :return: value (bytes-like), key 가 없으면 KeyError 를 발생한다.
+        """
+        pass
+
+    @abstractmethod
+    def range_iter(self, key_from: bytes=None, key_to: bytes=None, include_value=True):
+        """key 순서로 [key_from, key_to] 범위를 읽는다. (key_to 도 포함한다.)
+
+        :param key_from: None 이면 처음부터
+        :param key_to: None 이면 끝까지
+        :param include_value: False 이면 key 만 돌려준다.
+        :return: iterator of (key, value) or key
+        """
+        pass
+
+
+class KeyValueStoreWriteBatch(metaclass=ABCMeta):
+    """write 할 때 한번에 반영되는 put, delete 의 묶음, with 문으로 사용하면 블럭을 벗어날 때 write 한다."""
+
+    @abstractmethod
+    def put(self, key: bytes, value: bytes):
+        pass
+
+    @abstractmethod
+    def delete(self, key: bytes):
+        pass
+
+    @abstractmethod
+    def write(self):
+        """batch 를 store 에 atomic 하게 반영한다."""
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.write()
+
+
+class KeyValueStore(KeyValueStoreReader):
+    """BlockChain, ScoreHelper 가 사용하는 key value store
+    engine 은 conf.KEY_VALUE_STORE_ENGINE 으로 고르며 create_key_value_store 로 만든다.
+    """
+
+    @abstractmethod
+    def put(self, key: bytes, value: bytes, sync=False):
+        pass
+
+    @abstractmethod
+    def delete(self, key: bytes, sync=False):
+        pass
+
+    @abstractmethod
+    def write_batch(self) -> KeyValueStoreWriteBatch:
+        pass
+
+    @abstractmethod
+    def snapshot(self) -> KeyValueStoreReader:
+        """현재 상태를 읽는 read only view, 이후의 write 는 보이지 않는다."""
+        pass
@@ -0,0 +1,94 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""key value store engine on level db"""
+
+import leveldb
+
+from loopchain.store.key_value_store import KeyValueStore, KeyValueStoreReader, KeyValueStoreWriteBatch, \
+    KeyValueStoreError
+
+
+class LevelDBWriteBatch(KeyValueStoreWriteBatch):
+
+    def __init__(self, db):
+        self.__db = db
+        self.__batch = leveldb.WriteBatch()
+
+    def put(self, key: bytes, value: bytes):
+        self.__batch.Put(key, value)
+
+    def delete(self, key: bytes):
+        self.__batch.Delete(key)
+
+    def write(self):
+        self.__db.Write(self.__batch)
+
+
+class LevelDBSnapshot(KeyValueStoreReader):
+
+    def __init__(self, snapshot):
+        self.__snapshot = snapshot
+
+    def get(self, key: bytes):
+        return self.__snapshot.Get(key)
+
+    def range_iter(self, key_from: bytes=None, key_to: bytes=None, include_value=True):
+        return self.__snapshot.RangeIter(key_from=key_from, key_to=key_to, include_value=include_value)
+
+
+class LevelDBStore(KeyValueStore):
+    """level db engine, 값은 level db 가 돌려주는 bytearray 를 그대로 돌려준다."""
+
+    def __init__(self, path, create_if_missing=True):
+        """
+        :param path: level db directory
+        :param create_if_missing: False 이면 없는 db 를 만들지 않고 KeyValueStoreError 를 발생한다.
+        """
+        try:
+            self.__db = leveldb.LevelDB(path, create_if_missing=create_if_missing)
+        except leveldb.LevelDBError as e:
+            raise KeyValueStoreError(f"Fail To Open Level DB(path): {path} ({e})")
+        self.__path = path
+
+    @property
+    def path(self):
+        return self.__path
+
+    @property
+    def db(self):
+        """level db 의 기능(CompactRange 등)을 직접 써야 하는 경우에만 사용한다."""
+        return self.__db
+
+    def get(self, key: bytes):
+        return self.__db.Get(key)
+
+    def put(self, key: bytes, value: bytes, sync=False):
+        self.__db.Put(key, value, sync=sync)
+
+    def delete(self, key: bytes, sync=False):
+        self.__db.Delete(key, sync=sync)
+
+    def write_batch(self) -> KeyValueStoreWriteBatch:
+        return LevelDBWriteBatch(self.__db)
+
+    def range_iter(self, key_from: bytes=None, key_to: bytes=None, include_value=True):
+        # range scan 이 level db block cache 의 다른 data 를 밀어내지 않도록 한다.
+        return self.__db.RangeIter(key_from=key_from, key_to=key_to, include_value=include_value, fill_cache=False)
+
+    def snapshot(self) -> KeyValueStoreReader:
+        return LevelDBSnapshot(self.__db.CreateSnapshot())
+
+    @staticmethod
+    def destroy(path):
+        leveldb.DestroyDB(path)
@@ -0,0 +1,145 @@
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""in-memory key value store engine for tests and simulations"""
+
+import bisect
+import threading
+
+from loopchain.store.key_value_store import KeyValueStore, KeyValueStoreReader, KeyValueStoreWriteBatch, \
+    KeyValueStoreError
+
+
+def _range_iter(values: dict, keys: list, key_from, key_to, include_value):
+    """정렬된 keys 에서 [key_from, key_to] 범위를 읽는다."""
+    start = 0 if key_from is None else bisect.bisect_left(keys, key_from)
+    end = len(keys) if key_to is None else bisect.bisect_right(keys, key_to)
+    for key in keys[start:end]:
+        yield (key, values[key]) if include_value else key
+
+
+class MemoryWriteBatch(KeyValueStoreWriteBatch):
+
+    def __init__(self, store):
+        self.__store = store
+        # (key, value), value 가 None 이면 delete
+        self.__operations = []
+
+    def put(self, key: bytes, value: bytes):
+        self.__operations.append((bytes(key), bytes(value)))
+
+    def delete(self, key: bytes):
+        self.__operations.append((bytes(key), None))
+
+    def write(self):
+        self.__store.apply(self.__operations)
+
+
+class MemorySnapshot(KeyValueStoreReader):
+
+    def __init__(self, values: dict, keys: list):
+        self.__values = values
+        self.__keys = keys
+
+    def get(self, key: bytes):
+        return self.__values[bytes(key)]
+
+    def range_iter(self, key_from: bytes=None, key_to: bytes=None, include_value=True):
+        return _range_iter(self.__values, self.__keys, key_from, key_to, include_value)
+
+
+class MemoryStore(KeyValueStore):
+    """dict 로 만든 engine, process 가 끝나면 사라진다.
+    같은 path 로 다시 열면 같은 store 를 돌려주므로 한 process 안에서는 db 를 다시 여는 것처럼 쓸 수 있다.
+    정렬된 key list 는 새 key 를 넣을 때 bisect.insort 로 같이 고친다.
+    snapshot 은 dict 와 key list 를 공유하고, snapshot 뒤의 첫 write 가 복사해서 쓴다. (copy on write)
+    """
+
+    __stores = {}
+    __stores_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.__path = path
+        self.__values = {}
+        self.__sorted_keys = []
+        self.__shared = False  # True 이면 snapshot 이 dict 와 key list 를 보고 있다.
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def open(path, create_if_missing=True):
+        """
+        :param path: store 를 구분하는 이름
+        :param create_if_missing: False 이면 없는 store 를 만들지 않고 KeyValueStoreError 를 발생한다.
+        :return: MemoryStore
+        """
+        with MemoryStore.__stores_lock:
+            store = MemoryStore.__stores.get(path)
+            if store is None:
+                if not create_if_missing:
+                    raise KeyValueStoreError(f"Memory store does not exist(path): {path}")
+                store = MemoryStore(path)
+                MemoryStore.__stores[path] = store
+            return store
+
+    @staticmethod
+    def destroy(path):
+        with MemoryStore.__stores_lock:
+            MemoryStore.__stores.pop(path, None)
+
+    @property
+    def path(self):
+        return self.__path
+
+    def get(self, key: bytes):
+        return self.__values[bytes(key)]
+
+    def put(self, key: bytes, value: bytes, sync=False):
+        self.apply([(bytes(key), bytes(value))])
+
+    def delete(self, key: bytes, sync=False):
+        self.apply([(bytes(key), None)])
+
+    def write_batch(self) -> KeyValueStoreWriteBatch:
+        return MemoryWriteBatch(self)
+
+    def apply(self, operations):
+        """(key, value) 목록을 한번에 반영한다. value 가 None 이면 delete 한다.
+
+        :param operations: list of (bytes, bytes or None)
+        """
+        with self.__lock:
+            if self.__shared:
+                self.__values = dict(self.__values)
+                self.__sorted_keys = list(self.__sorted_keys)
+                self.__shared = False
+
+            for key, value in operations:
+                if value is None:
+                    if self.__values.pop(key, None) is not None:
+                        del self.__sorted_keys[bisect.bisect_left(self.__sorted_keys, key)]
+                    continue
+
+                if key not in self.__values:
+                    bisect.insort(self.__sorted_keys, key)
+                self.__values[key] = value
+
+    def range_iter(self, key_from: bytes=None, key_to: bytes=None, include_value=True):
+        # 범위 안의 key 만 lock 안에서 읽고, iterator 를 쓰는 동안에는 lock 을 잡지 않는다.
+        with self.__lock:
+            items = list(_range_iter(self.__values, self.__sorted_keys, key_from, key_to, include_value))
+        return iter(items)
+
+    def snapshot(self) -> KeyValueStoreReader:
+        with self.__lock:
+            self.__shared = True
+            return MemorySnapshot(self.__values, self.__sorted_keys)
@@ -21,11 +21,13 @@ import os.path as osp
 from enum import Enum, IntEnum
 from loopchain.baseservice import ObjectManager
 from loopchain import configure as conf
+from loopchain.store import create_key_value_store
 
 
 class ScoreDatabaseType(Enum):
     sqlite3 = 'sqlite3'
     leveldb = 'leveldb'
+    key_value = 'key_value'  # conf.KEY_VALUE_STORE_ENGINE 의 KeyValueStore
 
 
 class LogLevel(IntEnum):
@@ -67,6 +69,8 @@ class ScoreHelper:
             return self.__sqlite3_database(score_id)
         elif database_type is ScoreDatabaseType.leveldb:
             return self.__leveldb_database(score_id)
+        elif database_type is ScoreDatabaseType.key_value:
+            return self.__key_value_database(score_id)
         else:
             logging.error("Did not find score database type")
 
@@ -143,3 +147,13 @@ class ScoreHelper:
             return leveldb.LevelDB(_score_database, create_if_missing=True)
         except leveldb.LevelDBError:
             raise leveldb.LevelDBError("Fail To Create Level DB(path): %s", _score_database)
+
+    def __key_value_database(self, score_id):
+        """KeyValueStore 용 Database 생성
+        leveldb type 은 level db 를 직접 돌려주고, 이 type 은 설정된 engine 의 KeyValueStore 를 돌려준다.
+
+        :param score_id: score ID
+        :return: KeyValueStore
+        """
+        peer_id = self.__load_peer_id()
+        return create_key_value_store(self.__db_filepath(peer_id, score_id), create_if_missing=True)
@@ -13,7 +13,9 @@
 # limitations under the License.
 """Signature Helper for Tx, Vote, Block Signature verify"""
 
+import collections
 import logging
+import threading
 
 import binascii
 from cryptography import x509
@@ -24,6 +26,8 @@ from cryptography.hazmat.primitives.asymmetric import ec, utils, rsa, padding
 from cryptography.hazmat.primitives.asymmetric.ec import EllipticCurvePublicKey
 from cryptography.x509 import Certificate
 
+from loopchain import configure as conf
+
 
 class PublicVerifier:
     """ provide singnature verify function using public key"""
@@ -122,21 +126,30 @@ class PublicVerifier:
 
 
 class PublicVerifierContainer:
-    """ PublicVerifier Container for many usaged """
+    """ PublicVerifier Container for many usaged
 
-    __public_verifier = {}
+    DER public key 로 만든 PublicVerifier 를 재사용한다. client key 가 많은 경우에도 메모리가 늘어나지 않도록
+    conf.PUBLIC_VERIFIER_CACHE_SIZE 개까지만 보관하고 오래 사용되지 않은 것부터 제거한다. (LRU)
+    Peer 들의 verifier 는 PeerObject 를 만들 때 미리 넣어 둔다.
+    """
 
-    # TODO Private BlockChain은 public key가 제한적이라 다 보관, 그러나 다른경우는 어떻게 해야할지 고민 필요
-    # TODO 많이 쓰는 것만 남기는 로직을 추가하면 그 때 그떄 생성하는 것보다 더 느릴 수 있음
+    __public_verifier = collections.OrderedDict()
+    __lock = threading.Lock()
+    __hits = 0
+    __misses = 0
+    __evictions = 0
 
     @classmethod
     def get_public_verifier(cls, serialized_public: bytes) -> PublicVerifier:
-        try:
-            public_verifier = cls.__public_verifier[serialized_public]
-        except KeyError as e:
-            public_verifier = cls.__create_public_verifier(serialized_public)
+        with cls.__lock:
+            public_verifier = cls.__public_verifier.get(serialized_public)
+            if public_verifier is not None:
+                cls.__public_verifier.move_to_end(serialized_public)
+                cls.__hits += 1
+                return public_verifier
+            cls.__misses += 1
 
-        return public_verifier
+        return cls.__create_public_verifier(serialized_public)
 
     @classmethod
     def __create_public_verifier(cls, serialized_public: bytes) -> PublicVerifier:
@@ -147,6 +160,93 @@ class PublicVerifierContainer:
         """
 
         public_verifier = PublicVerifier(serialized_public)
-        cls.__public_verifier[serialized_public] = public_verifier
+        cls.put_public_verifier(serialized_public, public_verifier)
 
         return public_verifier
+
+    @classmethod
+    def put_public_verifier(cls, serialized_public: bytes, public_verifier: PublicVerifier):
+        """ 이미 만든 verifier 를 넣어 둔다. (Peer 의 cert verifier 미리 읽기)
+
+        :param serialized_public: der public key
+        :param public_verifier: serialized_public 으로 만든 PublicVerifier
+        """
+        with cls.__lock:
+            cls.__public_verifier[serialized_public] = public_verifier
+            cls.__public_verifier.move_to_end(serialized_public)
+            while len(cls.__public_verifier) > conf.PUBLIC_VERIFIER_CACHE_SIZE:
+                cls.__public_verifier.popitem(last=False)
+                cls.__evictions += 1
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__public_verifier.clear()
+            cls.__hits = 0
+            cls.__misses = 0
+            cls.__evictions = 0
+
+    @classmethod
+    def get_status(cls) -> dict:
+        with cls.__lock:
+            requests = cls.__hits + cls.__misses
+            return {
+                "size": len(cls.__public_verifier),
+                "capacity": conf.PUBLIC_VERIFIER_CACHE_SIZE,
+                "hit_rate": round(cls.__hits / requests, 4) if requests > 0 else 0,
+                "hits": cls.__hits,
+                "misses": cls.__misses,
+                "evictions": cls.__evictions
+            }
+
+
+class VerifiedTxCache:
+    """ 서명 검증에 성공한 tx 를 기억하여 같은 tx 의 서명을 node 에서 한번만 검증하도록 한다.
+
+    AddTx, put_transaction, Block.validate 에서 같은 tx 를 반복하여 검증하므로 (tx_hash, signature, public_key) 를
+    key 로 검증 결과를 보관한다. 크기는 conf.VERIFIED_TX_CACHE_SIZE 로 제한하며 오래 사용되지 않은 것부터 제거한다.
+    tx_hash 가 tx 내용과 일치하는지는 cache 와 관계없이 매번 확인해야 한다.
+    """
+
+    __verified = collections.OrderedDict()
+    __lock = threading.Lock()
+    __hits = 0
+    __misses = 0
+
+    @classmethod
+    def is_verified(cls, tx_hash: str, signature: bytes, public_key: bytes) -> bool:
+        key = (tx_hash, bytes(signature), bytes(public_key))
+        with cls.__lock:
+            if key in cls.__verified:
+                cls.__verified.move_to_end(key)
+                cls.__hits += 1
+                return True
+
+            cls.__misses += 1
+            return False
+
+    @classmethod
+    def put(cls, tx_hash: str, signature: bytes, public_key: bytes):
+        key = (tx_hash, bytes(signature), bytes(public_key))
+        with cls.__lock:
+            cls.__verified[key] = True
+            cls.__verified.move_to_end(key)
+            while len(cls.__verified) > conf.VERIFIED_TX_CACHE_SIZE:
+                cls.__verified.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        with cls.__lock:
+            cls.__verified.clear()
+            cls.__hits = 0
+            cls.__misses = 0
+
+    @classmethod
+    def get_status(cls) -> dict:
+        with cls.__lock:
+            return {
+                "size": len(cls.__verified),
+                "capacity": conf.VERIFIED_TX_CACHE_SIZE,
+                "hits": cls.__hits,
+                "misses": cls.__misses
+            }
@@ -16,7 +16,6 @@
 import datetime
 import importlib.machinery
 import json
-import leveldb
 import logging
 import os.path as osp
 import re
@@ -37,6 +36,7 @@ from fluent import sender
 
 from loopchain import configure as conf
 from loopchain.protos import loopchain_pb2, message_code
+from loopchain.store import create_key_value_store, KeyValueStoreError
 
 # for verbose logs
 logger = verboselogs.VerboseLogger("dev")
@@ -308,6 +308,36 @@ def dict_to_binary(the_dict):
     return str.encode(json.dumps(the_dict))
 
 
+def get_slots_state(obj) -> dict:
+    """__slots__ 를 사용하는 object 의 값들을 pickle 에서 쓰던 __dict__ 형태(name mangling 된 key)로 모은다.
+
+    :param obj: __slots__ 를 사용하는 object
+    :return: {attribute name: value}
+    """
+    state = {}
+    for cls in type(obj).__mro__:
+        for slot in cls.__dict__.get('__slots__', ()):
+            if slot in ('__dict__', '__weakref__'):
+                continue
+            if slot.startswith('__') and not slot.endswith('__'):
+                slot = f"_{cls.__name__.lstrip('_')}{slot}"
+            if hasattr(obj, slot):
+                state[slot] = getattr(obj, slot)
+
+    state.update(getattr(obj, '__dict__', {}))
+    return state
+
+
+def set_slots_state(obj, state: dict):
+    """get_slots_state 로 모은 값(혹은 __slots__ 이전에 pickle 된 __dict__)을 object 에 넣는다.
+
+    :param obj: __slots__ 를 사용하는 object
+    :param state: {attribute name: value}
+    """
+    for name, value in state.items():
+        setattr(obj, name, value)
+
+
 # Get Django Project get_valid_filename
 # FROM https://github.com/django/django/blob/master/django/utils/encoding.py#L8
 _PROTECTED_TYPES = (
@@ -401,9 +431,10 @@ def parse_target_list(targets: str) -> list:
 
 def init_level_db(level_db_identity):
     """init Level Db
+    conf.KEY_VALUE_STORE_ENGINE 의 key value store 를 연다.
 
     :param level_db_identity: identity for leveldb
-    :return: level_db, level_db_path
+    :return: level_db (KeyValueStore), level_db_path
     """
     level_db = None
 
@@ -414,14 +445,14 @@ def init_level_db(level_db_identity):
     retry_count = 0
     while level_db is None and retry_count < conf.MAX_RETRY_CREATE_DB:
         try:
-            level_db = leveldb.LevelDB(db_path, create_if_missing=True)
-        except leveldb.LevelDBError:
+            level_db = create_key_value_store(db_path, create_if_missing=True)
+        except KeyValueStoreError:
             db_path = db_default_path + str(retry_count)
         retry_count += 1
 
     if level_db is None:
         logging.error("Fail! Create LevelDB")
-        raise leveldb.LevelDBError("Fail To Create Level DB(path): " + db_path)
+        raise KeyValueStoreError("Fail To Create Level DB(path): " + db_path)
 
     return level_db, db_path
 
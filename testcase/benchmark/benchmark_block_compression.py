@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark block compression codecs
+
+ratio       : 저장된 block bytes / serialize 된 block bytes
+compress    : block 하나를 압축하는 시간
+read block  : 저장된 dump 를 풀고 deserialize 하는 시간 (find_block_by_hash 의 cache miss)
+read header : 앞부분만 풀어 header 를 읽는 시간 (iter_blocks(headers_only=True))
+block sync  : BlockSync 응답을 만드는 시간 (저장된 dump 를 그대로 보냄)
+
+usage: python3 -m testcase.benchmark.benchmark_block_compression [block_count] [tx_count]
+"""
+
+import sys
+import time
+
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, compress_block_dump
+from loopchain.store import KeyValueStoreEngine, create_key_value_store, destroy_key_value_store
+from testcase.benchmark.benchmark_block_write import make_blocks
+
+
+def per_block_ms(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) * 1000 / len(items)
+
+
+def run(name, compression, level, blocks):
+    conf.BLOCK_COMPRESSION = compression
+    conf.BLOCK_COMPRESSION_LEVEL = level
+    db_path = f"benchmark_block_compression_{name}"
+    try:
+        chain = BlockChain(create_key_value_store(db_path, engine=KeyValueStoreEngine.memory))
+        block_dumps = [block.serialize_block() for block in blocks]
+        compress_ms = per_block_ms(compress_block_dump, block_dumps)
+        chain.add_blocks(blocks)
+
+        stored_dumps = [chain.find_block_dump_by_hash(block.block_hash) for block in blocks]
+        ratio = sum(len(dump) for dump in stored_dumps) / sum(len(dump) for dump in block_dumps)
+        read_block_ms = per_block_ms(lambda dump: Block(conf.LOOPCHAIN_DEFAULT_CHANNEL).deserialize_block(dump),
+                                     stored_dumps)
+        read_header_ms = per_block_ms(Block.read_header, stored_dumps)
+        block_sync_ms = per_block_ms(chain.find_block_dump_by_hash, [block.block_hash for block in blocks])
+
+        print(f"{name:<10}{ratio:>8.3f}{compress_ms:>12.2f}{read_block_ms:>14.2f}{read_header_ms:>14.3f}"
+              f"{block_sync_ms:>14.3f}")
+    finally:
+        destroy_key_value_store(db_path, engine=KeyValueStoreEngine.memory)
+
+
+def main(block_count=20, tx_count=1000):
+    peer_auth = test_util.create_peer_auth()
+    blocks_db_path = "benchmark_block_compression_blocks"
+    blocks_chain = BlockChain(create_key_value_store(blocks_db_path, engine=KeyValueStoreEngine.memory))
+    blocks = make_blocks(blocks_chain, block_count, tx_count, peer_auth)
+    destroy_key_value_store(blocks_db_path, engine=KeyValueStoreEngine.memory)
+
+    # 압축하지 않은 block 을 BlockSync 로 보내던 이전 방식: block 을 찾아 (cache miss) 다시 serialize 한다.
+    conf.BLOCK_CACHE_SIZE_BYTES = 0
+    print(f"{block_count} blocks with {tx_count} txs (ms per block)")
+    print(f"{'codec':<10}{'ratio':>8}{'compress':>12}{'read block':>14}{'read header':>14}{'block sync':>14}")
+    for name, compression, level in (("none", 'none', 0),
+                                     ("zlib-1", 'zlib', 1),
+                                     ("zlib-6", 'zlib', 6),
+                                     ("lzma-0", 'lzma', 0),
+                                     ("lzma-6", 'lzma', 6)):
+        run(name, compression, level, blocks)
+
+    chain = BlockChain(create_key_value_store(blocks_db_path, engine=KeyValueStoreEngine.memory))
+    chain.add_blocks(blocks)
+    serialize_ms = per_block_ms(lambda block_hash: chain.find_block_by_hash(block_hash).serialize_block(),
+                                [block.block_hash for block in blocks])
+    destroy_key_value_store(blocks_db_path, engine=KeyValueStoreEngine.memory)
+    print(f"previous BlockSync (find_block_by_hash + serialize_block): {serialize_ms:.3f} ms per block")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark memory held by Transaction and Block objects
+
+usage: python3 -m testcase.benchmark.benchmark_block_memory [tx_count]
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from loopchain import configure as conf
+from loopchain.blockchain import Block
+from testcase.benchmark.benchmark_block_serialize import make_block
+import testcase.unittest.test_util as test_util
+
+
+def measure(factory):
+    """factory 가 만든 object 가 잡고 있는 memory 를 구한다.
+
+    :return: (object, bytes)
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = factory()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def main(tx_count=10000):
+    peer_auth = test_util.create_peer_auth()
+    block_dump = make_block(tx_count, peer_auth).serialize_block()
+
+    def load_block():
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        block.deserialize_block(block_dump)
+        return block
+
+    def build_block():
+        block = load_block()
+        for tx in block.confirmed_transaction_list:
+            # Block.validate 후의 상태 (hash preimage 와 tx index 를 만든 상태)
+            tx.get_hash_preimage()
+        block.find_transaction_index("")
+        return block
+
+    results = []
+    for name, factory in (("deserialized", load_block), ("validated", build_block)):
+        block, size = measure(factory)
+        results.append((name, size, size / len(block.confirmed_transaction_list)))
+        del block
+
+    print(f"block with {tx_count} txs")
+    print(f"{'state':<14}{'block(bytes)':>16}{'per tx(bytes)':>16}")
+    for name, size, per_tx in results:
+        print(f"{name:<14}{size:>16}{per_tx:>16.1f}")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark binary block format against pickle
+
+usage: python3 -m testcase.benchmark.benchmark_block_serialize [tx_count] [repeat]
+"""
+
+import pickle
+import sys
+import timeit
+
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block
+
+
+def make_block(tx_count, peer_auth):
+    block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+    for _ in range(tx_count):
+        block.put_transaction(test_util.create_basic_tx('benchmark_peer', peer_auth))
+    genesis = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+    genesis.generate_block()
+    block.generate_block(genesis)
+    block.sign(peer_auth)
+    return block
+
+
+def pickle_decode(dump):
+    return pickle.loads(dump)
+
+
+def binary_decode(dump):
+    block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+    block.deserialize_block(dump)
+    return block
+
+
+def main(tx_count=10000, repeat=5):
+    peer_auth = test_util.create_peer_auth()
+    block = make_block(tx_count, peer_auth)
+
+    pickle_dump = pickle.dumps(block, pickle.DEFAULT_PROTOCOL)
+    binary_dump = block.serialize_block()
+
+    results = [
+        ("pickle", len(pickle_dump),
+         min(timeit.repeat(lambda: pickle.dumps(block, pickle.DEFAULT_PROTOCOL), number=1, repeat=repeat)),
+         min(timeit.repeat(lambda: pickle_decode(pickle_dump), number=1, repeat=repeat))),
+        ("binary", len(binary_dump),
+         min(timeit.repeat(block.serialize_block, number=1, repeat=repeat)),
+         min(timeit.repeat(lambda: binary_decode(binary_dump), number=1, repeat=repeat)))
+    ]
+
+    print(f"block with {tx_count} txs, best of {repeat}")
+    print(f"{'format':<8}{'size(bytes)':>14}{'encode(ms)':>14}{'decode(ms)':>14}")
+    for name, size, encode_time, decode_time in results:
+        print(f"{name:<8}{size:>14}{encode_time * 1000:>14.2f}{decode_time * 1000:>14.2f}")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
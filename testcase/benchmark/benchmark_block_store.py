@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark write amplification and range scan of block bodies in level db vs segment files
+
+write amplification : process 가 write 한 bytes (/proc/self/io wchar, level db compaction 포함) / serialize 된 block bytes
+range scan          : block cache 없이 height 순서로 모든 block 을 읽는 속도
+
+usage: python3 -m testcase.benchmark.benchmark_block_store [block_count] [tx_count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import BlockChain, SegmentBlockStore
+from loopchain.store import LevelDBStore
+from testcase.benchmark.benchmark_block_write import make_blocks
+
+
+def written_bytes():
+    with open('/proc/self/io') as io_stat:
+        for line in io_stat:
+            if line.startswith('wchar:'):
+                return int(line.split()[1])
+    return 0
+
+
+def run(name, block_count, tx_count, peer_auth, use_segment):
+    db_path = tempfile.mkdtemp(prefix="benchmark_block_store_")
+    segment_path = os.path.join(db_path, conf.BLOCK_SEGMENT_DIR)
+    try:
+        db = LevelDBStore(db_path, create_if_missing=True)
+        block_store = SegmentBlockStore(segment_path, fsync=False) if use_segment else None
+        chain = BlockChain(db, block_store=block_store)
+        blocks = make_blocks(chain, block_count, tx_count, peer_auth)
+        block_bytes = sum(len(block.serialize_block()) for block in blocks)
+
+        before = written_bytes()
+        for block in blocks:
+            chain.add_block(block)
+        db.db.CompactRange()
+        amplification = (written_bytes() - before) / block_bytes
+
+        scan_chain = BlockChain(db, block_store=block_store)
+        start = time.perf_counter()
+        for height in range(1, block_count + 1):
+            scan_chain.find_block_by_height(height)
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:<10}{amplification:>14.2f}{block_count / elapsed:>16.1f}"
+              f"{block_bytes / elapsed / 1024 / 1024:>14.1f}")
+    finally:
+        shutil.rmtree(db_path)
+
+
+def main(block_count=200, tx_count=1000):
+    # range scan 은 block cache 없이 측정한다.
+    conf.BLOCK_CACHE_SIZE_BYTES = 0
+    peer_auth = test_util.create_peer_auth()
+
+    print(f"{block_count} blocks with {tx_count} txs")
+    print(f"{'store':<10}{'write amp':>14}{'scan blocks/s':>16}{'scan MB/s':>14}")
+    run("leveldb", block_count, tx_count, peer_auth, use_segment=False)
+    run("segment", block_count, tx_count, peer_auth, use_segment=True)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark block write throughput of BlockChain
+
+per_tx_put   : tx index 를 tx 마다 Put 하고 block 을 따로 WriteBatch 로 기록 (이전 방식)
+add_block    : block 마다 하나의 WriteBatch
+add_blocks   : group_size 개의 block 을 하나의 WriteBatch (block height sync 의 group commit)
+
+usage: python3 -m testcase.benchmark.benchmark_block_write [block_count] [tx_count] [group_size]
+"""
+
+import json
+import shutil
+import sys
+import tempfile
+import time
+
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, BlockStatus
+from loopchain.store import LevelDBStore
+
+
+def make_blocks(chain, block_count, tx_count, peer_auth):
+    blocks = []
+    last_block = chain.last_block
+    for _ in range(block_count):
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        for _ in range(tx_count):
+            block.put_transaction(test_util.create_basic_tx('benchmark_peer', peer_auth))
+        block.generate_block(last_block)
+        block.block_status = BlockStatus.confirmed
+        blocks.append(block)
+        last_block = block
+    return blocks
+
+
+def write_per_tx_put(db, chain, blocks, group_size):
+    for block in blocks:
+        for tx in block.confirmed_transaction_list:
+            tx_info = {'block_hash': block.block_hash, 'result': {'code': 0}}
+            db.put(tx.tx_hash.encode(encoding=conf.HASH_KEY_ENCODING),
+                   json.dumps(tx_info).encode(encoding=conf.PEER_DATA_ENCODING))
+
+        block_hash_encoded = block.block_hash.encode(encoding='UTF-8')
+        batch = db.write_batch()
+        batch.put(block_hash_encoded, block.serialize_block())
+        batch.put(BlockChain.LAST_BLOCK_KEY, block_hash_encoded)
+        batch.put(BlockChain.BLOCK_HEIGHT_KEY + block.height.to_bytes(conf.BLOCK_HEIGHT_BYTES_LEN, byteorder='big'),
+                  block_hash_encoded)
+        batch.write()
+
+
+def write_add_block(db, chain, blocks, group_size):
+    for block in blocks:
+        chain.add_block(block)
+
+
+def write_add_blocks(db, chain, blocks, group_size):
+    for index in range(0, len(blocks), group_size):
+        chain.add_blocks(blocks[index:index + group_size])
+
+
+def main(block_count=50, tx_count=1000, group_size=10):
+    peer_auth = test_util.create_peer_auth()
+    print(f"{block_count} blocks with {tx_count} txs, group_size={group_size}")
+    print(f"{'mode':<14}{'elapsed(s)':>12}{'blocks/s':>12}{'txs/s':>12}")
+
+    for name, write in (("per_tx_put", write_per_tx_put),
+                        ("add_block", write_add_block),
+                        ("add_blocks", write_add_blocks)):
+        db_path = tempfile.mkdtemp(prefix="benchmark_block_write_")
+        try:
+            db = LevelDBStore(db_path, create_if_missing=True)
+            chain = BlockChain(db)
+            blocks = make_blocks(chain, block_count, tx_count, peer_auth)
+
+            start = time.perf_counter()
+            write(db, chain, blocks, group_size)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<14}{elapsed:>12.3f}{block_count / elapsed:>12.1f}{block_count * tx_count / elapsed:>12.0f}")
+        finally:
+            shutil.rmtree(db_path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
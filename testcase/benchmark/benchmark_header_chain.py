@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark height lookups with and without the in-memory header chain
+
+height -> hash : find_block_hash_by_height (level db height index 와 header chain 비교)
+header         : find_block_by_height (block 전체), find_header_by_height (db + read_header, header chain)
+by time        : find_block_height_by_time (db header binary search, header chain binary search) 와
+                 find_block_by_height 로 chain 을 훑는 이전 방식 비교
+startup        : header file 을 읽는 시간과 block db 에서 header chain 을 채우는 시간
+
+block cache 는 끄고 (cache miss) 임의의 height 를 조회한다.
+
+usage: python3 -m testcase.benchmark.benchmark_header_chain [block_count] [tx_count] [lookup_count]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import BlockChain, HeaderChain
+from loopchain.store import LevelDBStore
+from testcase.benchmark.benchmark_block_write import make_blocks
+
+
+def per_lookup_us(func, heights):
+    start = time.perf_counter()
+    for height in heights:
+        func(height)
+    return (time.perf_counter() - start) * 1000000 / len(heights)
+
+
+def scan_height_by_time(chain, time_stamp):
+    for height in range(chain.block_height, -1, -1):
+        if chain.find_block_by_height(height).time_stamp <= time_stamp:
+            return height
+    return None
+
+
+def main(block_count=1000, tx_count=50, lookup_count=10000):
+    conf.BLOCK_CACHE_SIZE_BYTES = 0
+    work_path = tempfile.mkdtemp(prefix="benchmark_header_chain_")
+    header_path = os.path.join(work_path, "headers.dat")
+    try:
+        db = LevelDBStore(os.path.join(work_path, "db"), create_if_missing=True)
+        chain = BlockChain(db)
+        print(f"make {block_count} blocks with {tx_count} txs...")
+        blocks = make_blocks(chain, block_count, tx_count, test_util.create_peer_auth())
+        chain.add_blocks(blocks)
+
+        start = time.perf_counter()
+        header_chain = HeaderChain(header_path)
+        header_chain_chain = BlockChain(db, header_chain=header_chain)
+        fill_ms = (time.perf_counter() - start) * 1000
+        header_chain.close()
+        start = time.perf_counter()
+        header_chain = HeaderChain(header_path)
+        load_ms = (time.perf_counter() - start) * 1000
+        header_chain_chain = BlockChain(db, header_chain=header_chain)
+
+        heights = [random.randint(0, block_count) for _ in range(lookup_count)]
+        db_hash_us = per_lookup_us(chain.find_block_hash_by_height, heights)
+        header_chain_hash_us = per_lookup_us(header_chain_chain.find_block_hash_by_height, heights)
+        block_us = per_lookup_us(chain.find_block_by_height, heights[:lookup_count // 10])
+        db_header_us = per_lookup_us(chain.find_header_by_height, heights)
+        header_chain_header_us = per_lookup_us(header_chain_chain.find_header_by_height, heights)
+        time_stamps = [blocks[height - 1].time_stamp if height > 0 else 0 for height in heights]
+        db_time_us = per_lookup_us(chain.find_block_height_by_time, time_stamps)
+        header_chain_time_us = per_lookup_us(header_chain_chain.find_block_height_by_time, time_stamps)
+        scan_time_us = per_lookup_us(lambda time_stamp: scan_height_by_time(chain, time_stamp), time_stamps[:10])
+
+        print(f"{block_count + 1} blocks, header file {os.path.getsize(header_path) / 1024:.1f} KB")
+        print(f"height -> hash : level db {db_hash_us:.2f} us, header chain {header_chain_hash_us:.2f} us")
+        print(f"header         : find_block_by_height {block_us:.2f} us, level db + read_header {db_header_us:.2f} us, "
+              f"header chain {header_chain_header_us:.2f} us")
+        print(f"by time        : scan {scan_time_us / 1000:.2f} ms, level db binary search {db_time_us:.2f} us, "
+              f"header chain binary search {header_chain_time_us:.2f} us")
+        print(f"startup        : load header file {load_ms:.2f} ms, fill from block db {fill_ms:.2f} ms")
+        header_chain.close()
+    finally:
+        shutil.rmtree(work_path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark throughput of key value store engines
+
+put         : key 마다 put
+batch       : batch_size 개씩 write_batch
+get         : 무작위 순서로 get
+range_iter  : 모든 key 를 순서대로 읽기
+add_block   : 같은 engine 위의 BlockChain.add_block
+
+usage: python3 -m testcase.benchmark.benchmark_key_value_store [key_count] [value_size] [batch_size] [block_count]
+"""
+
+import hashlib
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import testcase.unittest.test_util as test_util
+from loopchain.blockchain import BlockChain
+from loopchain.store import KeyValueStoreEngine, create_key_value_store, destroy_key_value_store
+from testcase.benchmark.benchmark_block_write import make_blocks
+
+
+def measure(store, keys, value, batch_size, blocks):
+    """
+    :return: {mode: operations per second}
+    """
+    results = {}
+
+    start = time.perf_counter()
+    for key in keys:
+        store.put(key, value)
+    results['put'] = len(keys) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for index in range(0, len(keys), batch_size):
+        with store.write_batch() as batch:
+            for key in keys[index:index + batch_size]:
+                batch.put(key, value)
+    results['batch'] = len(keys) / (time.perf_counter() - start)
+
+    shuffled_keys = random.sample(keys, len(keys))
+    start = time.perf_counter()
+    for key in shuffled_keys:
+        store.get(key)
+    results['get'] = len(keys) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in store.range_iter(include_value=True))
+    results['range_iter'] = count / (time.perf_counter() - start)
+
+    chain = BlockChain(store)
+    start = time.perf_counter()
+    for block in blocks:
+        chain.add_block(block)
+    results['add_block'] = len(blocks) / (time.perf_counter() - start)
+
+    return results
+
+
+def main(key_count=100000, value_size=100, batch_size=1000, block_count=20):
+    keys = [hashlib.sha256(str(index).encode()).hexdigest().encode() for index in range(key_count)]
+    value = bytes(value_size)
+
+    # block 은 한번만 만들고 engine 마다 같은 block 을 기록한다.
+    block_db_path = tempfile.mkdtemp(prefix="benchmark_key_value_store_")
+    try:
+        blocks_chain = BlockChain(create_key_value_store(block_db_path, engine=KeyValueStoreEngine.memory))
+        blocks = make_blocks(blocks_chain, block_count, 500, test_util.create_peer_auth())
+    finally:
+        destroy_key_value_store(block_db_path, engine=KeyValueStoreEngine.memory)
+        shutil.rmtree(block_db_path)
+
+    modes = ('put', 'batch', 'get', 'range_iter', 'add_block')
+    print(f"{key_count} keys, value {value_size} bytes, batch_size={batch_size}, {block_count} blocks with 500 txs")
+    print(f"{'engine':<10}" + "".join(f"{mode + '/s':>14}" for mode in modes))
+    for engine in KeyValueStoreEngine:
+        db_path = tempfile.mkdtemp(prefix="benchmark_key_value_store_")
+        try:
+            results = measure(create_key_value_store(db_path, engine=engine), keys, value, batch_size, blocks)
+            print(f"{engine.value:<10}" + "".join(f"{results[mode]:>14.0f}" for mode in modes))
+        finally:
+            destroy_key_value_store(db_path, engine=engine)
+            shutil.rmtree(db_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark ingest overhead and recovery time of the persistent mempool
+
+ingest      : AddTx 의 tx queue put 과 mempool 기록을 함께 했을 때 tx 하나의 시간 (queue only 와 비교)
+recovery    : peer 를 다시 시작할 때 mempool 을 읽어 tx queue 에 다시 넣는 시간
+prune       : block 하나의 commit 된 tx 를 지우는 시간
+compact     : commit 된 tx 를 지우고 남은 tx 를 snapshot 으로 옮겨 적는 시간 (prune 을 부른 thread 가 lock 밖에서 쓴다.)
+
+tx 는 서명하지 않은 general tx 를 pickle 한 것으로 (약 550 bytes) 서명된 tx 보다 조금 작다.
+
+usage: python3 -m testcase.benchmark.benchmark_mempool [tx_count] [block_tx_count]
+"""
+
+import os
+import pickle
+import queue
+import shutil
+import sys
+import tempfile
+import time
+
+from loopchain.blockchain import Transaction, PersistentMempool
+
+
+def make_txs(tx_count):
+    txs = []
+    for x in range(tx_count):
+        tx = Transaction()
+        tx.put_meta(Transaction.PEER_ID_KEY, "benchmark_peer")
+        tx.put_data('{"method": "transfer", "params": {"to": "hx%040d", "value": %d}}' % (x, x))
+        txs.append((tx.tx_hash, pickle.dumps(tx)))
+    return txs
+
+
+def main(tx_count=1000000, block_tx_count=10000):
+    print(f"make {tx_count} txs...")
+    txs = make_txs(tx_count)
+    work_path = tempfile.mkdtemp(prefix="benchmark_mempool_")
+    mempool_path = os.path.join(work_path, "mempool")
+    try:
+        tx_queue = queue.Queue()
+        start = time.perf_counter()
+        for tx_hash, tx_unloaded in txs:
+            tx_queue.put(tx_unloaded)
+        queue_us = (time.perf_counter() - start) * 1000000 / tx_count
+
+        tx_queue = queue.Queue()
+        mempool = PersistentMempool(mempool_path)
+        start = time.perf_counter()
+        for tx_hash, tx_unloaded in txs:
+            mempool.add(tx_hash, tx_unloaded)
+            tx_queue.put(tx_unloaded)
+        mempool.close()
+        mempool_us = (time.perf_counter() - start) * 1000000 / tx_count
+        log_bytes = os.path.getsize(os.path.join(mempool_path, "mempool.log"))
+        del tx_queue
+
+        start = time.perf_counter()
+        # compact 는 따로 잰다.
+        mempool = PersistentMempool(mempool_path, compact_bytes=sys.maxsize)
+        tx_queue = queue.Queue()
+        for tx_unloaded in mempool.get_txs():
+            tx_queue.put(tx_unloaded)
+        recovery_s = time.perf_counter() - start
+        reloaded = tx_queue.qsize()
+        del tx_queue
+
+        start = time.perf_counter()
+        mempool.prune([tx_hash for tx_hash, _ in txs[:block_tx_count]], 1)
+        prune_ms = (time.perf_counter() - start) * 1000
+
+        compact_mempool = PersistentMempool(mempool_path + "_compact", sync_records=tx_count, compact_bytes=0)
+        for tx_hash, tx_unloaded in txs:
+            compact_mempool.add(tx_hash, tx_unloaded)
+        compact_mempool.prune([], 0)
+        start = time.perf_counter()
+        compact_mempool.prune([tx_hash for tx_hash, _ in txs[:block_tx_count]], 1)
+        compact_s = time.perf_counter() - start
+        compact_mempool.close()
+
+        print(f"{tx_count} pending txs, {block_tx_count} txs per block, log {log_bytes / 1024 / 1024:.1f} MB")
+        print(f"ingest      : queue only {queue_us:.2f} us/tx, queue + mempool {mempool_us:.2f} us/tx "
+              f"(+{mempool_us - queue_us:.2f} us/tx)")
+        print(f"recovery    : {recovery_s:.2f} s ({reloaded} txs reloaded)")
+        print(f"prune       : {prune_ms:.1f} ms")
+        print(f"compact     : {compact_s:.2f} s ({len(txs) - block_tx_count} txs to snapshot)")
+        mempool.close()
+    finally:
+        shutil.rmtree(work_path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark negative tx lookups with and without the tx bloom filter
+
+level db miss : tx index 크기의 entry 가 tx_count 개 있는 level db 에서 없는 tx hash 를 get 하는 시간
+filter        : TxBloomFilter.might_contain 으로 없는 tx hash 를 걸러내는 시간
+fp rate       : capacity 만큼 넣었을 때 측정한 false positive 비율과 계산 값
+add, save     : tx hash 를 넣는 시간과 filter 를 file 에 저장하는 시간
+
+usage: python3 -m testcase.benchmark.benchmark_tx_bloom_filter [tx_count] [lookup_count]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from loopchain.blockchain import TxBloomFilter
+from loopchain.store import LevelDBStore
+
+
+def main(tx_count=1000000, lookup_count=100000):
+    work_path = tempfile.mkdtemp(prefix="benchmark_tx_bloom_filter_")
+    try:
+        tx_hashes = [os.urandom(32).hex() for _ in range(tx_count)]
+        missing_hashes = [os.urandom(32).hex() for _ in range(lookup_count)]
+
+        db = LevelDBStore(os.path.join(work_path, "db"), create_if_missing=True)
+        for index in range(0, tx_count, 10000):
+            batch = db.write_batch()
+            for tx_hash in tx_hashes[index:index + 10000]:
+                batch.put(tx_hash.encode(), os.urandom(24))
+            batch.write()
+
+        start = time.perf_counter()
+        for tx_hash in missing_hashes:
+            try:
+                db.get(tx_hash.encode())
+            except KeyError:
+                pass
+        db_miss_us = (time.perf_counter() - start) * 1000000 / lookup_count
+
+        tx_bloom_filter = TxBloomFilter(os.path.join(work_path, "tx_bloom_filter.dat"), capacity=tx_count, load=False)
+        start = time.perf_counter()
+        tx_bloom_filter.add(tx_hashes)
+        add_us = (time.perf_counter() - start) * 1000000 / tx_count
+
+        start = time.perf_counter()
+        false_positives = sum(tx_bloom_filter.might_contain(tx_hash) for tx_hash in missing_hashes)
+        filter_us = (time.perf_counter() - start) * 1000000 / lookup_count
+
+        start = time.perf_counter()
+        tx_bloom_filter.save()
+        save_ms = (time.perf_counter() - start) * 1000
+        status = tx_bloom_filter.get_status()
+
+        print(f"{tx_count} committed txs, {lookup_count} lookups of uncommitted txs")
+        print(f"level db miss : {db_miss_us:.2f} us")
+        print(f"filter        : {filter_us:.2f} us")
+        print(f"fp rate       : measured {false_positives / lookup_count:.5f}, "
+              f"expected {status['expected_false_positive_rate']:.5f} ({status['hash_count']} hashes)")
+        print(f"add, save     : add {add_us:.2f} us/tx, save {status['size_bytes'] / 1024 / 1024:.1f} MB "
+              f"in {save_ms:.1f} ms")
+    finally:
+        shutil.rmtree(work_path)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Benchmark tx verification of Block.validate by block size and worker count
+
+cold : repeat 마다 VerifiedTxCache 를 비우고 서명을 모두 검증하는 시간
+warm : 같은 tx 를 다시 검증할 때 (AddTx 에서 미리 검증된 tx 의 Block 검증) VerifiedTxCache 를 사용하는 시간
+
+usage: python3 -m testcase.benchmark.benchmark_tx_verify [max_tx_count] [repeat]
+"""
+
+import sys
+import timeit
+
+import testcase.unittest.test_util as test_util
+from loopchain.blockchain.tx_verifier import TxVerifier
+from loopchain.tools import VerifiedTxCache
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def main(max_tx_count=10000, repeat=3):
+    peer_auth = test_util.create_peer_auth()
+    tx_list = [test_util.create_basic_tx('benchmark_peer', peer_auth) for _ in range(max_tx_count)]
+    block_sizes = [size for size in (100, 1000, 5000, 10000) if size < max_tx_count] + [max_tx_count]
+
+    print(f"cold tx verification time(ms), best of {repeat}")
+    print(f"{'txs':>8}" + "".join(f"{f'workers={workers}':>14}" for workers in WORKER_COUNTS))
+    for block_size in block_sizes:
+        row = f"{block_size:>8}"
+        for workers in WORKER_COUNTS:
+            verifier = TxVerifier(workers=workers, parallel_min_tx=0)
+            # setup 은 repeat 마다 실행되므로 모든 repeat 이 cache miss 로 서명을 검증한다.
+            elapsed = min(timeit.repeat(lambda: verifier.find_first_invalid(tx_list[:block_size]),
+                                        setup=VerifiedTxCache.clear, number=1, repeat=repeat))
+            verifier.shutdown()
+            row += f"{elapsed * 1000:>14.2f}"
+        print(row)
+
+    block_size = min(block_sizes[-1], VerifiedTxCache.get_status()["capacity"])
+    verifier = TxVerifier(workers=1, parallel_min_tx=0)
+    VerifiedTxCache.clear()
+    verifier.find_first_invalid(tx_list[:block_size])
+    elapsed = min(timeit.repeat(lambda: verifier.find_first_invalid(tx_list[:block_size]), number=1, repeat=repeat))
+    verifier.shutdown()
+    print(f"warm (VerifiedTxCache hit) {block_size} txs, workers=1: {elapsed * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -17,6 +17,7 @@
 """Test Block functions"""
 
 import logging
+import pickle
 import sys
 import unittest
 
@@ -26,7 +27,8 @@ from loopchain import configure as conf
 from loopchain.baseservice import PeerInfo, PeerStatus, PeerObject, ObjectManager
 
 sys.path.append('../')
-from loopchain.blockchain import Block, BlockInValidError
+from loopchain.blockchain import Block, BlockInValidError, Transaction
+from loopchain.blockchain.merkle import verify_multi_proof
 
 util.set_log_level_debug()
 
@@ -101,6 +103,58 @@ class TestBlock(unittest.TestCase):
         self.assertTrue(block.put_transaction(tx_list), "Block에 여러 트랜잭션 추가 실패")
         self.assertEqual(len(block.confirmed_transaction_list), tx_size*2, "트랜잭션 사이즈 확인 실패")
 
+    def test_find_transaction_by_hash_index(self):
+        """ GIVEN block with txs and same tx put again
+        WHEN find tx by hash in block and in deserialized block
+        THEN duplicated tx is not added and every tx is found at its position
+        """
+        # GIVEN
+        block = self.__generate_block()
+        tx_size = len(block.confirmed_transaction_list)
+        self.assertTrue(block.put_transaction(block.confirmed_transaction_list[0]))
+        self.assertEqual(tx_size, len(block.confirmed_transaction_list))
+
+        block2 = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        block2.deserialize_block(block.serialize_block())
+
+        # WHEN THEN
+        for target in (block, block2):
+            for idx, tx in enumerate(target.confirmed_transaction_list):
+                self.assertEqual(idx, target.find_transaction_index(tx.get_tx_hash()))
+                self.assertEqual(tx.get_tx_hash(), target.find_transaction(tx.get_tx_hash()).get_tx_hash())
+            self.assertEqual(-1, target.find_transaction_index("not_in_block"))
+            self.assertIsNone(target.find_transaction("not_in_block"))
+
+    def test_tx_cache_after_tx_list_changed(self):
+        """ GIVEN block with txs
+        WHEN tx list is assigned with another list of same size or changed by pop and reset_transactions
+        THEN tx index and merkle tree root hash follow the changed tx list
+        """
+        # GIVEN
+        block = self.__generate_block()
+        other_block = self.__generate_block()
+        self.assertEqual(len(block.confirmed_transaction_list), len(other_block.confirmed_transaction_list))
+        tx_hash = block.confirmed_transaction_list[0].get_tx_hash()
+        self.assertEqual(0, block.find_transaction_index(tx_hash))
+
+        # WHEN
+        block.confirmed_transaction_list = list(other_block.confirmed_transaction_list)
+
+        # THEN
+        self.assertEqual(-1, block.find_transaction_index(tx_hash))
+        self.assertEqual(Block.calculate_hash(other_block)[0], Block.calculate_hash(block)[0])
+
+        # WHEN
+        popped_tx = block.confirmed_transaction_list.pop(0)
+        block.reset_transactions()
+
+        # THEN
+        self.assertEqual(-1, block.find_transaction_index(popped_tx.get_tx_hash()))
+        self.assertEqual(0, block.find_transaction_index(block.confirmed_transaction_list[0].get_tx_hash()))
+        self.assertTrue(block.put_transaction(popped_tx))
+        self.assertEqual(len(block.confirmed_transaction_list) - 1,
+                         block.find_transaction_index(popped_tx.get_tx_hash()))
+
     # TODO block validate 에 peer_service 정보가 필요해짐, 테스트 수정 필요
     @unittest.skip
     def test_validate_block(self):
@@ -138,6 +192,55 @@ class TestBlock(unittest.TestCase):
         # logging.debug("block mekletree : %s ", block.merkle_tree)
         self.assertTrue(mk_result, "머클트리검증 실패")
 
+    def test_merkle_multi_proof(self):
+        """ GIVEN blocks with various tx count
+        WHEN make multi-proof for some of txs in block
+        THEN proof is verified with merkle tree root hash and is rejected with wrong tx hash
+        """
+        genesis = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        genesis.generate_block()
+
+        for tx_count in (1, 2, 3, 7, 10):
+            # GIVEN
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            for x in range(0, tx_count):
+                block.put_transaction(test_util.create_basic_tx(self.__peer_id, self.__peer_auth))
+            block.generate_block(genesis)
+            tx_hashes = [tx.get_tx_hash() for tx in block.confirmed_transaction_list]
+
+            for targets in (tx_hashes[-1:], tx_hashes[::2], tx_hashes, tx_hashes[::-1] + ["not_in_block"]):
+                # WHEN
+                proof = block.mk_merkle_multi_proof(targets)
+
+                # THEN
+                self.assertEqual(sorted(set(targets) - {"not_in_block"}), sorted(proof["tx_hashes"]))
+                self.assertTrue(verify_multi_proof(block.merkle_tree_root_hash, proof, proof["tx_hashes"]))
+                self.assertFalse(verify_multi_proof(block.merkle_tree_root_hash, proof,
+                                                    ["00" * 32] + proof["tx_hashes"][1:]))
+
+    def test_merkle_tree_root_hash_is_same_after_deserialize(self):
+        """ GIVEN block made by put_transaction (incremental merkle builder)
+        WHEN deserialized block calculates merkle tree root hash again from its tx list
+        THEN both merkle tree root hash are same
+        """
+        # GIVEN
+        genesis = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        genesis.generate_block()
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        for x in range(0, 7):
+            block.put_transaction(test_util.create_basic_tx(self.__peer_id, self.__peer_auth))
+        block.generate_block(genesis)
+
+        # WHEN
+        block2 = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        block2.deserialize_block(block.serialize_block())
+        block2.merkle_tree_root_hash = ""
+        block2.generate_block(genesis)
+
+        # THEN
+        self.assertEqual(block.merkle_tree_root_hash, block2.merkle_tree_root_hash)
+        self.assertEqual(block.block_hash, block2.block_hash)
+
     def test_serialize_and_deserialize(self):
         """
         블럭 serialize and deserialize 테스트
@@ -149,6 +252,100 @@ class TestBlock(unittest.TestCase):
         logging.debug("serialize block hash : %s , deserialize block hash %s", block.merkle_tree_root_hash, block2.merkle_tree_root_hash)
         self.assertEqual(block.merkle_tree_root_hash, block2.merkle_tree_root_hash, "블럭이 같지 않습니다 ")
 
+    def test_serialize_binary_format_keeps_all_fields(self):
+        """ GIVEN signed block
+        WHEN serialize and deserialize block with binary format
+        THEN all header fields and transactions are same
+        """
+        # GIVEN
+        block = self.__generate_block()
+        block.next_leader_peer = "next_leader"
+
+        # WHEN
+        dump = block.serialize_block()
+        block2 = Block(channel_name="other_channel")
+        block2.deserialize_block(dump)
+
+        # THEN
+        self.assertTrue(dump.startswith(b'LCB'))
+        self.assertEqual(block.block_hash, block2.block_hash)
+        self.assertEqual(block.prev_block_hash, block2.prev_block_hash)
+        self.assertEqual(block.time_stamp, block2.time_stamp)
+        self.assertEqual(block.height, block2.height)
+        self.assertEqual(block.channel_name, block2.channel_name)
+        self.assertEqual(block.signature, block2.signature)
+        self.assertEqual(block.next_leader_peer, block2.next_leader_peer)
+        self.assertEqual(block.block_type, block2.block_type)
+        self.assertEqual(len(block.confirmed_transaction_list), len(block2.confirmed_transaction_list))
+
+        for tx, tx2 in zip(block.confirmed_transaction_list, block2.confirmed_transaction_list):
+            self.assertEqual(tx.tx_hash, tx2.tx_hash)
+            self.assertEqual(tx.meta, tx2.meta)
+            self.assertEqual(bytes(tx.get_data()), bytes(tx2.get_data()))
+            self.assertEqual(tx.signature, tx2.signature)
+            self.assertEqual(tx.public_key, tx2.public_key)
+            self.assertEqual(tx.tx_hash, tx2.generate_transaction_hash(tx2))
+
+    def test_read_transaction_by_position(self):
+        """ GIVEN serialized block with binary format and pickled block
+        WHEN read a transaction by its position
+        THEN the transaction at the position is read without deserializing the block
+        """
+        # GIVEN
+        block = self.__generate_block()
+        dump = block.serialize_block()
+        legacy_dump = pickle.dumps(block, pickle.DEFAULT_PROTOCOL)
+        tx_count = len(block.confirmed_transaction_list)
+
+        # WHEN THEN
+        for position, tx in enumerate(block.confirmed_transaction_list):
+            self.assertEqual(tx.tx_hash, Block.read_transaction(dump, position).tx_hash)
+        self.assertEqual(block.confirmed_transaction_list[-1].tx_hash,
+                         Block.read_transaction(legacy_dump, tx_count - 1).tx_hash)
+        self.assertIsNone(Block.read_transaction(dump, tx_count))
+
+    def test_deserialize_legacy_pickled_block(self):
+        """ GIVEN block pickled by previous version
+        WHEN deserialize block
+        THEN block is restored by migration reader
+        """
+        block = self.__generate_block()
+        legacy_dump = pickle.dumps(block, pickle.DEFAULT_PROTOCOL)
+
+        block2 = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        block2.deserialize_block(legacy_dump)
+
+        self.assertEqual(block.block_hash, block2.block_hash)
+        self.assertEqual(len(block.confirmed_transaction_list), len(block2.confirmed_transaction_list))
+
+    def test_restore_state_pickled_before_slots(self):
+        """ GIVEN __dict__ state of block and tx pickled before __slots__
+        WHEN restore block and tx from the state
+        THEN attributes are restored into slots
+        """
+        # GIVEN
+        block = self.__generate_block()
+        tx = block.confirmed_transaction_list[0]
+        tx_state = {'_Transaction__' + name: value for name, value in (
+            ('transaction_status', tx.status), ('transaction_type', tx.type), ('meta', tx.meta),
+            ('data', bytearray(tx.get_data())), ('time_stamp', tx.get_timestamp()),
+            ('transaction_hash', tx.tx_hash), ('public_key', tx.public_key), ('signature', tx.signature))}
+        block_state = util.get_slots_state(block)
+        block_state['merkle_tree'] = []
+
+        # WHEN
+        tx2 = Transaction.__new__(Transaction)
+        tx2.__setstate__(tx_state)
+        block2 = Block.__new__(Block)
+        block2.__setstate__(block_state)
+
+        # THEN
+        self.assertEqual(tx.tx_hash, Transaction.generate_transaction_hash(tx2))
+        self.assertIsInstance(tx2.get_data(), bytes)
+        self.assertEqual(block.block_hash, block2.block_hash)
+        self.assertEqual(block.signature, block2.signature)
+        self.assertFalse(hasattr(block2, 'merkle_tree'))
+
 
 class Mock:
     pass
@@ -16,17 +16,27 @@
 # limitations under the License.
 """Test block chain class"""
 
+import json
 import leveldb
 import logging
+import os
 import random
+import shutil
+import tempfile
 import unittest
+from unittest.mock import patch
 
 import loopchain.utils as util
 import testcase.unittest.test_util as test_util
 from loopchain import configure as conf
 from loopchain.blockchain import Block
-from loopchain.blockchain import BlockChain, BlockStatus
+from loopchain.blockchain import BlockChain, BlockStatus, BlockError, BlockCache, SegmentBlockStore, is_block_pointer, \
+    is_compressed_block, compress_block_dump, decompress_block_dump, BlockCompression, BLOCK_COMPRESSED_MAGIC, \
+    BLOCK_COMPRESSED_HEADER, HeaderChain, HEADER_CHAIN_KEYS
+from loopchain.blockchain.tx_index import encode_invoke_result, decode_invoke_result
+from loopchain.blockchain.tx_meta_index import TxMetaIndex
 from loopchain.protos import message_code
+from loopchain.scoreservice import ScoreResponse
 
 util.set_log_level_debug()
 
@@ -41,6 +51,7 @@ class TestBlockChain(unittest.TestCase):
         # BlockChain 을 만듬
         test_db = test_util.make_level_db(self.db_name)
         self.assertIsNotNone(test_db, "DB생성 불가")
+        self.test_db = test_db
         self.chain = BlockChain(test_db)
 
         test_util.print_testname(self._testMethodName)
@@ -135,6 +146,248 @@ class TestBlockChain(unittest.TestCase):
         # THEN
         self.assertEqual(find_block_hash, find_block.block_hash)
 
+    def test_add_blocks_in_one_batch(self):
+        """ GIVEN linked blocks and blocks with a wrong prev block hash
+        WHEN add blocks with group commit
+        THEN linked blocks are written at once and no block of the wrong group is written
+        """
+        # GIVEN
+        blocks = []
+        last_block = self.chain.last_block
+        for x in range(3):
+            n_block = self.generate_test_block()
+            n_block.generate_block(last_block)
+            n_block.block_status = BlockStatus.confirmed
+            blocks.append(n_block)
+            last_block = n_block
+
+        wrong_blocks = []
+        for x in range(2):
+            n_block = self.generate_test_block()
+            n_block.generate_block(blocks[0])
+            n_block.block_status = BlockStatus.confirmed
+            wrong_blocks.append(n_block)
+
+        # WHEN
+        self.chain.add_blocks(blocks)
+
+        # THEN
+        self.assertEqual(blocks[-1].block_hash, self.chain.last_block.block_hash)
+        self.assertEqual(blocks[-1].height, self.chain.block_height)
+        for block in blocks:
+            self.assertEqual(block.block_hash, self.chain.find_block_by_height(block.height).block_hash)
+
+        with self.assertRaises(BlockError):
+            self.chain.add_blocks(wrong_blocks)
+        self.assertEqual(blocks[-1].block_hash, self.chain.last_block.block_hash)
+        self.assertIsNone(self.chain.find_block_by_hash(wrong_blocks[0].block_hash))
+
+    def test_add_blocks_writes_invoked_blocks_on_error(self):
+        """ GIVEN linked blocks and the third block can not be serialized
+        WHEN add blocks with group commit
+        THEN blocks invoked before the broken block are written and the error is raised
+        """
+        # GIVEN
+        blocks = []
+        last_block = self.chain.last_block
+        for x in range(4):
+            n_block = self.generate_test_block()
+            n_block.generate_block(last_block)
+            n_block.block_status = BlockStatus.confirmed
+            blocks.append(n_block)
+            last_block = n_block
+        serialize_block = Block.serialize_block
+
+        def broken_serialize_block(block):
+            if block is blocks[2]:
+                raise IOError("broken block")
+            return serialize_block(block)
+
+        # WHEN
+        with patch.object(Block, 'serialize_block', autospec=True, side_effect=broken_serialize_block):
+            with self.assertRaises(IOError):
+                self.chain.add_blocks(blocks)
+
+        # THEN
+        self.assertEqual(blocks[1].block_hash, self.chain.last_block.block_hash)
+        self.assertEqual(20, self.chain.total_tx)
+        self.assertIsNone(self.chain.find_block_by_hash(blocks[2].block_hash))
+        self.assertIsNone(self.chain.find_tx_by_key(blocks[2].confirmed_transaction_list[0].tx_hash))
+        restored_chain = BlockChain(self.test_db)
+        self.assertEqual((blocks[1].height, 20), (restored_chain.block_height, restored_chain.total_tx))
+
+    def test_restore_chain_meta(self):
+        """ GIVEN blocks added to block chain
+        WHEN open block chain again with or without chain meta
+        THEN total_tx and cumulative tx counts are restored without walking the chain
+        """
+        # GIVEN
+        last_block = self.chain.last_block
+        for x in range(3):
+            n_block = self.generate_test_block()
+            n_block.generate_block(last_block)
+            n_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(n_block)
+            last_block = n_block
+        self.assertEqual(30, self.chain.total_tx)
+
+        # WHEN
+        restored_chain = BlockChain(self.test_db)
+
+        # THEN
+        self.assertEqual(last_block.height, restored_chain.block_height)
+        self.assertEqual(30, restored_chain.total_tx)
+        self.assertEqual([0, 10, 20, 30], [restored_chain.find_total_tx_by_height(height) for height in range(4)])
+        self.assertTrue(restored_chain.verify_chain_meta())
+
+        # WHEN chain meta 가 없는 이전 version 의 db
+        self.test_db.delete(BlockChain.CHAIN_META_KEY)
+        migrated_chain = BlockChain(self.test_db)
+
+        # THEN
+        self.assertEqual(30, migrated_chain.total_tx)
+        self.assertIsNotNone(self.test_db.get(BlockChain.CHAIN_META_KEY))
+
+    def test_block_cache(self):
+        """ GIVEN added blocks and a block cache smaller than two blocks
+        WHEN find blocks by hash and height
+        THEN cached blocks are returned without db read and the oldest block is evicted
+        """
+        # GIVEN
+        blocks = []
+        last_block = self.chain.last_block
+        for x in range(3):
+            n_block = self.generate_test_block()
+            n_block.generate_block(last_block)
+            n_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(n_block)
+            blocks.append(n_block)
+            last_block = n_block
+
+        # WHEN
+        self.assertIs(blocks[1], self.chain.find_block_by_hash(blocks[1].block_hash))
+        self.assertIs(blocks[2], self.chain.find_block_by_height(blocks[2].height))
+
+        # THEN
+        self.assertEqual(2, self.chain.block_cache.get_status()['hits'])
+
+        # GIVEN
+        block_size = len(blocks[0].serialize_block())
+        block_cache = BlockCache(capacity_bytes=block_size * 2 - 1)
+
+        # WHEN
+        block_cache.put(blocks[0], block_size)
+        block_cache.put(blocks[1], block_size)
+
+        # THEN
+        self.assertIsNone(block_cache.get_by_height(blocks[0].height))
+        self.assertIs(blocks[1], block_cache.get_by_height(blocks[1].height))
+        status = block_cache.get_status()
+        self.assertEqual(1, status['evictions'])
+        self.assertEqual(block_size, status['size_bytes'])
+        self.assertEqual(0.5, status['hit_rate'])
+
+    def test_iter_blocks(self):
+        """ GIVEN added blocks
+        WHEN iterate blocks and block headers of height range
+        THEN blocks in [start, end) are returned in height order
+        """
+        # GIVEN
+        blocks = [self.chain.last_block]
+        for x in range(4):
+            n_block = self.generate_test_block()
+            n_block.generate_block(blocks[-1])
+            n_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(n_block)
+            blocks.append(n_block)
+        self.chain.block_cache.clear()
+
+        # WHEN
+        iter_blocks = list(self.chain.iter_blocks(1, 4))
+        iter_headers = list(self.chain.iter_blocks(2, headers_only=True))
+
+        # THEN
+        self.assertEqual([block.block_hash for block in blocks[1:4]], [block.block_hash for block in iter_blocks])
+        self.assertEqual([block.get_header() for block in blocks[2:]], iter_headers)
+        self.assertEqual(0, self.chain.block_cache.get_status()['size'])
+        self.assertEqual([], list(self.chain.iter_blocks(3, 3)))
+        self.assertEqual([blocks[0].block_hash], [header['block_hash'] for header in
+                                                  self.chain.iter_blocks(0, 1, headers_only=True)])
+
+    def test_header_chain(self):
+        """ GIVEN block chain without header chain and a broken header file
+        WHEN open block chain with header chain, add blocks and open it again
+        THEN missing headers are filled from block db and headers are found by height without block db
+        """
+        # GIVEN
+        header_path = os.path.join(tempfile.mkdtemp(prefix="header_chain_"), "headers.dat")
+        self.addCleanup(shutil.rmtree, os.path.dirname(header_path))
+        blocks = [self.chain.last_block]
+
+        def add_blocks(chain, count):
+            for x in range(count):
+                n_block = self.generate_test_block()
+                n_block.generate_block(blocks[-1])
+                n_block.block_status = BlockStatus.confirmed
+                chain.add_block(n_block)
+                blocks.append(n_block)
+
+        add_blocks(self.chain, 2)
+
+        # WHEN
+        chain = BlockChain(self.test_db, header_chain=HeaderChain(header_path))
+        filled_height = HeaderChain(header_path).height
+        add_blocks(chain, 2)
+        with open(header_path, 'ab') as header_file:
+            header_file.write(b"broken")
+        header_chain = HeaderChain(header_path)
+        restored_chain = BlockChain(self.test_db, header_chain=header_chain)
+
+        # THEN
+        self.assertEqual(2, filled_height)
+        self.assertEqual(4, header_chain.height)
+        for block in blocks:
+            header = {key: block.get_header()[key] for key in HEADER_CHAIN_KEYS}
+            self.assertEqual(header, restored_chain.find_header_by_height(block.height))
+            self.assertEqual(header, self.chain.find_header_by_height(block.height))
+            self.assertEqual(header, restored_chain.find_header_by_hash(block.block_hash))
+            self.assertEqual(block.block_hash, restored_chain.find_block_hash_by_height(block.height))
+            self.assertEqual(block.block_hash, restored_chain.find_block_by_height(block.height).block_hash)
+        self.assertEqual("", header_chain.get_header(0)['prev_block_hash'])
+        self.assertIsNone(restored_chain.find_header_by_height(5))
+        self.assertIsNone(self.chain.find_block_hash_by_height(5))
+        self.assertIsNone(restored_chain.find_header_by_hash("no_block_hash"))
+
+    def test_find_block_by_time(self):
+        """ GIVEN blocks made at known time stamps in block chains with and without header chain
+        WHEN find block by time stamp
+        THEN the last block made at or before the time stamp is found by binary search
+        """
+        # GIVEN
+        header_path = os.path.join(tempfile.mkdtemp(prefix="header_chain_"), "headers.dat")
+        self.addCleanup(shutil.rmtree, os.path.dirname(header_path))
+        blocks = [self.chain.last_block]
+        for x in range(1, 6):
+            n_block = self.generate_test_block()
+            n_block.prev_block_hash = blocks[-1].block_hash
+            n_block.height = blocks[-1].height + 1
+            n_block.time_stamp = x * 1000
+            n_block.generate_block(blocks[-1])
+            n_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(n_block)
+            blocks.append(n_block)
+        header_chain_chain = BlockChain(self.test_db, header_chain=HeaderChain(header_path))
+
+        for chain in (self.chain, header_chain_chain):
+            # WHEN
+            heights = [chain.find_block_height_by_time(time_stamp) for time_stamp in (0, 999, 1000, 3500, 5000, 9999)]
+
+            # THEN
+            self.assertEqual([0, 0, 1, 3, 5, 5], heights)
+            self.assertEqual(blocks[2].block_hash, chain.find_header_by_time(2999)['block_hash'])
+            self.assertEqual(blocks[4].block_hash, chain.find_block_by_time(4000).block_hash)
+            self.assertIsNone(chain.find_header_by_time(-1))
+
     def test_add_and_find_tx(self):
         """block db 에 block_hash - block_object 를 저장할때, tx_hash - tx_object 도 저장한다.
         get tx by tx_hash 시 해당 block 을 효율적으로 찾기 위해서
@@ -172,6 +425,222 @@ class TestBlockChain(unittest.TestCase):
                         "Fail Add Block to BlockChain")
         return tx
 
+    def test_compressed_block(self):
+        """ GIVEN block compression is on
+        WHEN add blocks and read them
+        THEN blocks are stored compressed and read as same blocks, and BlockSync dump is the stored bytes
+        """
+        compression = conf.BLOCK_COMPRESSION
+        try:
+            for block_compression in ('zlib', 'lzma'):
+                # GIVEN
+                conf.BLOCK_COMPRESSION = block_compression
+                blocks = []
+                last_block = self.chain.last_block
+                for x in range(2):
+                    n_block = self.generate_test_block()
+                    n_block.generate_block(last_block)
+                    n_block.block_status = BlockStatus.confirmed
+                    self.chain.add_block(n_block)
+                    blocks.append(n_block)
+                    last_block = n_block
+                self.chain.block_cache.clear()
+
+                # WHEN
+                block_hash_key = blocks[0].block_hash.encode(encoding='UTF-8')
+                stored_dump = self.test_db.get(block_hash_key)
+                block_dump = self.chain.find_block_dump_by_hash(blocks[0].block_hash)
+
+                # THEN
+                self.assertTrue(is_compressed_block(stored_dump))
+                self.assertLess(len(stored_dump), len(blocks[0].serialize_block()))
+                self.assertEqual(bytes(stored_dump), block_dump)
+                self.assertEqual(blocks[0].serialize_block(), decompress_block_dump(block_dump))
+                self.assertEqual(blocks[0].get_header(), Block.read_header(block_dump))
+                self.assertEqual(blocks[1].block_hash, self.chain.find_block_by_height(blocks[1].height).block_hash)
+                tx = blocks[1].confirmed_transaction_list[3]
+                self.assertEqual(tx.tx_hash, self.chain.find_tx_by_key(tx.tx_hash).tx_hash)
+        finally:
+            conf.BLOCK_COMPRESSION = compression
+
+    def test_decompress_block_bomb(self):
+        """ GIVEN compressed dumps whose raw length in the header is smaller than the data or over the limit
+        WHEN decompress the dumps
+        THEN BlockError is raised without inflating the whole data
+        """
+        # GIVEN
+        block_dump = self.generate_test_block().serialize_block()
+        header_length = len(BLOCK_COMPRESSED_MAGIC) + BLOCK_COMPRESSED_HEADER.size
+        bombs = []
+        for block_compression in (BlockCompression.zlib, BlockCompression.lzma):
+            compressed = compress_block_dump(bytes(10 * 1024 * 1024), block_compression)
+            bombs.append(BLOCK_COMPRESSED_MAGIC + BLOCK_COMPRESSED_HEADER.pack(block_compression, 1024) +
+                         compressed[header_length:])
+            bombs.append(BLOCK_COMPRESSED_MAGIC +
+                         BLOCK_COMPRESSED_HEADER.pack(block_compression, conf.MAX_DECOMPRESSED_BLOCK_BYTES + 1) +
+                         compressed[header_length:])
+        compressed = compress_block_dump(block_dump, 'zlib')
+
+        # WHEN THEN
+        for bomb in bombs:
+            with self.assertRaises(BlockError):
+                decompress_block_dump(bomb)
+        self.assertEqual(block_dump, decompress_block_dump(compressed))
+        with self.assertRaises(BlockError):
+            decompress_block_dump(compressed + b"trailing")
+
+    def test_tx_meta_index(self):
+        """ GIVEN a block added before tx meta index is enabled and a block added after it
+        WHEN find txs by peer_id and time range page by page, and backfill the index
+        THEN txs are found in timestamp order, blocks before the index are found only after backfill
+        """
+        tx_meta_indexes = conf.TX_META_INDEXES
+        try:
+            # GIVEN
+            old_block = self.generate_test_block()
+            old_block.generate_block(self.chain.last_block)
+            old_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(old_block)
+
+            conf.TX_META_INDEXES = ['peer_id', 'time']
+            self.chain = BlockChain(self.test_db)
+            new_block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            for peer_id in ['aaa', 'bbb'] * 5:
+                new_block.put_transaction(test_util.create_basic_tx(peer_id, self.__peer_auth))
+            new_block.generate_block(old_block)
+            new_block.block_status = BlockStatus.confirmed
+            self.chain.add_block(new_block)
+
+            # WHEN
+            indexed_from_height = self.chain.get_tx_meta_index_height(TxMetaIndex.peer_id)
+            new_txs, _ = self.chain.find_txs_by_meta(TxMetaIndex.peer_id, 'aaa')
+            self.chain.backfill_tx_meta_index()
+            pages = []
+            cursor = None
+            while True:
+                entries, cursor = self.chain.find_txs_by_meta(TxMetaIndex.peer_id, 'aaa', cursor=cursor, limit=4)
+                pages.append(entries)
+                if cursor is None:
+                    break
+            time_from = new_block.confirmed_transaction_list[2].get_timestamp()
+            time_to = new_block.confirmed_transaction_list[6].get_timestamp()
+            time_txs, _ = self.chain.find_txs_by_meta(TxMetaIndex.time, time_from=time_from, time_to=time_to)
+
+            # THEN
+            self.assertEqual(new_block.height, indexed_from_height)
+            self.assertEqual([tx.tx_hash for tx in new_block.confirmed_transaction_list[::2]],
+                             [entry.tx_hash for entry in new_txs])
+            self.assertEqual([4, 4, 4, 3], [len(entries) for entries in pages])
+            all_txs = [entry for entries in pages for entry in entries]
+            self.assertEqual([tx.tx_hash for tx in old_block.confirmed_transaction_list] +
+                             [tx.tx_hash for tx in new_block.confirmed_transaction_list[::2]],
+                             [entry.tx_hash for entry in all_txs])
+            self.assertEqual((new_block.height, 4), (all_txs[12].block_height, all_txs[12].tx_position))
+            self.assertEqual([tx.tx_hash for tx in new_block.confirmed_transaction_list
+                              if time_from <= tx.get_timestamp() < time_to],
+                             [entry.tx_hash for entry in time_txs])
+            self.assertEqual(0, BlockChain(self.test_db).get_tx_meta_index_height(TxMetaIndex.peer_id))
+            self.assertIsNone(self.chain.get_tx_meta_index_height(TxMetaIndex.score_id))
+        finally:
+            conf.TX_META_INDEXES = tx_meta_indexes
+
+    def test_segment_block_store(self):
+        """ GIVEN block chain which has genesis block in level db and writes new block bodies to small segments
+        WHEN add blocks and open the block chain again
+        THEN block db has only segment pointers and blocks and txs are read from segments
+        """
+        # GIVEN
+        segment_path = tempfile.mkdtemp(prefix="segment_block_store_")
+        self.addCleanup(shutil.rmtree, segment_path)
+        test_db = self.test_db
+        chain = BlockChain(test_db, block_store=SegmentBlockStore(segment_path, segment_size=1024, fsync=False))
+
+        # WHEN
+        blocks = []
+        last_block = chain.last_block
+        for x in range(3):
+            n_block = self.generate_test_block()
+            n_block.generate_block(last_block)
+            n_block.block_status = BlockStatus.confirmed
+            chain.add_block(n_block)
+            blocks.append(n_block)
+            last_block = n_block
+        restored_chain = BlockChain(test_db, block_store=SegmentBlockStore(segment_path, read_only=True))
+
+        # THEN
+        self.assertEqual(last_block.block_hash, restored_chain.last_block.block_hash)
+        for block in blocks:
+            self.assertTrue(is_block_pointer(test_db.get(block.block_hash.encode(encoding='UTF-8'))))
+            self.assertEqual(block.block_hash, restored_chain.find_block_by_height(block.height).block_hash)
+        tx = blocks[1].confirmed_transaction_list[5]
+        restored_chain.block_cache.clear()
+        self.assertEqual(tx.tx_hash, restored_chain.find_tx_by_key(tx.tx_hash).tx_hash)
+        self.assertEqual(0, restored_chain.find_block_by_height(0).height)
+        self.assertGreater(len(os.listdir(segment_path)), 1)
+
+    def test_find_invoke_results(self):
+        """ GIVEN a tx added to block chain and an unknown tx hash
+        WHEN find invoke results of both at once
+        THEN the added tx has success result and the unknown tx is not invoked
+        """
+        # GIVEN
+        tx = self.__add_single_tx_block_blockchain_return_tx()
+
+        # WHEN
+        invoke_results = self.chain.find_invoke_results([tx.tx_hash, "unknown_tx_hash"])
+
+        # THEN
+        self.assertEqual(message_code.Response.success, invoke_results[tx.tx_hash]['code'])
+        self.assertEqual(ScoreResponse.NOT_INVOKED, invoke_results["unknown_tx_hash"]['code'])
+
+    def test_compact_invoke_result(self):
+        """ GIVEN invoke results of each payload type
+        WHEN encode and decode invoke result
+        THEN decoded result is same and smaller than json
+        """
+        for invoke_result in ({'code': 0},
+                              {'code': ScoreResponse.SCORE_CONTAINER_EXCEPTION, 'message': 'connection fail'},
+                              {'code': 9, 'message': 'fail', 'detail': [1, 2]},
+                              {'code': 'not int', 'message': 'fail'}):
+            encoded = encode_invoke_result(invoke_result)
+            self.assertEqual(invoke_result, decode_invoke_result(encoded))
+        self.assertLess(len(encode_invoke_result({'code': 9, 'message': 'fail'})),
+                        len(json.dumps({'code': 9, 'message': 'fail'})))
+
+    def test_migrate_legacy_tx_index(self):
+        """ GIVEN tx index entries written as json by the previous version
+        WHEN find tx and invoke result, and migrate tx index
+        THEN legacy entries are readable and converted to positional entries with the same result
+        """
+        # GIVEN
+        block = self.generate_test_block()
+        block.generate_block(self.chain.last_block)
+        block.block_status = BlockStatus.confirmed
+        self.chain.add_block(block)
+        fail_result = {'code': 9, 'message': 'fail'}
+        for index, tx in enumerate(block.confirmed_transaction_list):
+            tx_info = {'block_hash': block.block_hash,
+                       'result': fail_result if index == 0 else {'code': message_code.Response.success}}
+            self.test_db.put(tx.tx_hash.encode(encoding=conf.HASH_KEY_ENCODING),
+                             json.dumps(tx_info).encode(encoding=conf.PEER_DATA_ENCODING))
+        legacy_tx = block.confirmed_transaction_list[3]
+
+        # WHEN THEN
+        self.assertEqual(legacy_tx.tx_hash, self.chain.find_tx_by_key(legacy_tx.tx_hash).tx_hash)
+        self.assertEqual(len(block.confirmed_transaction_list), self.chain.migrate_tx_index())
+        self.assertEqual(0, self.chain.migrate_tx_index())
+
+        # THEN
+        self.chain.block_cache.clear()
+        for index, tx in enumerate(block.confirmed_transaction_list):
+            tx_index = self.test_db.get(tx.tx_hash.encode(encoding=conf.HASH_KEY_ENCODING))
+            self.assertNotEqual(b'{', bytes(tx_index[:1]))
+            self.assertEqual(tx.tx_hash, self.chain.find_tx_by_key(tx.tx_hash).tx_hash)
+        first_tx_hash = block.confirmed_transaction_list[0].tx_hash
+        self.assertEqual(fail_result, self.chain.find_invoke_result_by_tx_hash(first_tx_hash))
+        self.assertEqual(message_code.Response.success,
+                         self.chain.find_invoke_result_by_tx_hash(legacy_tx.tx_hash)['code'])
+
     def test_unicode_decode_error(self):
         """ Transaction hash 는 UTF-8 인코딩이나 block hash 값은 sha256 hex byte array 이므로 인코딩 에러가 발생함
         """
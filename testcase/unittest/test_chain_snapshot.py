@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Test chain snapshot export and import"""
+
+import os
+import io
+import shutil
+import tarfile
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import loopchain.utils as util
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, BlockStatus, ChainSnapshot, SnapshotError
+from loopchain.store import LevelDBStore
+
+util.set_log_level_debug()
+
+
+class TestChainSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        test_util.print_testname(self._testMethodName)
+        self.work_path = tempfile.mkdtemp(prefix="test_chain_snapshot_")
+        self.db = LevelDBStore(os.path.join(self.work_path, "source_db"), create_if_missing=True)
+        self.chain = BlockChain(self.db)
+        self.score_path = os.path.join(self.work_path, "score")
+        os.makedirs(os.path.join(self.score_path, "score_id"))
+        with open(os.path.join(self.score_path, "score_id", "state"), "w") as state_file:
+            state_file.write("score state")
+
+        peer_auth = test_util.create_peer_auth()
+        self.blocks = []
+        last_block = self.chain.last_block
+        for x in range(3):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            for y in range(5):
+                block.put_transaction(test_util.create_basic_tx("aaa", peer_auth))
+            block.generate_block(last_block)
+            block.block_status = BlockStatus.confirmed
+            self.chain.add_block(block)
+            self.blocks.append(block)
+            last_block = block
+
+        self.snapshot_path = os.path.join(self.work_path, "snapshot")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def __new_db(self):
+        return LevelDBStore(os.path.join(self.work_path, "target_db"), create_if_missing=True)
+
+    def test_export_and_import_at_last_block(self):
+        """ GIVEN block chain and score state
+        WHEN export snapshot and import it to new block db and score path
+        THEN new block chain starts at the snapshot height with blocks, txs and score state
+        """
+        # GIVEN
+        last_block = self.blocks[-1]
+        ChainSnapshot.export(self.chain, self.snapshot_path, score_path=self.score_path)
+
+        # WHEN
+        target_db = self.__new_db()
+        target_score_path = os.path.join(self.work_path, "target_score")
+        header = ChainSnapshot.import_(self.snapshot_path, target_db, last_block.block_hash, target_score_path)
+        target_chain = BlockChain(target_db)
+
+        # THEN
+        self.assertEqual(last_block.height, header['block_height'])
+        self.assertEqual(last_block.block_hash, target_chain.last_block.block_hash)
+        self.assertEqual(15, target_chain.total_tx)
+        tx = self.blocks[0].confirmed_transaction_list[2]
+        self.assertEqual(tx.tx_hash, target_chain.find_tx_by_key(tx.tx_hash).tx_hash)
+        with open(os.path.join(target_score_path, "score_id", "state")) as state_file:
+            self.assertEqual("score state", state_file.read())
+
+    def test_export_at_lower_height(self):
+        """ GIVEN block chain
+        WHEN export snapshot at lower height than last block and import it
+        THEN new block chain has no block or tx above the snapshot height
+        """
+        # GIVEN
+        snapshot_block = self.blocks[0]
+
+        # WHEN
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.export(self.chain, self.snapshot_path, snapshot_block.height, self.score_path)
+        ChainSnapshot.export(self.chain, self.snapshot_path, snapshot_block.height)
+        target_db = self.__new_db()
+        ChainSnapshot.import_(self.snapshot_path, target_db, snapshot_block.block_hash)
+        target_chain = BlockChain(target_db)
+
+        # THEN
+        self.assertEqual(snapshot_block.block_hash, target_chain.last_block.block_hash)
+        self.assertEqual(5, target_chain.total_tx)
+        self.assertIsNone(target_chain.find_tx_by_key(self.blocks[2].confirmed_transaction_list[0].tx_hash))
+        self.assertIsNone(target_chain.find_block_by_hash(self.blocks[2].block_hash))
+
+    def test_verify_broken_snapshot(self):
+        """ GIVEN snapshot
+        WHEN the snapshot is modified or expected block hash is different
+        THEN verify raises SnapshotError
+        """
+        # GIVEN
+        ChainSnapshot.export(self.chain, self.snapshot_path)
+        ChainSnapshot.verify(self.snapshot_path, self.blocks[-1].block_hash)
+
+        # WHEN THEN
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.verify(self.snapshot_path, self.blocks[0].block_hash)
+
+        with open(self.snapshot_path, 'r+b') as snapshot_file:
+            snapshot_file.seek(os.path.getsize(self.snapshot_path) // 2)
+            data = snapshot_file.read(1)
+            snapshot_file.seek(-1, os.SEEK_CUR)
+            snapshot_file.write(bytes([data[0] ^ 0xff]))
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.verify(self.snapshot_path, self.blocks[-1].block_hash)
+
+    def test_verify_tampered_lower_block(self):
+        """ GIVEN snapshot whose block below the snapshot height was modified before export
+        WHEN verify the snapshot
+        THEN verify raises SnapshotError although the snapshot height block is valid
+        """
+        # GIVEN
+        block_hash_key = self.blocks[0].block_hash.encode(encoding='UTF-8')
+        tampered_block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        tampered_block.deserialize_block(self.db.get(block_hash_key))
+        tampered_block.confirmed_transaction_list.pop()
+        tampered_block.reset_transactions()
+        self.db.put(block_hash_key, tampered_block.serialize_block())
+        ChainSnapshot.export(self.chain, self.snapshot_path)
+
+        # WHEN THEN
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.verify(self.snapshot_path, self.blocks[-1].block_hash)
+
+    def test_import_rolls_back_invalid_snapshot(self):
+        """ GIVEN snapshot whose last block is not the expected block
+        WHEN import the snapshot
+        THEN import raises SnapshotError and leaves block db and score path empty
+        """
+        # GIVEN
+        ChainSnapshot.export(self.chain, self.snapshot_path, score_path=self.score_path)
+        target_db = self.__new_db()
+        target_score_path = os.path.join(self.work_path, "target_score")
+
+        # WHEN THEN
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.import_(self.snapshot_path, target_db, self.blocks[0].block_hash, target_score_path)
+        self.assertEqual([], list(target_db.range_iter(include_value=False)))
+
+        with open(self.snapshot_path, 'r+b') as snapshot_file:
+            snapshot_file.seek(-1, os.SEEK_END)
+            data = snapshot_file.read(1)
+            snapshot_file.seek(-1, os.SEEK_END)
+            snapshot_file.write(bytes([data[0] ^ 0xff]))
+        with self.assertRaises(SnapshotError):
+            ChainSnapshot.import_(self.snapshot_path, target_db, self.blocks[-1].block_hash, target_score_path)
+        self.assertEqual([], list(target_db.range_iter(include_value=False)))
+        self.assertFalse(os.path.exists(target_score_path))
+
+    def test_import_unsafe_score_archive(self):
+        """ GIVEN snapshots whose score archive has a fifo or a path outside of score path
+        WHEN import the snapshots
+        THEN import raises SnapshotError and nothing is extracted
+        """
+        # GIVEN
+        os.mkfifo(os.path.join(self.score_path, "score_id", "fifo"))
+        fifo_snapshot_path = self.snapshot_path + "_fifo"
+        ChainSnapshot.export(self.chain, fifo_snapshot_path, score_path=self.score_path)
+
+        target_score_path = os.path.join(self.work_path, "target_score")
+        add = tarfile.TarFile.add
+
+        def add_outside_member(archive, name, arcname=None, *args, **kwargs):
+            add(archive, name, arcname, *args, **kwargs)
+            if arcname != '.':
+                return
+            data = b"evil"
+            member = tarfile.TarInfo(f"../{os.path.basename(target_score_path)}_evil/x")
+            member.size = len(data)
+            archive.addfile(member, io.BytesIO(data))
+
+        os.remove(os.path.join(self.score_path, "score_id", "fifo"))
+        with patch.object(tarfile.TarFile, 'add', add_outside_member):
+            ChainSnapshot.export(self.chain, self.snapshot_path, score_path=self.score_path)
+
+        # WHEN THEN
+        for snapshot_path, db_name in ((fifo_snapshot_path, "fifo_db"), (self.snapshot_path, "outside_db")):
+            target_db = LevelDBStore(os.path.join(self.work_path, db_name), create_if_missing=True)
+            with self.assertRaises(SnapshotError):
+                ChainSnapshot.import_(snapshot_path, target_db, self.blocks[-1].block_hash, target_score_path)
+            self.assertFalse(os.path.exists(target_score_path))
+            self.assertEqual([], list(target_db.range_iter(include_value=False)))
+        self.assertFalse(os.path.exists(target_score_path + "_evil"))
+
+
+if __name__ == '__main__':
+    unittest.main()
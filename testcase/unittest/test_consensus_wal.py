@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Test consensus write-ahead log"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import loopchain.utils as util
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.baseservice import ObjectManager
+from loopchain.blockchain import Block, BlockChain, ConsensusWAL
+from loopchain.peer import CandidateBlocks
+from loopchain.store import LevelDBStore
+
+util.set_log_level_debug()
+
+
+class TestConsensusWAL(unittest.TestCase):
+
+    def setUp(self):
+        test_util.print_testname(self._testMethodName)
+        self.work_path = tempfile.mkdtemp(prefix="test_consensus_wal_")
+        self.wal_path = os.path.join(self.work_path, "wal")
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def __segments(self):
+        return sorted(os.listdir(self.wal_path))
+
+    def test_replay_after_restart(self):
+        """ GIVEN candidate blocks, votes and leader change written to wal
+        WHEN open wal again
+        THEN candidate blocks and votes after the last commit and the last leader are replayed
+        """
+        # GIVEN
+        wal = ConsensusWAL(self.wal_path)
+        wal.write_candidate_block("hash_1", 1, b"block_1")
+        wal.write_vote("hash_1", "peer_a", "group", True)
+        wal.write_commit("hash_1", 1)
+        wal.write_leader_change("peer_b", 1)
+        wal.write_candidate_block("hash_2", 2, b"block_2")
+        wal.write_vote("hash_2", "peer_a", "group", True)
+        wal.write_vote("hash_2", "peer_c", "group", False)
+        wal.close()
+
+        # WHEN
+        state = ConsensusWAL(self.wal_path).state
+
+        # THEN
+        self.assertEqual(("hash_1", 1), (state.committed_block_hash, state.committed_block_height))
+        self.assertEqual({"hash_2": (2, b"block_2")}, dict(state.candidate_blocks))
+        self.assertEqual({"hash_2": {"peer_a": ("group", True), "peer_c": ("group", False)}}, state.votes)
+        self.assertEqual("peer_b", state.leader_id)
+        self.assertEqual(("hash_2", b"block_2"), state.get_last_candidate_block(2))
+        self.assertIsNone(state.get_last_candidate_block(3))
+
+    def test_sync_own_vote(self):
+        """ GIVEN wal which batches vote records
+        WHEN write votes of other peers and own vote
+        THEN only own vote is fsynced at once and other votes are fsynced by sync
+        """
+        # GIVEN
+        wal = ConsensusWAL(self.wal_path, sync_records=100, sync_interval=60)
+
+        # WHEN THEN
+        with patch('loopchain.blockchain.consensus_wal.os.fsync') as fsync:
+            wal.write_vote("hash_1", "peer_a", "group", True)
+            self.assertEqual(0, fsync.call_count)
+            wal.write_vote("hash_1", "peer_b", "group", True, sync=True)
+            self.assertEqual(1, fsync.call_count)
+            wal.write_vote("hash_1", "peer_c", "group", True)
+            wal.sync()
+            self.assertEqual(2, fsync.call_count)
+            wal.sync()
+            self.assertEqual(2, fsync.call_count)
+        wal.close()
+
+    def test_replay_broken_tail(self):
+        """ GIVEN wal whose last record is cut while writing
+        WHEN open wal again and write more records
+        THEN the broken tail is truncated and records before and after it are replayed
+        """
+        # GIVEN
+        wal = ConsensusWAL(self.wal_path)
+        wal.write_candidate_block("hash_1", 1, b"block_1")
+        wal.close()
+        segment_path = os.path.join(self.wal_path, self.__segments()[-1])
+        segment_size = os.path.getsize(segment_path)
+        with open(segment_path, 'ab') as segment_file:
+            segment_file.write(b"\x00\x00\x01\x00broken")
+
+        # WHEN
+        wal = ConsensusWAL(self.wal_path)
+        wal.write_vote("hash_1", "peer_a", "group", True)
+        wal.close()
+        state = ConsensusWAL(self.wal_path).state
+
+        # THEN
+        self.assertLess(segment_size, os.path.getsize(segment_path))
+        self.assertEqual({"hash_1": (1, b"block_1")}, dict(state.candidate_blocks))
+        self.assertEqual({"hash_1": {"peer_a": ("group", True)}}, state.votes)
+
+    def test_truncate_after_commit(self):
+        """ GIVEN wal segment larger than segment size
+        WHEN commit block
+        THEN old segments are removed and only records needed after the commit remain
+        """
+        # GIVEN
+        wal = ConsensusWAL(self.wal_path, segment_size=1024)
+        wal.write_leader_change("peer_a", 0)
+        for height in range(1, 4):
+            wal.write_candidate_block(f"hash_{height}", height, b"x" * 512)
+            wal.write_vote(f"hash_{height}", "peer_b", "group", True)
+
+        # WHEN
+        wal.write_commit("hash_2", 2)
+        wal.close()
+
+        # THEN
+        self.assertEqual(["wal_000001.log"], self.__segments())
+        self.assertLess(os.path.getsize(os.path.join(self.wal_path, "wal_000001.log")), 1024)
+        state = ConsensusWAL(self.wal_path).state
+        self.assertEqual(["hash_3"], list(state.candidate_blocks))
+        self.assertEqual({"hash_3": {"peer_b": ("group", True)}}, state.votes)
+        self.assertEqual(("peer_a", 2), (state.leader_id, state.committed_block_height))
+
+    def test_block_chain_restores_unconfirmed_block(self):
+        """ GIVEN block chain with consensus wal and a validated unconfirmed block
+        WHEN restart block chain and confirm the block
+        THEN the unconfirmed block is restored from wal without writing it to block db
+        """
+        # GIVEN
+        db = LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True)
+        chain = BlockChain(db, consensus_wal=ConsensusWAL(self.wal_path))
+        peer_auth = test_util.create_peer_auth()
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        for x in range(5):
+            block.put_transaction(test_util.create_basic_tx("aaa", peer_auth))
+        block.generate_block(chain.last_block)
+        self.assertEqual((True, "No reason"), chain.add_unconfirm_block(block))
+
+        # WHEN
+        restarted_chain = BlockChain(db, consensus_wal=ConsensusWAL(self.wal_path))
+        tx_count = restarted_chain.confirm_block(block.block_hash)
+
+        # THEN
+        with self.assertRaises(KeyError):
+            db.get(BlockChain.UNCONFIRM_BLOCK_KEY)
+        self.assertEqual(5, tx_count)
+        self.assertEqual(block.block_hash, restarted_chain.last_block.block_hash)
+        self.assertIsNone(restarted_chain.unconfirmed_block)
+        self.assertIsNone(BlockChain(db, consensus_wal=ConsensusWAL(self.wal_path)).unconfirmed_block)
+
+
+    def test_candidate_blocks_restore_votes(self):
+        """ GIVEN leader's candidate block with a vote and other leader's candidate block written to wal
+        WHEN restart wal and restore candidate blocks
+        THEN only the leader's block is restored with its votes and it can be confirmed
+        """
+        # GIVEN
+        peer_service_mock = Mock()
+        peer_service_mock.peer_id = "leader"
+        peer_service_mock.group_id = "group_leader"
+        peer_service_mock.channel_manager.get_peer_manager.return_value = {
+            peer_id: SimpleNamespace(group_id=f"group_{peer_id}") for peer_id in ("leader", "peer_a", "peer_b")}
+        ObjectManager().peer_service = peer_service_mock
+        self.addCleanup(setattr, ObjectManager(), 'peer_service', None)
+
+        db = LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True)
+        chain = BlockChain(db)
+        peer_auth = test_util.create_peer_auth()
+        blocks = []
+        for peer_id in ("other_leader", "leader"):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            block.put_transaction(test_util.create_basic_tx(peer_id, peer_auth))
+            block.generate_block(chain.last_block)
+            block.peer_id = peer_id
+            blocks.append(block)
+
+        wal = ConsensusWAL(self.wal_path)
+        wal.write_candidate_block(blocks[0].block_hash, blocks[0].height, blocks[0].serialize_block())
+        CandidateBlocks("leader", conf.LOOPCHAIN_DEFAULT_CHANNEL, wal).add_unconfirmed_block(blocks[1])
+        wal.write_vote(blocks[1].block_hash, "peer_a", "group_peer_a", True)
+        wal.close()
+
+        # WHEN
+        restarted_wal = ConsensusWAL(self.wal_path)
+        candidate_blocks = CandidateBlocks("leader", conf.LOOPCHAIN_DEFAULT_CHANNEL, restarted_wal)
+        restored_count = candidate_blocks.restore(restarted_wal.state, chain.last_block)
+
+        # THEN
+        self.assertEqual(1, restored_count)
+        self.assertEqual(blocks[1].block_hash, candidate_blocks.get_last_block().block_hash)
+        self.assertEqual(blocks[1].block_hash, candidate_blocks.get_confirmed_block().block_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
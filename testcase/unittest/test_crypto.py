@@ -31,6 +31,8 @@ from cryptography.x509.oid import NameOID
 
 import loopchain.utils as util
 import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.tools import PublicVerifierContainer
 
 util.set_log_level_debug()
 
@@ -187,6 +189,40 @@ class TestCrypto(unittest.TestCase):
         pfx_b64 = base64.b64encode(pfx, altchars=None)
         logging.debug("%s", pfx_b64)
 
+    def test_public_verifier_container_is_bounded_lru(self):
+        """ GIVEN public verifier container smaller than client keys
+        WHEN get verifiers of many client keys
+        THEN least recently used verifiers are evicted and hits, misses, evictions are counted
+        """
+        # GIVEN
+        cache_size = conf.PUBLIC_VERIFIER_CACHE_SIZE
+        conf.PUBLIC_VERIFIER_CACHE_SIZE = 3
+        PublicVerifierContainer.clear()
+        public_ders = [ec.generate_private_key(ec.SECP256K1(), default_backend()).public_key().public_bytes(
+            encoding=serialization.Encoding.DER,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo) for _ in range(4)]
+
+        try:
+            # WHEN
+            first_verifier = PublicVerifierContainer.get_public_verifier(public_ders[0])
+            for public_der in public_ders[1:3]:
+                PublicVerifierContainer.get_public_verifier(public_der)
+            self.assertIs(first_verifier, PublicVerifierContainer.get_public_verifier(public_ders[0]))
+            PublicVerifierContainer.get_public_verifier(public_ders[3])
+
+            # THEN public_ders[1] is least recently used
+            status = PublicVerifierContainer.get_status()
+            self.assertEqual(3, status["size"])
+            self.assertEqual(1, status["hits"])
+            self.assertEqual(4, status["misses"])
+            self.assertEqual(1, status["evictions"])
+            self.assertIs(first_verifier, PublicVerifierContainer.get_public_verifier(public_ders[0]))
+            PublicVerifierContainer.get_public_verifier(public_ders[1])
+            self.assertEqual(5, PublicVerifierContainer.get_status()["misses"])
+        finally:
+            conf.PUBLIC_VERIFIER_CACHE_SIZE = cache_size
+            PublicVerifierContainer.clear()
+
     def _generate_cert(self, pub_key, issuer_key, subject_name):
         """
         서명용 인증서 생성
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Conformance test of key value store engines"""
+
+import shutil
+import tempfile
+import unittest
+
+import loopchain.utils as util
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, BlockStatus
+from loopchain.store import KeyValueStoreEngine, KeyValueStoreError, create_key_value_store, \
+    destroy_key_value_store
+
+util.set_log_level_debug()
+
+
+class KeyValueStoreConformance:
+    """모든 engine 이 같은 동작을 하는지 확인한다. engine 마다 unittest.TestCase 와 같이 상속한다."""
+    engine = None
+
+    def setUp(self):
+        test_util.print_testname(self._testMethodName)
+        self.path = tempfile.mkdtemp(prefix="test_key_value_store_")
+        self.store = create_key_value_store(self.path, engine=self.engine)
+
+    def tearDown(self):
+        self.store = None
+        destroy_key_value_store(self.path, engine=self.engine)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_get_put_delete(self):
+        # GIVEN
+        self.store.put(b'key', b'value')
+
+        # WHEN THEN
+        self.assertEqual(b'value', self.store.get(b'key'))
+        self.store.put(b'key', b'new value')
+        self.assertEqual(b'new value', self.store.get(b'key'))
+        self.store.delete(b'key')
+        self.assertRaises(KeyError, self.store.get, b'key')
+        self.store.delete(b'key')
+
+    def test_write_batch(self):
+        # GIVEN
+        self.store.put(b'deleted', b'value')
+        batch = self.store.write_batch()
+        batch.put(b'a', b'1')
+        batch.put(b'b', b'2')
+        batch.delete(b'deleted')
+
+        # WHEN THEN
+        self.assertRaises(KeyError, self.store.get, b'a')
+        batch.write()
+        self.assertEqual(b'1', self.store.get(b'a'))
+        self.assertEqual(b'2', self.store.get(b'b'))
+        self.assertRaises(KeyError, self.store.get, b'deleted')
+
+        with self.store.write_batch() as batch:
+            batch.put(b'c', b'3')
+        self.assertEqual(b'3', self.store.get(b'c'))
+
+        with self.assertRaises(ValueError):
+            with self.store.write_batch() as batch:
+                batch.put(b'd', b'4')
+                raise ValueError()
+        self.assertRaises(KeyError, self.store.get, b'd')
+
+    def test_range_iter(self):
+        # GIVEN
+        for key in (b'k\x03', b'k\x01', b'j', b'k\x02', b'l', b'k\x00'):
+            self.store.put(key, key + b'v')
+
+        # WHEN THEN
+        self.assertEqual([(b'k\x01', b'k\x01v'), (b'k\x02', b'k\x02v'), (b'k\x03', b'k\x03v')],
+                         [(bytes(key), bytes(value)) for key, value in self.store.range_iter(b'k\x01', b'k\x03')])
+        self.assertEqual([b'j', b'k\x00', b'k\x01', b'k\x02', b'k\x03', b'l'],
+                         [bytes(key) for key in self.store.range_iter(include_value=False)])
+        self.assertEqual([b'k\x03', b'l'], [bytes(key) for key in self.store.range_iter(key_from=b'k\x02\x00',
+                                                                                         include_value=False)])
+        self.assertEqual([], list(self.store.range_iter(b'm', include_value=False)))
+
+    def test_write_during_range_iter(self):
+        # GIVEN
+        for key in (b'a', b'b', b'c'):
+            self.store.put(key, key)
+
+        # WHEN
+        keys = []
+        for key in self.store.range_iter(include_value=False):
+            keys.append(bytes(key))
+            self.store.delete(key)
+            self.store.put(bytes(key) + b'0', b'new')
+
+        # THEN
+        self.assertEqual([b'a', b'b', b'c'], keys)
+        self.assertEqual([b'a0', b'b0', b'c0'], [bytes(key) for key in self.store.range_iter(include_value=False)])
+
+    def test_snapshot(self):
+        # GIVEN
+        self.store.put(b'a', b'1')
+        self.store.put(b'b', b'2')
+
+        # WHEN
+        snapshot = self.store.snapshot()
+        self.store.put(b'a', b'changed')
+        self.store.delete(b'b')
+        self.store.put(b'c', b'3')
+
+        # THEN
+        self.assertEqual(b'1', snapshot.get(b'a'))
+        self.assertEqual(b'2', snapshot.get(b'b'))
+        self.assertRaises(KeyError, snapshot.get, b'c')
+        self.assertEqual([b'a', b'b'], [bytes(key) for key in snapshot.range_iter(include_value=False)])
+        self.assertEqual(b'changed', self.store.get(b'a'))
+
+    def test_block_chain(self):
+        """ GIVEN block chain on the engine
+        WHEN add blocks and open the block chain again
+        THEN blocks and txs are found
+        """
+        # GIVEN
+        chain = BlockChain(self.store)
+        peer_auth = test_util.create_peer_auth()
+        blocks = []
+        last_block = chain.last_block
+        for x in range(3):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            for y in range(3):
+                block.put_transaction(test_util.create_basic_tx("aaa", peer_auth))
+            block.generate_block(last_block)
+            block.block_status = BlockStatus.confirmed
+            chain.add_block(block)
+            blocks.append(block)
+            last_block = block
+
+        # WHEN
+        restored_chain = BlockChain(self.store)
+
+        # THEN
+        self.assertEqual(last_block.block_hash, restored_chain.last_block.block_hash)
+        self.assertEqual(9, restored_chain.total_tx)
+        tx = blocks[1].confirmed_transaction_list[1]
+        self.assertEqual(tx.tx_hash, restored_chain.find_tx_by_key(tx.tx_hash).tx_hash)
+        self.assertEqual([block.block_hash for block in blocks],
+                         [header['block_hash'] for header in restored_chain.iter_blocks(1, headers_only=True)])
+
+
+class TestLevelDBStore(KeyValueStoreConformance, unittest.TestCase):
+    engine = KeyValueStoreEngine.leveldb
+
+
+class TestMemoryStore(KeyValueStoreConformance, unittest.TestCase):
+    engine = KeyValueStoreEngine.memory
+
+    def test_open_same_path(self):
+        # GIVEN
+        self.store.put(b'key', b'value')
+
+        # WHEN
+        store = create_key_value_store(self.path, create_if_missing=False, engine=self.engine)
+
+        # THEN
+        self.assertEqual(b'value', store.get(b'key'))
+        self.assertRaises(KeyValueStoreError, create_key_value_store, self.path + "_not_exist", False, self.engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
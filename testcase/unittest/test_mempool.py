@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Test persistent mempool"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import loopchain.utils as util
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, BlockStatus, PersistentMempool
+from loopchain.store import LevelDBStore
+
+util.set_log_level_debug()
+
+
+class TestPersistentMempool(unittest.TestCase):
+
+    def setUp(self):
+        test_util.print_testname(self._testMethodName)
+        self.work_path = tempfile.mkdtemp(prefix="test_mempool_")
+        self.mempool_path = os.path.join(self.work_path, "mempool")
+        peer_auth = test_util.create_peer_auth()
+        self.txs = [test_util.create_basic_tx("aaa", peer_auth) for x in range(10)]
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def test_reload_uncommitted_txs(self):
+        """ GIVEN txs added to mempool and some of them committed
+        WHEN open mempool again
+        THEN only uncommitted txs are reloaded in received order
+        """
+        # GIVEN
+        mempool = PersistentMempool(self.mempool_path)
+        for tx in self.txs:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+        mempool.add(self.txs[5].tx_hash, pickle.dumps(self.txs[5]))
+        pruned = mempool.prune([tx.tx_hash for tx in self.txs[:3]], 1)
+        mempool.close()
+
+        # WHEN
+        reloaded_mempool = PersistentMempool(self.mempool_path)
+
+        # THEN
+        self.assertEqual(3, pruned)
+        self.assertEqual(1, reloaded_mempool.pruned_height)
+        self.assertEqual([tx.tx_hash for tx in self.txs[3:]],
+                         [pickle.loads(tx_unloaded).tx_hash for tx_unloaded in reloaded_mempool.get_txs()])
+        self.assertEqual([tx.tx_hash for tx in self.txs[3:]], reloaded_mempool.get_tx_hashes())
+        self.assertEqual(1, reloaded_mempool.prune([self.txs[5].tx_hash], 2))
+        self.assertEqual([tx.tx_hash for tx in self.txs[3:] if tx is not self.txs[5]],
+                         [pickle.loads(tx_unloaded).tx_hash for tx_unloaded in reloaded_mempool.get_txs()])
+
+    def test_compact_and_broken_tail(self):
+        """ GIVEN mempool log larger than compact size and a broken record at the end of log
+        WHEN prune committed txs and open mempool again
+        THEN remaining txs are moved to snapshot, log is emptied and the broken tail is cut
+        """
+        # GIVEN
+        mempool = PersistentMempool(self.mempool_path, compact_bytes=1024)
+        for tx in self.txs:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+
+        # WHEN
+        mempool.prune([tx.tx_hash for tx in self.txs[:8]], 3)
+        mempool.close()
+        log_path = os.path.join(self.mempool_path, "mempool.log")
+        log_size = os.path.getsize(log_path)
+        with open(log_path, 'ab') as log_file:
+            log_file.write(b"\x00\x00\x10\x00broken")
+        reloaded_mempool = PersistentMempool(self.mempool_path)
+
+        # THEN
+        self.assertEqual(0, log_size)
+        self.assertEqual(0, os.path.getsize(log_path))
+        self.assertEqual(3, reloaded_mempool.pruned_height)
+        self.assertEqual([tx.tx_hash for tx in self.txs[8:]],
+                         [pickle.loads(tx_unloaded).tx_hash for tx_unloaded in reloaded_mempool.get_txs()])
+
+    def test_reload_interrupted_compaction(self):
+        """ GIVEN mempool stopped after moving log for compaction and before writing snapshot
+        WHEN open mempool again
+        THEN txs of both logs are reloaded and moved to snapshot
+        """
+        # GIVEN
+        mempool = PersistentMempool(self.mempool_path)
+        for tx in self.txs[:5]:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+        mempool.prune([self.txs[0].tx_hash], 1)
+        mempool.close()
+        log_path = os.path.join(self.mempool_path, "mempool.log")
+        os.replace(log_path, log_path + ".compacting")
+        mempool = PersistentMempool(self.mempool_path)
+        for tx in self.txs[5:]:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+        mempool.remove([self.txs[1].tx_hash])
+        mempool.close()
+        os.replace(log_path, log_path + ".compacting")
+
+        # WHEN
+        reloaded_mempool = PersistentMempool(self.mempool_path)
+
+        # THEN
+        self.assertFalse(os.path.exists(log_path + ".compacting"))
+        self.assertEqual(0, os.path.getsize(log_path))
+        self.assertEqual(1, reloaded_mempool.pruned_height)
+        self.assertEqual([tx.tx_hash for tx in self.txs[2:]], reloaded_mempool.get_tx_hashes())
+
+    def test_block_chain_prunes_committed_txs(self):
+        """ GIVEN block chain with mempool
+        WHEN add block with txs of mempool
+        THEN txs of the block are pruned from mempool
+        """
+        # GIVEN
+        mempool = PersistentMempool(self.mempool_path)
+        chain = BlockChain(LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True),
+                           mempool=mempool)
+        for tx in self.txs:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        for tx in self.txs[:6]:
+            block.put_transaction(tx)
+        block.generate_block(chain.last_block)
+        block.block_status = BlockStatus.confirmed
+
+        # WHEN
+        chain.add_block(block)
+
+        # THEN
+        self.assertEqual(block.height, mempool.pruned_height)
+        self.assertEqual([tx.tx_hash for tx in self.txs[6:]],
+                         [pickle.loads(tx_unloaded).tx_hash for tx_unloaded in mempool.get_txs()])
+
+
+    def test_remove_rejected_txs_and_cap(self):
+        """ GIVEN mempool with max txs, txs rejected by block making and a committed tx
+        WHEN remove rejected and committed txs, add txs over max txs and open mempool again
+        THEN removed and the oldest txs are not reloaded
+        """
+        # GIVEN
+        chain = BlockChain(LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True))
+        block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+        block.put_transaction(self.txs[0])
+        block.generate_block(chain.last_block)
+        block.block_status = BlockStatus.confirmed
+        chain.add_block(block)
+        mempool = PersistentMempool(self.mempool_path, max_txs=8)
+        for tx in self.txs[:6]:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+
+        # WHEN
+        committed_tx_hashes = [tx_hash for tx_hash in mempool.get_tx_hashes() if chain.is_tx_committed(tx_hash)]
+        removed = mempool.remove(committed_tx_hashes + [self.txs[2].tx_hash])
+        for tx in self.txs[6:] + [self.txs[2]]:
+            mempool.add(tx.tx_hash, pickle.dumps(tx))
+        mempool.close()
+        reloaded_mempool = PersistentMempool(self.mempool_path, max_txs=8)
+
+        # THEN
+        self.assertEqual([self.txs[0].tx_hash], committed_tx_hashes)
+        self.assertEqual(2, removed)
+        self.assertEqual([tx.tx_hash for tx in self.txs[3:]] + [self.txs[2].tx_hash],
+                         [pickle.loads(tx_unloaded).tx_hash for tx_unloaded in reloaded_mempool.get_txs()])
+        self.assertEqual([tx.tx_hash for tx in self.txs[3:]] + [self.txs[2].tx_hash],
+                         reloaded_mempool.get_tx_hashes())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,6 +26,7 @@ import testcase.unittest.test_util as test_util
 from loopchain import configure as conf
 from loopchain.blockchain import BlockChain, BlockStatus, Block
 from loopchain.blockchain import ScoreBase
+from loopchain.store import LevelDBStore
 
 
 util.set_log_level_debug()
@@ -43,7 +44,7 @@ class TestScore(unittest.TestCase):
         블럭체인 생성 및 DB입력
         """
         # BlockChain 을 만듬
-        test_db = leveldb.LevelDB('./' + cls.test_block_db, create_if_missing=True)
+        test_db = LevelDBStore('./' + cls.test_block_db, create_if_missing=True)
         cls.assertIsNotNone(test_db, "DB생성 불가")
         cls.chain = BlockChain(test_db)
         cls.score = cls.SampleScore()
@@ -65,6 +65,10 @@ class TestScoreHelper(unittest.TestCase):
         self.assertIsNotNone(leveldb_conn)
         self.assertIsNotNone(sqlite_conn.cursor())
 
+        key_value_db = helper.load_database('key_value_test', ScoreDatabaseType.key_value)
+        key_value_db.put(b'key', b'value')
+        self.assertEqual(b'value', key_value_db.get(b'key'))
+
 
 if __name__ == '__main__':
     unittest.main()
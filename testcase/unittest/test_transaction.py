@@ -24,6 +24,8 @@ import sys
 import loopchain.utils as util
 import testcase.unittest.test_util as test_util
 from loopchain.blockchain import Transaction, TransactionStatus
+from loopchain.blockchain.tx_verifier import TxVerifier
+from loopchain.tools import VerifiedTxCache
 from loopchain.peer import PeerAuthorization
 from loopchain import configure as conf
 
@@ -72,6 +74,12 @@ class TestTransaction(unittest.TestCase):
         txhash = tx.put_data("{args:[]}")
         self.assertNotEqual(txhash, "")
 
+        for data in (b"{args:[]}", bytearray(b"{args:[]}"), memoryview(b"{args:[]}")):
+            tx.put_data(data)
+            self.assertEqual(b"{args:[]}", tx.get_data())
+        for data in (3, None, ["{args:[]}"]):
+            self.assertRaises(TypeError, tx.put_data, data)
+
     def test_diff_hash(self):
         """트랜잭션을 생성하여, 같은 값을 입력 하여도 트랜잭션 HASH는 달라야 함
         1000건 생성하여 트랜잭션 비교
@@ -125,6 +133,31 @@ class TestTransaction(unittest.TestCase):
         self.assertEqual(txhash1, txhash1_1)
         self.assertEqual(txhash2, txhash1_1)
 
+    def test_hash_preimage_is_cached_until_put_meta_or_put_data(self):
+        """ GIVEN tx with hash
+        WHEN put_meta or put_data after hash is generated
+        THEN cached preimage is rebuilt and is not sent when tx is pickled
+        """
+        # GIVEN
+        tx = Transaction()
+        tx.put_meta("peer_id", "12345")
+        tx_hash = tx.put_data("TEST DATA")
+        preimage = tx.get_hash_preimage()
+        self.assertIs(preimage, tx.get_hash_preimage())
+
+        # WHEN THEN
+        tx.put_meta("score_id", "score")
+        self.assertNotEqual(preimage, tx.get_hash_preimage())
+        self.assertNotEqual(tx_hash, Transaction.generate_transaction_hash(tx))
+
+        tx_hash = tx.put_data("OTHER DATA", tx.get_timestamp())
+        self.assertEqual(tx_hash, Transaction.generate_transaction_hash(tx))
+
+        tx2 = pickle.loads(pickle.dumps(tx))
+        self.assertIsNone(tx2._Transaction__preimage)
+        self.assertEqual(tx.meta, tx2.meta)
+        self.assertEqual(tx_hash, Transaction.generate_transaction_hash(tx2))
+
     def test_transaction_performace(self):
         """트랜잭션의 생성 퍼포먼스 1초에 몇개까지 만들 수 있는지 확인
         1초에 5000개 이상
@@ -194,6 +227,48 @@ class TestTransaction(unittest.TestCase):
         logging.debug("start validate invalid signature")
         self.assertFalse(Transaction.validate(invalid_sign_tx, is_exception_log=False))
 
+    def test_tx_verifier_finds_first_invalid_tx(self):
+        """ GIVEN tx list with two invalid signature txs
+        WHEN verify tx list sequentially and with thread pool
+        THEN both return index of the first invalid tx
+        """
+        # GIVEN
+        peer_auth = test_util.create_peer_auth()
+        tx_list = [test_util.create_basic_tx("peer_id", peer_auth) for _ in range(20)]
+        for invalid_index in (13, 7):
+            tx_list[invalid_index]._Transaction__signature = b'invalid signature'
+
+        for workers in (1, 2, 4):
+            verifier = TxVerifier(workers=workers, parallel_min_tx=0)
+
+            # WHEN THEN
+            self.assertEqual(7, verifier.find_first_invalid(tx_list))
+            self.assertEqual(-1, verifier.find_first_invalid(tx_list[:7]))
+            verifier.shutdown()
+
+    def test_verified_tx_cache(self):
+        """ GIVEN signed tx and same tx with other signature
+        WHEN validate txs several times
+        THEN signature of valid tx is verified once and invalid tx is never cached
+        """
+        # GIVEN
+        VerifiedTxCache.clear()
+        peer_auth = test_util.create_peer_auth()
+        tx = test_util.create_basic_tx("peer_id", peer_auth)
+        invalid_sign_tx = pickle.loads(pickle.dumps(tx))
+        invalid_sign_tx._Transaction__signature = b'invalid signature'
+
+        # WHEN
+        for _ in range(3):
+            self.assertTrue(Transaction.validate(tx))
+            self.assertFalse(Transaction.validate(invalid_sign_tx, is_exception_log=False))
+
+        # THEN
+        status = VerifiedTxCache.get_status()
+        self.assertEqual(1, status["size"])
+        self.assertEqual(2, status["hits"])
+        self.assertEqual(4, status["misses"])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 theloop, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Test bloom filter of committed tx hashes"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import loopchain.utils as util
+import testcase.unittest.test_util as test_util
+from loopchain import configure as conf
+from loopchain.blockchain import Block, BlockChain, BlockStatus, TxBloomFilter
+from loopchain.scoreservice import ScoreResponse
+from loopchain.store import LevelDBStore
+
+util.set_log_level_debug()
+
+
+class TestTxBloomFilter(unittest.TestCase):
+
+    def setUp(self):
+        test_util.print_testname(self._testMethodName)
+        self.work_path = tempfile.mkdtemp(prefix="test_tx_bloom_filter_")
+        self.filter_path = os.path.join(self.work_path, "tx_bloom_filter.dat")
+        self.peer_auth = test_util.create_peer_auth()
+
+    def tearDown(self):
+        shutil.rmtree(self.work_path)
+
+    def __add_blocks(self, chain, count):
+        blocks = []
+        for x in range(count):
+            block = Block(channel_name=conf.LOOPCHAIN_DEFAULT_CHANNEL)
+            for y in range(3):
+                block.put_transaction(test_util.create_basic_tx("aaa", self.peer_auth))
+            block.generate_block(chain.last_block)
+            block.block_status = BlockStatus.confirmed
+            chain.add_block(block)
+            blocks.append(block)
+        return blocks
+
+    def test_save_and_load(self):
+        """ GIVEN tx hashes added to bloom filter
+        WHEN save filter and load it again
+        THEN added tx hashes might be contained and the other tx hashes are mostly filtered
+        """
+        # GIVEN
+        tx_bloom_filter = TxBloomFilter(self.filter_path, capacity=1000, error_rate=0.01, load=False)
+        tx_hashes = [f"{x:064x}" for x in range(1000)]
+        tx_bloom_filter.add(tx_hashes)
+        tx_bloom_filter.set_height(7, "block_hash_7")
+
+        # WHEN
+        tx_bloom_filter.save()
+        loaded_filter = TxBloomFilter(self.filter_path, error_rate=0.01)
+
+        # THEN
+        self.assertEqual((7, "block_hash_7", 1000), (loaded_filter.height, loaded_filter.block_hash, loaded_filter.count))
+        self.assertTrue(all(loaded_filter.might_contain(tx_hash) for tx_hash in tx_hashes))
+        false_positives = sum(loaded_filter.might_contain(f"{x:064x}") for x in range(1000, 11000))
+        self.assertLess(false_positives, 10000 * 0.02)
+        self.assertAlmostEqual(0.01, loaded_filter.expected_error_rate(), delta=0.002)
+        self.assertEqual(10000 - false_positives, loaded_filter.get_status()['negatives'])
+
+        with open(self.filter_path, 'r+b') as filter_file:
+            filter_file.seek(-1, os.SEEK_END)
+            filter_file.write(b'\xff')
+        self.assertIsNone(TxBloomFilter(self.filter_path).height)
+
+    def test_block_chain_filters_uncommitted_txs(self):
+        """ GIVEN block chain with tx bloom filter which was saved some blocks ago
+        WHEN open block chain again and find committed and uncommitted txs
+        THEN blocks after the saved height are added again and uncommitted txs are answered without block db
+        """
+        # GIVEN
+        self.addCleanup(setattr, conf, 'TX_BLOOM_FILTER_SAVE_BLOCKS', conf.TX_BLOOM_FILTER_SAVE_BLOCKS)
+        conf.TX_BLOOM_FILTER_SAVE_BLOCKS = 2
+        db = LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True)
+        chain = BlockChain(db, tx_bloom_filter=TxBloomFilter(self.filter_path, capacity=1000))
+        blocks = self.__add_blocks(chain, 3)
+        self.assertEqual(2, TxBloomFilter(self.filter_path).height)
+
+        # WHEN
+        restarted_chain = BlockChain(db, tx_bloom_filter=TxBloomFilter(self.filter_path))
+        uncommitted_tx = test_util.create_basic_tx("aaa", self.peer_auth)
+
+        # THEN
+        self.assertTrue(restarted_chain.is_tx_bloom_filter_ready())
+        for block in blocks:
+            tx_hash = block.confirmed_transaction_list[0].tx_hash
+            self.assertEqual(tx_hash, restarted_chain.find_tx_by_key(tx_hash).tx_hash)
+        self.assertIsNone(restarted_chain.find_tx_by_key(uncommitted_tx.tx_hash))
+        self.assertEqual({'code': ScoreResponse.NOT_INVOKED},
+                         restarted_chain.find_invoke_result_by_tx_hash(uncommitted_tx.tx_hash))
+        status = restarted_chain.get_tx_bloom_filter_status()
+        self.assertEqual((3, 9), (status['height'], status['count']))
+        self.assertEqual(2, status['negatives'] + status['false_positives'])
+
+    def test_rebuild_filter_of_other_chain(self):
+        """ GIVEN tx bloom filter saved from other chain
+        WHEN open block chain with the filter and rebuild it
+        THEN the filter is not used until it is rebuilt from block db
+        """
+        # GIVEN
+        other_chain = BlockChain(LevelDBStore(os.path.join(self.work_path, "other_db"), create_if_missing=True),
+                                 tx_bloom_filter=TxBloomFilter(self.filter_path, capacity=1000))
+        self.__add_blocks(other_chain, 2)
+        other_chain.save_tx_bloom_filter()
+        db = LevelDBStore(os.path.join(self.work_path, "db"), create_if_missing=True)
+        blocks = self.__add_blocks(BlockChain(db), 2)
+
+        # WHEN
+        chain = BlockChain(db, tx_bloom_filter=TxBloomFilter(self.filter_path))
+        ready_before_rebuild = chain.is_tx_bloom_filter_ready()
+        tx_count = chain.rebuild_tx_bloom_filter()
+
+        # THEN
+        self.assertFalse(ready_before_rebuild)
+        self.assertEqual(6, tx_count)
+        self.assertTrue(chain.is_tx_bloom_filter_ready())
+        tx_hash = blocks[1].confirmed_transaction_list[2].tx_hash
+        self.assertEqual(tx_hash, chain.find_tx_by_key(tx_hash).tx_hash)
+        self.assertEqual(blocks[1].block_hash, TxBloomFilter(self.filter_path).block_hash)
+
+
+if __name__ == '__main__':
+    unittest.main()
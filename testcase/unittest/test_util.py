@@ -16,7 +16,6 @@
 # limitations under the License.
 """util functions for unittest"""
 
-import leveldb
 import logging
 import multiprocessing
 import os
@@ -36,6 +35,7 @@ from loopchain.container import ScoreService
 from loopchain.peer import PeerService, PeerAuthorization
 from loopchain.protos import loopchain_pb2, loopchain_pb2_grpc
 from loopchain.radiostation import RadioStationService
+from loopchain.store import LevelDBStore, KeyValueStoreError
 
 util.set_log_level_debug()
 
@@ -156,9 +156,9 @@ def make_level_db(db_name=""):
 
     while blockchain_db is None and retry_count < conf.MAX_RETRY_CREATE_DB:
         try:
-            blockchain_db = leveldb.LevelDB(db_path, create_if_missing=True)
+            blockchain_db = LevelDBStore(db_path, create_if_missing=True)
             logging.debug("make level db path: " + db_path)
-        except leveldb.LevelDBError:
+        except KeyValueStoreError:
             db_path = db_default_path + str(retry_count)
         retry_count += 1
 